@@ -0,0 +1,129 @@
+# django imports
+from django.contrib import admin, messages
+from django.http import HttpResponseRedirect
+from django.shortcuts import render
+from django.urls import path, reverse
+# project imports
+from libs.mixins import BaseMixin, ExportCSVMixin
+# app imports
+from .models import Invoice, InvoiceLine
+from .forms import GenerateInvoicesForm
+from .tasks import generate_invoices_task
+
+
+class InvoiceLineInline(admin.TabularInline):
+    model = InvoiceLine
+    extra = 0
+    can_delete = False
+    readonly_fields = [
+        "client_store",
+        "type",
+        "model",
+        "billable_days",
+        "trips",
+        "unpriced_days",
+        "amount",
+    ]
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+
+class InvoiceAdmin(BaseMixin, ExportCSVMixin):
+    list_display = [
+        "id",
+        "client",
+        "month",
+        "status",
+        "trips",
+        "total",
+        "updated_at",
+    ]
+    list_filter = [
+        "status",
+        "month",
+    ]
+    readonly_fields = [
+        "client",
+        "month",
+        "trips",
+        "total",
+        "created_at",
+        "updated_at",
+    ]
+    csv_fields = [
+        "id",
+        "client.id",
+        "client.name",
+        "month",
+        "status",
+        "trips",
+        "total",
+        "updated_at",
+    ]
+    inlines = [InvoiceLineInline]
+    search_fields = ["client__name"]
+    search_help_text = "Client Name"
+    model = Invoice
+    actions = ["export_selected", "regenerate"]
+
+    def has_add_permission(self, request):
+        return False
+
+    def get_urls(self):
+        urls = super().get_urls()
+        my_urls = [
+            path(
+                "generate/",
+                self.admin_site.admin_view(self.generate),
+                name="generate_invoices",
+            ),
+        ]
+        return my_urls + urls
+
+    def generate(self, request):
+        """
+        Queue the invoice generation of a month
+        """
+        if request.method == "POST":
+            form = GenerateInvoicesForm(request.POST)
+            if form.is_valid():
+                month = form.cleaned_data["month"]
+                generate_invoices_task.delay(month.year, month.month)
+                messages.add_message(
+                    request,
+                    messages.INFO,
+                    f"Invoices for {month:%b %Y} are being generated",
+                )
+                return HttpResponseRedirect(
+                    reverse("admin:billing_invoice_changelist"),
+                )
+        else:
+            form = GenerateInvoicesForm()
+
+        return render(
+            request,
+            "billing/html/generate_invoices.html",
+            {"title": "Generate Invoices", "form": form},
+        )
+
+    def regenerate(self, request, queryset):
+        """
+        Regenerate the selected draft invoices
+        """
+        months = {}
+        for month, client_id in queryset.filter(
+            status=Invoice.STATUS.DRAFT,
+        ).values_list("month", "client_id"):
+            months.setdefault(month, []).append(client_id)
+        for month, client_ids in months.items():
+            generate_invoices_task.delay(month.year, month.month, client_ids)
+        messages.add_message(
+            request,
+            messages.INFO,
+            "Draft invoices are being regenerated",
+        )
+    regenerate.short_description = "Regenerate draft invoices"
+
+
+admin.site.register(Invoice, InvoiceAdmin)
@@ -0,0 +1,8 @@
+# project imports
+from bookings.models import Roster
+
+# roster types billed per completed trip, the others per billable day
+PER_TRIP_TYPES = [
+    Roster.TYPE.LOGISTICS_TRIP.value,
+    Roster.TYPE.LOGISTICS_DELIVERY.value,
+]
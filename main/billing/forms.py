@@ -0,0 +1,18 @@
+# python imports
+from datetime import date
+# django imports
+from django import forms
+from crispy_forms.helper import FormHelper
+
+
+class GenerateInvoicesForm(forms.Form):
+    month = forms.DateField(
+        initial=lambda: date.today().replace(day=1),
+        help_text="Any day of the month to bill",
+    )
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.helper = FormHelper()
+        self.helper.form_id = 'id-my-form'
+        self.helper.form_class = 'my-form'
@@ -0,0 +1,137 @@
+# python imports
+import logging
+from datetime import datetime, timedelta
+from collections import defaultdict
+# django imports
+from django.db import transaction
+from django.db.models import Count
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+# project imports
+from bookings.models import Trip
+from clients.helpers import pricing_table
+# app imports
+from .models import Invoice, InvoiceLine
+from .constants import PER_TRIP_TYPES
+
+logger = logging.getLogger(__name__)
+
+
+def get_month_range(month):
+    """
+    Returns the first day of the month and of the next month
+    """
+    start = month.replace(day=1)
+    end = (start + timedelta(days=32)).replace(day=1)
+    return start, end
+
+
+def get_billable_days(start, end, client_ids=None):
+    """
+    Completed trips counted per roster and day in a single GROUP BY, the
+    day of a trip is its trip date. Yields (roster, client, store, type,
+    model, holidays, day, trips)
+    """
+    trips = Trip.objects.annotate(
+        day=Coalesce("trip_date", TruncDate("created_at")),
+    ).filter(
+        status=Trip.STATUS.RIDE_COMPLETED,
+        day__gte=start,
+        day__lt=end,
+        roster__client__isnull=False,
+        roster__vehicle__isnull=False,
+    )
+    if client_ids is not None:
+        trips = trips.filter(roster__client_id__in=client_ids)
+    return trips.values_list(
+        "roster_id",
+        "roster__client_id",
+        "roster__client_store_id",
+        "roster__type",
+        "roster__vehicle__model",
+        "roster__holiday",
+        "day",
+    ).annotate(
+        count=Count("id"),
+    ).order_by().iterator()
+
+
+def generate_invoices(month, client_ids=None):
+    """
+    Generate the draft invoices of a month, for all clients or the given
+    ones. Lines are per client store, roster type and vehicle model. A
+    roster day with completed trips is billed at the price effective on
+    that day, per trip for PER_TRIP_TYPES and once otherwise, roster
+    holidays are not billed. Issued invoices are left untouched and
+    running it again replaces the drafts. Returns the number of invoices.
+    """
+    start, end = get_month_range(month)
+    pricing_table.refresh()
+    lines = defaultdict(lambda: InvoiceLine())
+    for __, client_id, store_id, type, model, holidays, day, count in get_billable_days(
+        start,
+        end,
+        client_ids,
+    ):
+        if day in (holidays or []):
+            continue
+        line = lines[(client_id, store_id, type, model)]
+        line.client_store_id = store_id
+        line.type = type
+        line.model = model
+        line.billable_days += 1
+        line.trips += count
+        price = pricing_table.lookup((client_id, store_id, type, model), day)
+        if price is None:
+            line.unpriced_days += 1
+        else:
+            line.amount += price * count if type in PER_TRIP_TYPES else price
+
+    with transaction.atomic():
+        invoices = Invoice.objects.select_for_update().filter(month=start)
+        if client_ids is not None:
+            invoices = invoices.filter(client_id__in=client_ids)
+        issued = {
+            invoice.client_id for invoice in invoices
+            if invoice.status == Invoice.STATUS.ISSUED
+        }
+        Invoice.objects.bulk_create(
+            [
+                Invoice(client_id=client_id, month=start)
+                for client_id in {key[0] for key in lines} - issued
+            ],
+            ignore_conflicts=True,
+        )
+        invoices = {
+            invoice.client_id: invoice
+            for invoice in invoices.filter(status=Invoice.STATUS.DRAFT)
+        }
+        InvoiceLine.objects.filter(invoice__in=invoices.values()).delete()
+        for invoice in invoices.values():
+            invoice.trips = 0
+            invoice.total = 0
+            invoice.updated_at = timezone.now()
+        objs = []
+        for (client_id, *__), line in lines.items():
+            invoice = invoices.get(client_id)
+            if invoice is None:
+                continue
+            line.invoice = invoice
+            line.amount = round(line.amount, 2)
+            invoice.trips += line.trips
+            invoice.total = round(invoice.total + line.amount, 2)
+            objs.append(line)
+        InvoiceLine.objects.bulk_create(objs, batch_size=1000)
+        Invoice.objects.bulk_update(
+            invoices.values(),
+            ["trips", "total", "updated_at"],
+            batch_size=1000,
+        )
+    logger.info(
+        "{} invoices generated for {:%b %Y}: {}".format(
+            datetime.now(),
+            start,
+            len(invoices),
+        )
+    )
+    return len(invoices)
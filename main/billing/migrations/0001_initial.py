@@ -0,0 +1,57 @@
+# Generated by Django 3.2.13 on 2026-10-18 10:00
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('clients', '0010_pricing_effective_dates'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Invoice',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('is_active', models.BooleanField(default=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('month', models.DateField()),
+                ('status', models.PositiveSmallIntegerField(choices=[(0, 'Draft'), (1, 'Issued')], default=0)),
+                ('trips', models.PositiveIntegerField(default=0)),
+                ('total', models.FloatField(default=0)),
+                ('client', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to='clients.client')),
+            ],
+            options={
+                'verbose_name': 'Invoice',
+                'verbose_name_plural': 'Invoices',
+                'ordering': ['-month', 'client'],
+            },
+        ),
+        migrations.CreateModel(
+            name='InvoiceLine',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('type', models.PositiveSmallIntegerField(choices=[(0, 'Rental'), (1, 'Logistics - Fixed'), (2, 'Logistics - Trip'), (3, 'Logistics - Delivery')])),
+                ('model', models.IntegerField(choices=[(0, 'Pimo'), (1, 'Hero Nyx'), (2, 'Hero Lectro'), (3, 'Treo Zor'), (4, 'Log9'), (5, 'Omega Seiki'), (6, 'Altigreen'), (7, 'Exponent')])),
+                ('billable_days', models.PositiveIntegerField(default=0)),
+                ('trips', models.PositiveIntegerField(default=0)),
+                ('unpriced_days', models.PositiveIntegerField(default=0)),
+                ('amount', models.FloatField(default=0)),
+                ('client_store', models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, to='clients.clientstore')),
+                ('invoice', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lines', to='billing.invoice')),
+            ],
+            options={
+                'verbose_name': 'Invoice Line',
+                'verbose_name_plural': 'Invoice Lines',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='invoice',
+            constraint=models.UniqueConstraint(fields=('client', 'month'), name='unique_client_invoice_month'),
+        ),
+    ]
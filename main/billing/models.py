@@ -0,0 +1,68 @@
+# django imports
+from django.db import models
+from django.utils.translation import gettext_lazy as _
+# project imports
+from libs.models import BaseModel
+from fleets.models import Vehicle
+from bookings.models import Roster
+
+
+class Invoice(BaseModel):
+    """
+    Model to store the monthly invoice of a client
+    """
+    class STATUS(models.IntegerChoices):
+        DRAFT = 0, _("Draft")
+        ISSUED = 1, _("Issued")
+
+    client = models.ForeignKey("clients.Client", on_delete=models.PROTECT)
+    # first day of the billed month
+    month = models.DateField()
+    status = models.PositiveSmallIntegerField(
+        choices=STATUS.choices,
+        default=STATUS.DRAFT,
+    )
+    trips = models.PositiveIntegerField(default=0)
+    total = models.FloatField(default=0)
+
+    class Meta:
+        verbose_name = "Invoice"
+        verbose_name_plural = "Invoices"
+        ordering = ["-month", "client"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["client", "month"],
+                name="unique_client_invoice_month",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.client} | {self.month:%b %Y}"
+
+
+class InvoiceLine(models.Model):
+    """
+    Model to store the invoice amount of a client store, roster type and
+    vehicle model
+    """
+    invoice = models.ForeignKey(
+        "Invoice",
+        on_delete=models.CASCADE,
+        related_name="lines",
+    )
+    client_store = models.ForeignKey(
+        "clients.ClientStore",
+        on_delete=models.PROTECT,
+        null=True,
+    )
+    type = models.PositiveSmallIntegerField(choices=Roster.TYPE.choices)
+    model = models.IntegerField(choices=Vehicle.MODEL.choices)
+    billable_days = models.PositiveIntegerField(default=0)
+    trips = models.PositiveIntegerField(default=0)
+    # roster days with completed trips but no pricing
+    unpriced_days = models.PositiveIntegerField(default=0)
+    amount = models.FloatField(default=0)
+
+    class Meta:
+        verbose_name = "Invoice Line"
+        verbose_name_plural = "Invoice Lines"
@@ -0,0 +1,14 @@
+# python imports
+from datetime import date
+# project imports
+from main.celery import app
+# app imports
+from .helpers import generate_invoices
+
+
+@app.task(name="generate_invoices")
+def generate_invoices_task(year, month, client_ids=None):
+    """
+    Generate the draft invoices of a month in the background
+    """
+    return generate_invoices(date(year, month, 1), client_ids)
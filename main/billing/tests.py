@@ -0,0 +1,133 @@
+# python imports
+from datetime import timedelta
+# django imports
+from django.utils import timezone
+# project imports
+from bookings.models import Roster, Trip
+from bookings.tests import DriverRosterTestCase
+from clients.models import Pricing
+from clients.helpers import PricingTable
+from fleets.models import Vehicle
+# app imports
+from .models import Invoice, InvoiceLine
+from .helpers import generate_invoices
+
+PRICE = 500
+
+
+class GenerateInvoicesTestCase(DriverRosterTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.today = timezone.localdate()
+        pricing = Pricing.objects.create(
+            title="Pricing",
+            description="Pricing",
+            client=self.roster.client,
+            type=self.roster.type,
+            model=self.roster.vehicle.model,
+            price=PRICE,
+        )
+        pricing.client_store.add(self.roster.client_store)
+
+    def get_line(self):
+        generate_invoices(self.today)
+        return InvoiceLine.objects.get(invoice__client=self.roster.client)
+
+    def complete_trip(self, roster):
+        return Trip.objects.create(
+            roster=roster,
+            start_km=100,
+            end_km=120,
+            status=Trip.STATUS.RIDE_COMPLETED,
+            is_active=False,
+            trip_date=self.today,
+        )
+
+    def test_trip_ended_through_end_ride_is_billed(self):
+        response = self.client.post(
+            "/bookings/trips/start-ride/",
+            {"roster": self.roster.id, "start_km": 100},
+            format="json",
+        )
+        response = self.client.post(
+            "/bookings/trips/{}/end-ride/".format(response.data["id"]),
+            {"end_km": 120, "trip_sheet_photo": "https://example.com/sheet.jpg"},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 200)
+        line = self.get_line()
+        self.assertEqual((line.billable_days, line.trips, line.amount), (1, 1, PRICE))
+        self.assertEqual(Invoice.objects.get(client=self.roster.client).total, PRICE)
+
+    def test_trip_ended_without_check_in_is_billed(self):
+        start = timezone.now() - timedelta(minutes=10)
+        response = self.client.post(
+            "/bookings/trips/events/",
+            {
+                "events": [
+                    {
+                        "key": "start",
+                        "type": "start_ride",
+                        "roster": self.roster.id,
+                        "timestamp": start.isoformat(),
+                        "start_km": 100,
+                    },
+                    {
+                        "key": "end",
+                        "type": "end_ride",
+                        "roster": self.roster.id,
+                        "timestamp": (start + timedelta(minutes=5)).isoformat(),
+                        "end_km": 120,
+                        "trip_sheet_photo": "https://example.com/sheet.jpg",
+                    },
+                ],
+            },
+            format="json",
+        )
+        self.assertEqual(
+            [result["status"] for result in response.data["results"]],
+            ["applied", "applied"],
+        )
+        self.assertEqual(self.get_line().billable_days, 1)
+
+    def test_rosters_of_a_store_are_billed_each_day(self):
+        vehicle = Vehicle.objects.create(
+            registration_number="TN 01 0002",
+            model=self.roster.vehicle.model,
+            status=Vehicle.STATUS.FOR_DEPLOYMENT,
+            speed=Vehicle.SPEED.LOW,
+            station=self.roster.destination_station,
+        )
+        other = Roster.objects.create(
+            client=self.roster.client,
+            client_store=self.roster.client_store,
+            type=self.roster.type,
+            vehicle=vehicle,
+            start_date=self.roster.start_date,
+            end_date=self.roster.end_date,
+            slot_start_time=self.roster.slot_start_time,
+            slot_end_time=self.roster.slot_end_time,
+            lat=self.roster.lat,
+            long=self.roster.long,
+            address=self.roster.address,
+            destination_station=self.roster.destination_station,
+        )
+        self.complete_trip(self.roster)
+        self.complete_trip(other)
+        line = self.get_line()
+        self.assertEqual((line.billable_days, line.trips, line.amount), (2, 2, 2 * PRICE))
+
+    def test_holidays_are_not_billed(self):
+        self.roster.holiday = [self.today]
+        self.roster.save()
+        self.complete_trip(self.roster)
+        generate_invoices(self.today)
+        self.assertFalse(InvoiceLine.objects.exists())
+
+    def test_unpriced_days(self):
+        Pricing.objects.update(effective_from=self.today + timedelta(days=1))
+        PricingTable.invalidate()
+        self.complete_trip(self.roster)
+        line = self.get_line()
+        self.assertEqual((line.billable_days, line.unpriced_days, line.amount), (1, 1, 0))
@@ -2,7 +2,7 @@
 from datetime import datetime
 # django imports
 from django.contrib import admin, messages
-from django.shortcuts import render
+from django.shortcuts import render, get_object_or_404
 from django.http import HttpResponse, HttpResponseRedirect
 from django.utils.translation import gettext_lazy as _
 from django.urls import reverse, path
@@ -15,6 +15,8 @@ from django.contrib.contenttypes.models import ContentType
 # project imports
 from libs.mixins import BaseMixin, BaseLogMixin, ExportCSVMixin
 from libs.forms import ImportCSVForm
+from jobs.models import ImportJob
+from jobs.helpers import start_import_job
 # app imports
 from .models import (
     Roster, 
@@ -23,13 +25,16 @@ from .models import (
     RosterVehicleLog, 
 )
 from .forms import (
+    AssignRostersForm,
     ChangeRosterStatus,
     ChangeTripStatus,
 )
 from .helpers import (
-    roster_import_csv_handler,
     DriverAssignmentFilter,
     VehicleAssignmentFilter,
+    suggest_assignments,
+    plan_roster_assignments,
+    apply_roster_assignments,
 )
 
 
@@ -152,9 +157,75 @@ class RosterAdmin(BaseMixin, ExportCSVMixin):
                 self.export_selected,
                 name="export_roster_csv",
             ),
+            path(
+                "<int:roster_id>/suggestions/",
+                self.admin_site.admin_view(self.suggestions),
+                name="roster_suggestions",
+            ),
+            path(
+                "assign/",
+                self.admin_site.admin_view(self.assign),
+                name="roster_assign",
+            ),
         ]
         return my_urls + urls
 
+    def assign(self, request):
+        """
+        Preview the optimal assignment of the open rosters of a date range,
+        the previewed plan is kept in the session until it is applied
+        """
+        if request.method == "POST" and "apply" in request.POST:
+            plan = request.session.pop("roster_assignment_plan", [])
+            updated, skipped = apply_roster_assignments(plan)
+            for roster in updated:
+                self.log_change(request, roster, "Fields Changed by the roster assignment")
+            messages.add_message(
+                request,
+                messages.INFO,
+                f"{len(updated)} rosters assigned, {len(skipped)} skipped",
+            )
+            return HttpResponseRedirect(reverse("admin:bookings_roster_changelist"))
+
+        context = {"title": "Assign Rosters"}
+        if request.method == "POST":
+            form = AssignRostersForm(request.POST)
+            if form.is_valid():
+                total, plan = plan_roster_assignments(
+                    form.cleaned_data["start_date"],
+                    form.cleaned_data["end_date"],
+                    form.cleaned_data["client"],
+                )
+                request.session["roster_assignment_plan"] = plan
+                context.update({"total": total, "plan": plan})
+        else:
+            form = AssignRostersForm()
+        context["form"] = form
+        return render(request, "bookings/html/assign_rosters.html", context)
+
+    def suggestions(self, request, roster_id):
+        """
+        Nearest vehicles and drivers free for the slot of the roster
+        """
+        roster = get_object_or_404(Roster.objects.select_related("client_store"), id=roster_id)
+        context = {
+            "title": f"Suggestions for Roster {roster.id}",
+            "roster": roster,
+            "opts": self.model._meta,
+        }
+        if roster.client_store is not None:
+            context.update(
+                suggest_assignments(
+                    roster.client_store,
+                    roster.slot_start_time,
+                    roster.slot_end_time,
+                    roster.start_date,
+                    roster.end_date,
+                    roster_id=roster.id,
+                )
+            )
+        return render(request, "bookings/html/suggestions.html", context)
+
     def formfield_for_choice_field(self, db_field, request, **kwargs):
         statuses = Roster.STATUS.choices
         remove_statuses = [(2, "Attrition"), (3, 'Service'), ]
@@ -182,36 +253,7 @@ class RosterAdmin(BaseMixin, ExportCSVMixin):
         if "import_csv" in request.POST:
             form = ImportCSVForm(request.POST, request.FILES)
             if form.is_valid():
-                f = request.FILES["file"]
-                (
-                    added,
-                    skipped,
-                    invalid,
-                    no_license,
-                ) = roster_import_csv_handler(f, request.user)
-                if added == -1 and skipped == -1 and invalid == -1:
-                    return HttpResponse("Invalid roster csv.")
-                messages.add_message(
-                    request,
-                    messages.INFO,
-                    f"{added} entries added. {skipped} skipped.",
-                )
-                if no_license > 0:
-                    messages.add_message(
-                        request,
-                        messages.ERROR,
-                        f"{no_license} entries skippped.\
-                        Cannot assign high speed vehicle to driver\
-                        without driver license.",
-                    )
-                if invalid > 0:
-                    messages.add_message(
-                        request,
-                        messages.ERROR,
-                        f"{invalid} invalid entries.\
-                        Driver or vehicle not found.",
-                    )
-                return HttpResponseRedirect("..")
+                return start_import_job(request, ImportJob.TYPE.ROSTER)
         else:
             form = ImportCSVForm()
 
@@ -317,6 +359,8 @@ class TripAdmin(BaseMixin, ExportCSVMixin):
         "checkin_time",
         "checkout_time",
         "ended_at",
+        "gps_km",
+        "odometer_mismatch",
         "is_active",
     ]
     list_select_related = ("roster",)
@@ -324,6 +368,7 @@ class TripAdmin(BaseMixin, ExportCSVMixin):
         "is_active",
         "roster__city",
         "status",
+        "odometer_mismatch",
         ("checkin_time", DateRangeFilter),
         ("checkout_time", DateRangeFilter),
     ]
@@ -343,10 +388,13 @@ class TripAdmin(BaseMixin, ExportCSVMixin):
         "out_longitude",
         "start_km",
         "end_km",
+        "gps_km",
+        "odometer_mismatch",
         "trip_sheet_photo",
         "updated_at",
         "is_active",
     ]
+    csv_select_related = ["roster__driver__onboarding"]
     date_hierarchy = 'created_at'
     model = Trip
     actions = ["export_selected", "change_status"]
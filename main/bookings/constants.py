@@ -1,5 +1,21 @@
 TRIP_START_TIME_DELTA = 120
 TRIP_END_TIME_DELTA = 120
+SUGGESTION_LIMIT = 10
+SUGGESTION_MAX_LIMIT = 50
+ASSIGNMENT_CANDIDATES = 25
+# km, ranks the drivers never seen after the located ones
+UNKNOWN_DRIVER_DISTANCE = 100
+# km/h, faster jumps between two pings are gps noise
+TRIP_MAX_SPEED = 120
+# odometer and gps km may differ by the larger of both
+TRIP_DISTANCE_TOLERANCE = 0.2
+TRIP_DISTANCE_MIN_DIFF = 2
+# trip events uploaded at once and the allowed client clock skew (seconds)
+TRIP_EVENT_BATCH_LIMIT = 500
+TRIP_EVENT_MAX_CLOCK_SKEW = 300
+# roster feed of the driver app, cached per user
+ROSTER_FEED_KEY = "roster_feed_{}"
+ROSTER_FEED_TIMEOUT = 60 * 60
 
 TRIP_ENDED_ALREADY = {
     "code": "BKG_500",
@@ -39,4 +55,14 @@ TRIP_INVALID_ACTION = {
 TRIP_VEHICLE_NOT_ASSIGNED = {
     "code": "FLT_505",
     "error": "vehicle is not assigned to the roster."
-}
\ No newline at end of file
+}
+
+INVALID_SUGGESTION_SEARCH = {
+    "code": "BKG_400",
+    "error": "client store, dates and slot times are required.",
+}
+
+INVALID_TRIP_EVENTS = {
+    "code": "BKG_401",
+    "error": "events must be a list of trip events with a key, type, roster and timestamp.",
+}
@@ -1,5 +1,10 @@
+# python imports
+from datetime import date
 # django imports
 from django import forms
+from crispy_forms.helper import FormHelper
+# project imports
+from clients.models import Client
 # app imports
 from .models import Roster
 
@@ -14,3 +19,28 @@ class ChangeRosterStatus(forms.Form):
 
 class ChangeTripStatus(forms.Form):
     status = forms.ChoiceField(choices=Roster.STATUS.choices)
+
+
+class AssignRostersForm(forms.Form):
+    start_date = forms.DateField(initial=date.today)
+    end_date = forms.DateField(initial=date.today)
+    client = forms.ModelChoiceField(
+        queryset=Client.objects.filter(is_active=True),
+        required=False,
+        help_text="Leave empty for the rosters of every client",
+    )
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.helper = FormHelper()
+        self.helper.form_id = 'id-my-form'
+        self.helper.form_class = 'my-form'
+
+    def clean(self):
+        cleaned_data = super().clean()
+        start_date = cleaned_data.get("start_date")
+        end_date = cleaned_data.get("end_date")
+        if start_date and end_date and end_date < start_date:
+            raise forms.ValidationError("End date must be after the start date")
+        return cleaned_data
+
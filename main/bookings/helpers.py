@@ -1,14 +1,54 @@
 # python imports
+import csv
+import heapq
 import logging
-from datetime import datetime
+from bisect import bisect_left
+from datetime import datetime, timedelta, time
+from itertools import groupby
+from collections import defaultdict
 from django.contrib.admin import SimpleListFilter
+from django.core.cache import cache
+from django.db import transaction, IntegrityError
+from django.db.models import Q
+from django.db.models.functions import Lower
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from psycopg2.extras import DateRange
 
 
 # project impotts
-from .models import Roster
-from drivers.models import Driver
+from .models import Roster, RosterSlot, Trip, TripEvent
+from .serializers import RosterFeedSerializer
+from config.models import Config
+from drivers.models import Driver, DriverLocations, DriverLocationTrack
 from fleets.models import Vehicle, Station
 from clients.models import ClientStore
+from clients.helpers import pricing_table
+from drivers.helpers import get_live_positions, decode_track
+from libs.helpers import haversine
+from libs.assignment import min_cost_assignment
+from .constants import (
+    SUGGESTION_LIMIT,
+    ASSIGNMENT_CANDIDATES,
+    UNKNOWN_DRIVER_DISTANCE,
+    TRIP_MAX_SPEED,
+    TRIP_DISTANCE_TOLERANCE,
+    TRIP_DISTANCE_MIN_DIFF,
+    ROSTER_FEED_KEY,
+    ROSTER_FEED_TIMEOUT,
+    TRIP_START_TIME_DELTA,
+    TRIP_EVENT_BATCH_LIMIT,
+    TRIP_EVENT_MAX_CLOCK_SKEW,
+    TRIP_NOT_FOUND,
+    TRIP_ENDED_ALREADY,
+    TRIP_CANNOT_START,
+    TRIP_INVALID_ACTION,
+    TRIP_VEHICLE_NOT_ASSIGNED,
+    PREVIOUS_TRIP_ACTIVE,
+    ROSTER_NOT_ASSIGNED,
+    ROSTER_TRIP_COMPLETED_ALREADY,
+)
+from libs.constants import INVALID_DATA
 
 logger = logging.getLogger(__name__)
 
@@ -40,127 +80,1016 @@ class VehicleAssignmentFilter(SimpleListFilter):
                 return queryset.filter(vehicle__isnull=True)
 
 
-def roster_import_csv_handler(file, user):
+def parse_roster_line(fields):
+    """
+    Parse a roster csv line, raises ValueError for malformed lines
+    """
+    (
+        driver,
+        vehicle,
+        client_store,
+        start_date,
+        end_date,
+        holiday,
+        start_time,
+        end_time,
+        lat,
+        long,
+        destination_station,
+    ) = [field.strip() for field in fields]
+    if holiday:
+        holiday = [datetime.strptime(day, "%Y-%m-%d").date() for day in holiday.split("|")]
+    else:
+        holiday = []
+    return {
+        "driver": int(driver),
+        "vehicle": vehicle,
+        "client_store": client_store.lower(),
+        "start_date": datetime.strptime(start_date, "%Y-%m-%d").date(),
+        "end_date": datetime.strptime(end_date, "%Y-%m-%d").date(),
+        "holiday": holiday,
+        "slot_start_time": datetime.strptime(start_time, "%I:%M %p").time(),
+        "slot_end_time": datetime.strptime(end_time, "%I:%M %p").time(),
+        "lat": float(lat),
+        "long": float(long),
+        "destination_station": destination_station.lower(),
+    }
+
+
+def find_roster_conflicts(rows, time_diff):
+    """
+    Sweep over the slots of the csv rows and the existing roster slots of
+    the same drivers/vehicles. Returns a dict of line number to a list of
+    (field, line number) conflicts, line number is None for existing rosters.
+    """
+    if not rows:
+        return {}
+    slots = defaultdict(list)
+    first, last = None, None
+    for lineno, row in rows.items():
+        for dates, seconds in RosterSlot.get_segments(
+            row["slot_start_time"],
+            row["slot_end_time"],
+            row["start_date"],
+            row["end_date"],
+            time_diff,
+        ):
+            for field in ("driver", "vehicle"):
+                slots[(field, row[field].id)].append(
+                    (dates.lower, dates.upper, seconds.lower, seconds.upper, lineno)
+                )
+            first = dates.lower if first is None else min(first, dates.lower)
+            last = dates.upper if last is None else max(last, dates.upper)
+
+    driver_ids = {row["driver"].id for row in rows.values()}
+    vehicle_ids = {row["vehicle"].id for row in rows.values()}
+    existing = RosterSlot.objects.filter(
+        Q(driver_id__in=driver_ids) | Q(vehicle_id__in=vehicle_ids),
+        dates__overlap=DateRange(first, last, "[]"),
+    ).values_list("driver_id", "vehicle_id", "dates", "seconds")
+    for driver_id, vehicle_id, dates, seconds in existing:
+        # ranges are returned in the canonical [) form
+        slot = (
+            dates.lower,
+            dates.upper - timedelta(days=1),
+            seconds.lower,
+            seconds.upper - 1,
+            None,
+        )
+        if driver_id in driver_ids:
+            slots[("driver", driver_id)].append(slot)
+        if vehicle_id in vehicle_ids:
+            slots[("vehicle", vehicle_id)].append(slot)
+    return sweep_slot_conflicts(slots)
+
+
+def find_timedelta_conflicts(time_diff):
     """
-    Handler for csv roster imports
+    Sweep over the slots all the active rosters would occupy with the given
+    roster timedelta. Returns a dict of roster id to a list of
+    (field, roster id) conflicts.
     """
+    slots = defaultdict(list)
+    rosters = Roster.objects.filter(is_active=True).values_list(
+        "id",
+        "driver_id",
+        "vehicle_id",
+        "slot_start_time",
+        "slot_end_time",
+        "start_date",
+        "end_date",
+    )
+    for roster_id, driver_id, vehicle_id, start_time, end_time, start_date, end_date in rosters:
+        for dates, seconds in RosterSlot.get_segments(
+            start_time, end_time, start_date, end_date, time_diff,
+        ):
+            slot = (dates.lower, dates.upper, seconds.lower, seconds.upper, roster_id)
+            if driver_id is not None:
+                slots[("driver", driver_id)].append(slot)
+            if vehicle_id is not None:
+                slots[("vehicle", vehicle_id)].append(slot)
+    return sweep_slot_conflicts(slots)
+
 
-    clean_data = file.read().decode().strip()
-    lines = clean_data.split("\n")
-    added, invalid, skipped, no_license = 0, 0, 0, 0
-    for lineno, line in enumerate(lines[1:], 1):
-        fields = line.split(",")
+def sweep_slot_conflicts(slots):
+    """
+    Sweep over the (start date, end date, start, end, owner) slots of each
+    driver/vehicle, the owner is None for existing rosters, which are not
+    checked against each other. Returns a dict of owner to a list of
+    (field, owner) conflicts.
+    """
+    conflicts = defaultdict(list)
+    for (field, __), items in slots.items():
+        items.sort(key=lambda item: item[:4])
+        active = []
+        for start_date, end_date, start, end, owner in items:
+            active = [item for item in active if item[1] >= start_date]
+            for other in active:
+                if other[4] == owner or (other[4] is None and owner is None):
+                    continue
+                if other[2] <= end and start <= other[3]:
+                    if owner is not None:
+                        conflicts[owner].append((field, other[4]))
+                    if other[4] is not None:
+                        conflicts[other[4]].append((field, owner))
+            active.append((start_date, end_date, start, end, owner))
+    return conflicts
+
+
+def roster_import_csv_handler(file, user):
+    """
+    Handler for csv roster imports. Returns the number of rosters added
+    and a list of (line number, error) for the skipped lines.
+    """
+    lines = file.read().decode().strip().splitlines()
+    errors = []
+    parsed = {}
+    for lineno, fields in enumerate(csv.reader(lines[1:]), 1):
         try:
-            (
-                driver,
-                vehicle,
-                client_store,
-                start_date,
-                end_date,
-                holiday,
-                start_time,
-                end_time,
-                lat,
-                long,
-                destination_station,
-            ) = fields
-        except Exception:
-            return (-1, -1, -1, -1)
-        client_obj = ClientStore.objects.filter(
-            name__iexact=client_store
-        ).first()
-        driver_obj = Driver.objects.filter(
-            mobile_no=int(driver),
+            parsed[lineno] = parse_roster_line(fields)
+        except ValueError:
+            errors.append((lineno, "invalid line"))
+
+    # one lookup per referenced model
+    stores = {
+        obj.lname: obj
+        for obj in ClientStore.objects.annotate(lname=Lower("name")).filter(
+            lname__in={row["client_store"] for row in parsed.values()},
+        ).select_related("client")
+    }
+    drivers = {
+        obj.onboarding.mobile_no: obj
+        for obj in Driver.objects.filter(
+            onboarding__mobile_no__in={row["driver"] for row in parsed.values()},
             is_active=True,
-        ).first()
-        vehicle_obj = Vehicle.objects.filter(
-            registration_number=vehicle,
+        ).select_related("onboarding")
+    }
+    vehicles = {
+        obj.registration_number: obj
+        for obj in Vehicle.objects.filter(
+            registration_number__in={row["vehicle"] for row in parsed.values()},
             is_active=True,
-        ).first()
-        destination = Station.objects.filter(
-            name__iexact=destination_station,
-            is_active=True
-        ).first()
-        start_date = datetime.strptime(start_date, "%Y-%m-%d").date()
-        end_date = datetime.strptime(end_date, "%Y-%m-%d").date()
-        if holiday:
-            holiday = [datetime.strptime(day, "%Y-%m-%d").date() for day in holiday.split("|")]
-        else: 
-            holiday = []
-        slot_start = datetime.strptime(start_time, "%I:%M %p").time()
-        slot_end = datetime.strptime(end_time, "%I:%M %p").time()
-        lat = float(lat)
-        long = float(long)
-        
-        if client_obj and driver_obj and vehicle_obj and destination:
-            if (
-                Roster.is_valid_vehicle_entry(
-                    vehicle_obj, slot_start, slot_end, start_date, end_date
-                ) is False and
-                Roster.is_valid_driver_entry(
-                    driver_obj, slot_start, slot_end, start_date, end_date
-                ) is False
-            ):
-                continue
-            if (
-                driver_obj.has_driver_license is False and
-                vehicle_obj.speed is Vehicle.SPEED.HIGH
-            ):
-                no_license += 1
-                continue
-            qs = Roster.objects.filter(
-                driver=driver_obj,
-                client_store=client_obj,
-                vehicle=vehicle_obj,
-                start_date=start_date,
-                end_date=end_date,
-                slot_start_time=slot_start,
-                slot_end_time=slot_end,
-                destination_station=destination,
-            )
-            if not qs:
-                added += 1
-                Roster.objects.create(
-                    driver=driver_obj,
-                    client_store=client_obj,
-                    client=client_obj.client,
-                    client_name=client_obj.name,
-                    city=client_obj.city,
-                    vehicle=vehicle_obj,
-                    start_date=start_date,
-                    end_date=end_date,
-                    holiday=holiday,
-                    slot_start_time=slot_start,
-                    slot_end_time=slot_end,
-                    lat=lat,
-                    long=long,
-                    address=client_obj.address,
-                    destination_station=destination,
-                    created_by=user,
-                )
-            else:
-                skipped += 1
+        )
+    }
+    stations = {
+        obj.lname: obj
+        for obj in Station.objects.annotate(lname=Lower("name")).filter(
+            lname__in={row["destination_station"] for row in parsed.values()},
+            is_active=True,
+        )
+    }
+
+    rows = {}
+    for lineno, row in parsed.items():
+        row["client_store"] = stores.get(row["client_store"])
+        row["driver"] = drivers.get(row["driver"])
+        row["vehicle"] = vehicles.get(row["vehicle"])
+        row["destination_station"] = stations.get(row["destination_station"])
+        if row["client_store"] is None:
+            errors.append((lineno, "client store not found"))
+        elif row["driver"] is None:
+            errors.append((lineno, "driver not found"))
+        elif row["vehicle"] is None:
+            errors.append((lineno, "vehicle not found"))
+        elif row["destination_station"] is None:
+            errors.append((lineno, "destination station not found"))
+        elif row["vehicle"].status in [
+            Vehicle.STATUS.UNDER_MAINTENANCE.value,
+            Vehicle.STATUS.UNDER_SERVICING.value,
+        ]:
+            errors.append((lineno, "vehicle is under servicing/maintanence"))
+        elif (
+            row["driver"].onboarding.has_driver_license is False and
+            row["vehicle"].speed == Vehicle.SPEED.HIGH
+        ):
+            errors.append((lineno, "cannot assign high speed vehicle to driver without license"))
+        else:
+            rows[lineno] = row
+
+    # the first line wins for conflicts within the csv
+    conflicts = find_roster_conflicts(rows, Config.get_timedelta())
+    accepted = []
+    for lineno in sorted(rows):
+        error = None
+        for field, other in conflicts.get(lineno, []):
+            if other is None:
+                error = f"{field} already occupied"
+                break
+            if other in accepted:
+                error = f"{field} already occupied in line {other}"
+                break
+        if error is not None:
+            errors.append((lineno, error))
         else:
-            if not driver_obj:
-                logger.error(
-                    "{} ERROR invalid driver for roster in line {}".format(
-                        datetime.now(),
-                        lineno,
-                    )
+            accepted.append(lineno)
+
+    rosters = []
+    for lineno in accepted:
+        row = rows[lineno]
+        client_store = row["client_store"]
+        roster = Roster(
+            driver=row["driver"],
+            client_store=client_store,
+            client=client_store.client,
+            city=client_store.city,
+            vehicle=row["vehicle"],
+            start_date=row["start_date"],
+            end_date=row["end_date"],
+            holiday=row["holiday"],
+            slot_start_time=row["slot_start_time"],
+            slot_end_time=row["slot_end_time"],
+            lat=row["lat"],
+            long=row["long"],
+            address=client_store.address,
+            destination_station=row["destination_station"],
+            created_by=user,
+        )
+        roster.cost = pricing_table.get(
+            client_store.client_id,
+            client_store.id,
+            roster.type,
+            roster.vehicle.model,
+        )
+        rosters.append(roster)
+
+    # bulk_create skips the roster signals, apply their effects in batches
+    time_diff = Config.get_timedelta()
+    with transaction.atomic():
+        Roster.objects.bulk_create(rosters, batch_size=500)
+        RosterSlot.objects.bulk_create(
+            [
+                RosterSlot(
+                    roster=roster,
+                    driver_id=roster.driver_id,
+                    vehicle_id=roster.vehicle_id,
+                    dates=dates,
+                    seconds=seconds,
                 )
-            if not vehicle_obj:
-                logger.error(
-                    "{} ERROR invalid vehicle for roster in line {}".format(
-                        datetime.now(),
-                        lineno,
-                    )
+                for roster in rosters
+                for dates, seconds in RosterSlot.get_segments(
+                    roster.slot_start_time,
+                    roster.slot_end_time,
+                    roster.start_date,
+                    roster.end_date,
+                    time_diff,
                 )
-            if not destination:
-                logger.error(
-                    "{} ERROR invalid destination in line {}".format(
-                        datetime.now(),
-                        lineno,
-                    )
+            ],
+            batch_size=1000,
+        )
+        Vehicle.objects.filter(
+            id__in={roster.vehicle_id for roster in rosters},
+        ).update(status=Vehicle.STATUS.ON_GROUND)
+        invalidate_roster_feeds(roster.driver.user_id for roster in rosters)
+
+    errors.sort()
+    for lineno, error in errors:
+        logger.error(
+            "{} ERROR {} for roster in line {}".format(
+                datetime.now(),
+                error,
+                lineno,
+            )
+        )
+    return len(rosters), errors
+
+
+def suggest_vehicles(lat, long, busy, limit):
+    """
+    Nearest vehicles ready for deployment and free in the slot, by the
+    distance of their station
+    """
+    vehicles = Vehicle.objects.filter(
+        is_active=True,
+        status=Vehicle.STATUS.FOR_DEPLOYMENT,
+    ).exclude(
+        id__in=busy.filter(vehicle__isnull=False).values("vehicle_id"),
+    ).values_list("id", "registration_number", "station_id", "station__lat", "station__long")
+    # vehicles are parked at a handful of stations
+    distances = {}
+    for __, __, station_id, station_lat, station_long in vehicles:
+        if station_id not in distances:
+            distances[station_id] = haversine(lat, long, station_lat, station_long)
+    nearest = heapq.nsmallest(
+        limit,
+        vehicles,
+        key=lambda vehicle: (distances[vehicle[2]], vehicle[0]),
+    )
+    return [
+        {
+            "vehicle": vehicle_id,
+            "registration_number": registration_number,
+            "station": station_id,
+            "distance": round(distances[station_id], 3),
+        }
+        for vehicle_id, registration_number, station_id, __, __ in nearest
+    ]
+
+
+def suggest_drivers(lat, long, busy, start_date, limit):
+    """
+    Nearest drivers free in the slot, by their last known position.
+    Drivers never seen follow the located ones.
+    """
+    drivers = dict(
+        Driver.objects.filter(
+            Q(dol__isnull=True) | Q(dol__gte=start_date),
+            is_active=True,
+        ).exclude(
+            id__in=busy.filter(driver__isnull=False).values("driver_id"),
+        ).values_list("id", "onboarding__mobile_no")
+    )
+    positions = get_live_positions(drivers)
+    located = heapq.nsmallest(
+        limit,
+        (
+            (haversine(lat, long, driver_lat, driver_long), driver_id, seen_at)
+            for driver_id, (driver_lat, driver_long, seen_at) in positions.items()
+        ),
+    )
+    suggestions = [
+        {
+            "driver": driver_id,
+            "mobile_no": drivers[driver_id],
+            "distance": round(distance, 3),
+            "seen_at": seen_at.isoformat(),
+        }
+        for distance, driver_id, seen_at in located
+    ]
+    unseen = sorted(driver_id for driver_id in drivers if driver_id not in positions)
+    for driver_id in unseen[:limit - len(suggestions)]:
+        suggestions.append(
+            {
+                "driver": driver_id,
+                "mobile_no": drivers[driver_id],
+                "distance": None,
+                "seen_at": None,
+            }
+        )
+    return suggestions
+
+
+def suggest_assignments(
+    client_store,
+    start_time,
+    end_time,
+    start_date,
+    end_date,
+    limit=SUGGESTION_LIMIT,
+    roster_id=None,
+):
+    """
+    Returns the nearest available vehicles and drivers to a client store
+    for a roster slot, the roster being edited does not block itself
+    """
+    busy = RosterSlot.overlapping(
+        start_time,
+        end_time,
+        start_date,
+        end_date,
+        Config.get_timedelta(),
+    )
+    if roster_id is not None:
+        busy = busy.exclude(roster_id=roster_id)
+    return {
+        "vehicles": suggest_vehicles(client_store.lat, client_store.long, busy, limit),
+        "drivers": suggest_drivers(
+            client_store.lat, client_store.long, busy, start_date, limit
+        ),
+    }
+
+
+def get_open_rosters(start_date, end_date, client=None):
+    """
+    Active rosters of the dates still missing a vehicle, or a driver for
+    non rental rosters
+    """
+    qs = Roster.objects.filter(
+        Q(vehicle__isnull=True) | (Q(driver__isnull=True) & ~Q(type=Roster.TYPE.RENTAL)),
+        is_active=True,
+        start_date__lte=end_date,
+        end_date__gte=start_date,
+    )
+    if client is not None:
+        qs = qs.filter(client=client)
+    return qs.order_by("id")
+
+
+def get_busy_slots(first, last):
+    """
+    Existing roster slots between the dates as (driver id, vehicle id,
+    first day, last day, first second, last second)
+    """
+    existing = RosterSlot.objects.filter(
+        dates__overlap=DateRange(first, last, "[]"),
+    ).values_list("driver_id", "vehicle_id", "dates", "seconds")
+    # ranges are returned in the canonical [) form
+    return [
+        (
+            driver_id,
+            vehicle_id,
+            dates.lower,
+            dates.upper - timedelta(days=1),
+            seconds.lower,
+            seconds.upper - 1,
+        )
+        for driver_id, vehicle_id, dates, seconds in existing
+    ]
+
+
+def plan_roster_assignments(start_date, end_date, client=None, candidates=ASSIGNMENT_CANDIDATES):
+    """
+    Assign free vehicles, then drivers, to the open rosters of the dates
+    with the least total distance. Every vehicle and driver is given to
+    one roster at most, high speed vehicles only go with licensed drivers.
+    Returns the number of open rosters and the planned assignments.
+    """
+    rosters = list(
+        get_open_rosters(start_date, end_date, client).values(
+            "id",
+            "type",
+            "lat",
+            "long",
+            "start_date",
+            "end_date",
+            "slot_start_time",
+            "slot_end_time",
+            "driver_id",
+            "vehicle_id",
+            "vehicle__speed",
+            "driver__onboarding__has_driver_license",
+        )
+    )
+    if not rosters:
+        return 0, []
+
+    time_diff = Config.get_timedelta()
+    for roster in rosters:
+        roster["segments"] = [
+            (dates.lower, dates.upper, seconds.lower, seconds.upper)
+            for dates, seconds in RosterSlot.get_segments(
+                roster["slot_start_time"],
+                roster["slot_end_time"],
+                roster["start_date"],
+                roster["end_date"],
+                time_diff,
+            )
+        ]
+    slots = get_busy_slots(
+        min(segment[0] for roster in rosters for segment in roster["segments"]),
+        max(segment[1] for roster in rosters for segment in roster["segments"]),
+    )
+    for roster in rosters:
+        roster["busy_drivers"], roster["busy_vehicles"] = set(), set()
+        for driver_id, vehicle_id, first, last, start, end in slots:
+            if any(
+                first <= segment[1] and segment[0] <= last and
+                start <= segment[3] and segment[2] <= end
+                for segment in roster["segments"]
+            ):
+                roster["busy_drivers"].add(driver_id)
+                roster["busy_vehicles"].add(vehicle_id)
+
+    # vehicles, by the distance of their station
+    vehicles = {
+        vehicle_id: (registration_number, speed, station_id, station_lat, station_long)
+        for vehicle_id, registration_number, speed, station_id, station_lat, station_long in
+        Vehicle.objects.filter(
+            is_active=True,
+            status=Vehicle.STATUS.FOR_DEPLOYMENT,
+        ).values_list(
+            "id", "registration_number", "speed", "station_id", "station__lat", "station__long"
+        )
+    }
+    stations = {vehicle[2]: vehicle[3:] for vehicle in vehicles.values()}
+    need_vehicle = [roster for roster in rosters if roster["vehicle_id"] is None]
+    costs = []
+    for roster in need_vehicle:
+        # the driver already on the roster may not drive high speed vehicles
+        licensed = roster["driver_id"] is None or roster["driver__onboarding__has_driver_license"]
+        distances = {
+            station_id: int(haversine(roster["lat"], roster["long"], lat, long) * 1000)
+            for station_id, (lat, long) in stations.items()
+        }
+        costs.append(
+            dict(
+                heapq.nsmallest(
+                    candidates,
+                    (
+                        (vehicle_id, distances[vehicle[2]])
+                        for vehicle_id, vehicle in vehicles.items()
+                        if vehicle_id not in roster["busy_vehicles"]
+                        and (licensed or vehicle[1] != Vehicle.SPEED.HIGH)
+                    ),
+                    key=lambda item: item[1],
+                )
+            )
+        )
+    for row, vehicle_id in min_cost_assignment(costs).items():
+        roster = need_vehicle[row]
+        roster["new_vehicle"] = vehicle_id
+        roster["vehicle_distance"] = costs[row][vehicle_id] / 1000
+        roster["vehicle__speed"] = vehicles[vehicle_id][1]
+
+    # drivers, by their last known position
+    drivers = {
+        driver_id: (mobile_no, has_driver_license)
+        for driver_id, mobile_no, has_driver_license in Driver.objects.filter(
+            Q(dol__isnull=True) | Q(dol__gte=start_date),
+            is_active=True,
+        ).values_list("id", "onboarding__mobile_no", "onboarding__has_driver_license")
+    }
+    positions = get_live_positions(drivers)
+    need_driver = [
+        roster for roster in rosters
+        if roster["driver_id"] is None and roster["type"] != Roster.TYPE.RENTAL
+    ]
+    costs = []
+    for roster in need_driver:
+        licensed_only = roster["vehicle__speed"] == Vehicle.SPEED.HIGH
+        distances = []
+        for driver_id, (__, has_driver_license) in drivers.items():
+            if driver_id in roster["busy_drivers"] or (licensed_only and not has_driver_license):
+                continue
+            if driver_id in positions:
+                lat, long, __ = positions[driver_id]
+                distance = haversine(roster["lat"], roster["long"], lat, long)
+            else:
+                distance = UNKNOWN_DRIVER_DISTANCE
+            distances.append((driver_id, int(distance * 1000)))
+        costs.append(dict(heapq.nsmallest(candidates, distances, key=lambda item: item[1])))
+    for row, driver_id in min_cost_assignment(costs).items():
+        roster = need_driver[row]
+        roster["new_driver"] = driver_id
+        roster["driver_distance"] = (
+            costs[row][driver_id] / 1000 if driver_id in positions else None
+        )
+
+    plan = []
+    for roster in rosters:
+        if "new_vehicle" not in roster and "new_driver" not in roster:
+            continue
+        vehicle_id = roster.get("new_vehicle")
+        driver_id = roster.get("new_driver")
+        plan.append(
+            {
+                "roster": roster["id"],
+                "vehicle": vehicle_id,
+                "registration_number": vehicles[vehicle_id][0] if vehicle_id else None,
+                "vehicle_distance": roster.get("vehicle_distance"),
+                "driver": driver_id,
+                "mobile_no": drivers[driver_id][0] if driver_id else None,
+                "driver_distance": roster.get("driver_distance"),
+            }
+        )
+    return len(rosters), plan
+
+
+def get_assignment_error(vehicle, driver):
+    """
+    Returns why the vehicle and driver can't be assigned to a roster, the
+    checks of Roster.clean the slot constraints don't cover, or None
+    """
+    if vehicle is not None:
+        if vehicle.is_active is False:
+            return "vehicle is inactive"
+        if vehicle.status in [
+            Vehicle.STATUS.UNDER_MAINTENANCE.value,
+            Vehicle.STATUS.UNDER_SERVICING.value,
+        ]:
+            return "vehicle is under servicing/maintanence"
+    if (
+        driver is not None and vehicle is not None and
+        driver.onboarding.has_driver_license is False and
+        vehicle.speed == Vehicle.SPEED.HIGH
+    ):
+        return "cannot assign high speed vehicle to driver without license"
+    return None
+
+
+def apply_roster_assignments(plan):
+    """
+    Save the planned vehicles and drivers on the rosters still missing
+    them. A roster is skipped when its slot was taken in the meantime or
+    the pair is no longer valid. Returns the updated rosters and the
+    skipped roster ids.
+    """
+    rosters = Roster.objects.in_bulk([item["roster"] for item in plan])
+    updated, skipped = [], []
+    for item in plan:
+        roster = rosters.get(item["roster"])
+        if roster is None:
+            skipped.append(item["roster"])
+            continue
+        if item["vehicle"] is not None and roster.vehicle_id is None:
+            roster.vehicle_id = item["vehicle"]
+        if item["driver"] is not None and roster.driver_id is None:
+            roster.driver_id = item["driver"]
+        error = get_assignment_error(roster.vehicle, roster.driver)
+        if error is not None:
+            logger.warning("{} ERROR roster {} assignment {}".format(datetime.now(), roster.id, error))
+            skipped.append(roster.id)
+            continue
+        try:
+            roster.save()
+        except IntegrityError:
+            logger.warning("{} ERROR roster {} assignment conflicts".format(datetime.now(), roster.id))
+            skipped.append(roster.id)
+            continue
+        updated.append(roster)
+    return updated, skipped
+
+
+def track_distance(points, max_speed=TRIP_MAX_SPEED):
+    """
+    Returns the km travelled along time ordered (lat, long, timestamp)
+    points, steps faster than max_speed km/h are skipped. The skipped ping
+    is still the start of the next step, a noisy first ping would reject
+    all the others.
+    """
+    distance = 0
+    previous = None
+    for lat, long, timestamp in points:
+        if previous is not None:
+            step = haversine(previous[0], previous[1], lat, long)
+            if step <= max_speed * (timestamp - previous[2]).total_seconds() / 3600:
+                distance += step
+        previous = (lat, long, timestamp)
+    return distance
+
+
+def is_odometer_mismatch(start_km, end_km, gps_km):
+    """
+    Returns true when the odometer km of a trip diverge from the gps km
+    """
+    if start_km is None or end_km is None or gps_km is None:
+        return False
+    allowed = max(TRIP_DISTANCE_MIN_DIFF, gps_km * TRIP_DISTANCE_TOLERANCE)
+    return abs((end_km - start_km) - gps_km) > allowed
+
+
+def compute_trip_distances(day):
+    """
+    Store the gps km of the trips ended on the day and flag the ones whose
+    odometer diverges. The pings of all the drivers are read in one pass
+    ordered by driver, each trip is cut out of the track of the driver who
+    drove it.
+    """
+    start = timezone.make_aware(datetime.combine(day, time.min))
+    trips = defaultdict(list)
+    for trip in Trip.objects.filter(
+        ended_at__gte=start,
+        ended_at__lt=start + timedelta(days=1),
+        driver__isnull=False,
+    ).values_list("id", "driver_id", "created_at", "ended_at", "start_km", "end_km"):
+        trips[trip[1]].append(trip)
+    if not trips:
+        return 0
+    first = min(trip[2] for items in trips.values() for trip in items)
+    last = max(trip[3] for items in trips.values() for trip in items)
+
+    # pings of the rolled up months only survive in the hourly tracks
+    tracks = defaultdict(list)
+    for driver_id, points in DriverLocationTrack.objects.filter(
+        driver_id__in=list(trips),
+        hour__gte=first.replace(minute=0, second=0, microsecond=0),
+        hour__lt=last,
+    ).order_by("driver_id", "hour").values_list("driver_id", "points"):
+        tracks[driver_id].extend(decode_track(points))
+    rows = DriverLocations.objects.filter(
+        driver_id__in=list(trips),
+        created_at__gte=first,
+        created_at__lte=last,
+    ).order_by("driver_id", "created_at").values_list(
+        "driver_id",
+        "lat",
+        "long",
+        "created_at",
+    ).iterator(chunk_size=10000)
+
+    def driver_points():
+        for driver_id, group in groupby(rows, key=lambda row: row[0]):
+            points = [(lat, long, created_at) for __, lat, long, created_at in group]
+            if driver_id in tracks:
+                points = sorted(tracks.pop(driver_id) + points, key=lambda point: point[2])
+            yield driver_id, points
+        yield from tracks.items()
+
+    now = timezone.now()
+    updated = []
+    for driver_id, points in driver_points():
+        timestamps = [point[2] for point in points]
+        for trip_id, __, created_at, ended_at, start_km, end_km in trips.pop(driver_id, []):
+            trip_points = points[
+                bisect_left(timestamps, created_at):bisect_left(timestamps, ended_at)
+            ]
+            gps_km = round(track_distance(trip_points), 3) if len(trip_points) > 1 else None
+            updated.append(
+                Trip(
+                    id=trip_id,
+                    gps_km=gps_km,
+                    odometer_mismatch=is_odometer_mismatch(start_km, end_km, gps_km),
+                    updated_at=now,
                 )
-            invalid += 1
-    return (added, skipped, invalid, no_license)
+            )
+    # trips without any ping
+    for items in trips.values():
+        updated.extend(
+            Trip(id=trip[0], gps_km=None, odometer_mismatch=False, updated_at=now)
+            for trip in items
+        )
+    # bulk_update skips auto_now, bump updated_at for the delta sync
+    Trip.objects.bulk_update(
+        updated, ["gps_km", "odometer_mismatch", "updated_at"], batch_size=1000
+    )
+    return len(updated)
+
+
+def get_roster_feed(driver):
+    """
+    Returns the serialized active rosters of the driver, from the cache
+    when possible
+    """
+    key = ROSTER_FEED_KEY.format(driver.user_id)
+    feed = cache.get(key)
+    if feed is None:
+        rosters = Roster.objects.filter(
+            driver=driver,
+            is_active=True,
+        ).select_related(
+            "client_store",
+            "vehicle",
+            "destination_station",
+        ).order_by("start_date", "slot_start_time")
+        feed = RosterFeedSerializer(rosters, many=True).data
+        cache.set(key, feed, timeout=ROSTER_FEED_TIMEOUT)
+    return feed
+
+
+def invalidate_roster_feeds(user_ids):
+    """
+    Drop the cached roster feeds of the users once the transaction commits
+    """
+    keys = [ROSTER_FEED_KEY.format(user_id) for user_id in set(user_ids) if user_id is not None]
+    if keys:
+        transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def is_too_early_to_start(roster, start_time):
+    """
+    Returns true when the naive local start_time is earlier than the slot
+    start of the roster by more than the start ride delta
+    """
+    roster_start_time = datetime.combine(start_time.date(), roster.slot_start_time)
+    roster_start_delta = roster.start_ride_delta or TRIP_START_TIME_DELTA
+    return (
+        start_time <= roster_start_time and
+        (roster_start_time - start_time).seconds / 60 > roster_start_delta
+    )
+
+
+# event type: (stored type, the fields it carries, the statuses it may follow)
+TRIP_EVENT_TYPES = {
+    "start_ride": (TripEvent.TYPE.START_RIDE, ["start_km"], None),
+    "check_in": (
+        TripEvent.TYPE.CHECK_IN,
+        ["in_latitude", "in_longitude"],
+        [Trip.STATUS.RIDE_STARTED],
+    ),
+    "check_out": (
+        TripEvent.TYPE.CHECK_OUT,
+        ["out_latitude", "out_longitude"],
+        [Trip.STATUS.CHECK_IN],
+    ),
+    "end_ride": (
+        TripEvent.TYPE.END_RIDE,
+        ["end_km", "trip_sheet_photo"],
+        [Trip.STATUS.RIDE_STARTED, Trip.STATUS.CHECK_IN, Trip.STATUS.CHECK_OUT],
+    ),
+}
+
+
+def parse_trip_events(items):
+    """
+    Validate the uploaded trip events, returns None when the batch is
+    malformed
+    """
+    if not isinstance(items, list) or not 0 < len(items) <= TRIP_EVENT_BATCH_LIMIT:
+        return None
+    latest = timezone.now() + timedelta(seconds=TRIP_EVENT_MAX_CLOCK_SKEW)
+    events = []
+    for item in items:
+        try:
+            key = str(item["key"])
+            timestamp = parse_datetime(item["timestamp"])
+            event = {
+                "key": key,
+                "type": item["type"],
+                "roster": int(item["roster"]),
+                "timestamp": timestamp,
+                "data": item,
+            }
+        except (KeyError, TypeError, ValueError):
+            return None
+        if (
+            not 0 < len(key) <= 64 or
+            event["type"] not in TRIP_EVENT_TYPES or
+            timestamp is None or
+            timezone.is_naive(timestamp) or
+            timestamp > latest
+        ):
+            return None
+        events.append(event)
+    return events
+
+
+def apply_trip_event(trip, event):
+    """
+    Apply a check in, check out or end ride event to a trip, returns an
+    error or None
+    """
+    __, fields, statuses = TRIP_EVENT_TYPES[event["type"]]
+    if trip is None:
+        return TRIP_NOT_FOUND
+    if trip.status == Trip.STATUS.RIDE_COMPLETED:
+        return TRIP_ENDED_ALREADY
+    if trip.status not in statuses:
+        return TRIP_INVALID_ACTION
+    try:
+        values = {
+            field: event["data"][field] if field == "trip_sheet_photo" else float(event["data"][field])
+            for field in fields
+        }
+    except (KeyError, TypeError, ValueError):
+        return INVALID_DATA
+    for field, value in values.items():
+        setattr(trip, field, value)
+    if event["type"] == "check_in":
+        trip.checkin_time = event["timestamp"]
+        trip.status = Trip.STATUS.CHECK_IN
+    elif event["type"] == "check_out":
+        trip.checkout_time = event["timestamp"]
+        trip.status = Trip.STATUS.CHECK_OUT
+    else:
+        trip.ended_at = event["timestamp"]
+        trip.status = Trip.STATUS.RIDE_COMPLETED
+        trip.is_active = False
+    return None
+
+
+def start_trip(driver, roster, event, day):
+    """
+    Create the trip of a start ride event, returns the trip and an error
+    """
+    if not roster.is_assigned:
+        return None, ROSTER_NOT_ASSIGNED
+    if roster.vehicle_id is None:
+        return None, TRIP_VEHICLE_NOT_ASSIGNED
+    if is_too_early_to_start(roster, timezone.localtime(event["timestamp"]).replace(tzinfo=None)):
+        return None, TRIP_CANNOT_START
+    if roster.has_active_trip:
+        return None, PREVIOUS_TRIP_ACTIVE
+    try:
+        start_km = float(event["data"]["start_km"])
+    except (KeyError, TypeError, ValueError):
+        return None, INVALID_DATA
+    trip = Trip(
+        roster=roster,
+        driver=driver,
+        start_km=start_km,
+        status=Trip.STATUS.RIDE_STARTED,
+        vehicle_photos=event["data"].get("vehicle_photos") or [],
+        is_active=True,
+        trip_date=day,
+    )
+    try:
+        with transaction.atomic():
+            trip.save()
+    except IntegrityError:
+        return None, ROSTER_TRIP_COMPLETED_ALREADY
+    # the trip starts at the client time of the event
+    Trip.objects.filter(id=trip.id).update(created_at=event["timestamp"])
+    trip.created_at = event["timestamp"]
+    roster.has_active_trip = True
+    return trip, None
+
+
+def apply_trip_event_group(driver, roster, group, applied):
+    """
+    Apply the events of a driver for a roster in client time order, under
+    a lock of the trips of the roster. A start ride event starts a trip on
+    its local day, the other events apply to the active or latest trip, a
+    shift may cross midnight. Returns the result of each event keyed by
+    id(event) and the keys applied.
+    """
+    results = {}
+    keys = set()
+    trip = Trip.objects.select_for_update().filter(
+        roster_id=roster.id,
+    ).order_by("-is_active", "-created_at").first()
+    # keys applied by another upload of the driver since the batch started
+    applied = applied | set(
+        TripEvent.objects.filter(
+            driver=driver,
+            key__in=[event["key"] for event in group],
+        ).values_list("key", flat=True)
+    )
+    changed = False
+    trip_events = []
+    for event in sorted(group, key=lambda event: event["timestamp"]):
+        if event["key"] in applied or event["key"] in keys:
+            results[id(event)] = {"status": "duplicate"}
+            continue
+        if event["type"] == "start_ride":
+            new_trip, error = start_trip(driver, roster, event, timezone.localdate(event["timestamp"]))
+            if error is None:
+                if changed:
+                    trip.save()
+                    changed = False
+                trip = new_trip
+        else:
+            error = apply_trip_event(trip, event)
+            changed = changed or error is None
+            if error is None and not trip.is_active:
+                # a later day of the roster may start again
+                roster.has_active_trip = False
+        if error is not None:
+            results[id(event)] = {"status": "rejected", "error": error}
+            continue
+        keys.add(event["key"])
+        trip_events.append(
+            TripEvent(
+                driver=driver,
+                key=event["key"],
+                trip=trip,
+                type=TRIP_EVENT_TYPES[event["type"]][0],
+                timestamp=event["timestamp"],
+            )
+        )
+        results[id(event)] = {"status": "applied", "trip": trip.id}
+    if changed:
+        trip.save()
+    TripEvent.objects.bulk_create(trip_events)
+    return results, keys
+
+
+def apply_trip_events(driver, events):
+    """
+    Apply the trip events of a driver in one transaction. Events are
+    grouped by roster, each group is applied in a savepoint. Events whose
+    key the driver already applied are reported as duplicates.
+    Returns a result per event, in the order of the events.
+    """
+    results = {}
+    groups = defaultdict(list)
+    for event in events:
+        groups[event["roster"]].append(event)
+    rosters = Roster.with_start_ride_state(driver).in_bulk(list(groups))
+
+    with transaction.atomic():
+        applied = set(
+            TripEvent.objects.filter(
+                driver=driver,
+                key__in=[event["key"] for event in events],
+            ).values_list("key", flat=True)
+        )
+        # a fixed lock order keeps concurrent uploads from deadlocking
+        for roster_id, group in sorted(groups.items(), key=lambda item: item[0]):
+            roster = rosters.get(roster_id)
+            if roster is None or not roster.is_assigned:
+                for event in group:
+                    results[id(event)] = {"status": "rejected", "error": ROSTER_NOT_ASSIGNED}
+                continue
+            has_active_trip = roster.has_active_trip
+            try:
+                with transaction.atomic():
+                    group_results, keys = apply_trip_event_group(driver, roster, group, applied)
+            except IntegrityError:
+                # a concurrent upload of the driver inserted one of the keys
+                # and has committed by now, the retry reports it as duplicate
+                roster.has_active_trip = has_active_trip
+                with transaction.atomic():
+                    group_results, keys = apply_trip_event_group(driver, roster, group, applied)
+            results.update(group_results)
+            applied |= keys
+    return [{"key": event["key"], **results[id(event)]} for event in events]
+
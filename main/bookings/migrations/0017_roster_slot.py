@@ -0,0 +1,110 @@
+# Generated by Django 3.2.13 on 2026-10-18 09:47
+
+import logging
+from datetime import timedelta
+
+from psycopg2.extras import DateRange, NumericRange
+import django.contrib.postgres.constraints
+import django.contrib.postgres.fields.ranges
+from django.contrib.postgres.operations import BtreeGistExtension
+from django.db import migrations, models, transaction
+from django.db.utils import IntegrityError
+import django.db.models.deletion
+
+logger = logging.getLogger(__name__)
+
+SECONDS_IN_DAY = 24 * 60 * 60
+
+
+def get_segments(start_time, end_time, start_date, end_date, time_diff):
+    # frozen copy of RosterSlot.get_segments
+    start = start_time.hour * 3600 + start_time.minute * 60 + start_time.second
+    end = end_time.hour * 3600 + end_time.minute * 60 + end_time.second
+    if end < start:
+        end += SECONDS_IN_DAY
+    end += int(time_diff.total_seconds())
+
+    segments = []
+    lower = start
+    while lower <= end:
+        day = lower // SECONDS_IN_DAY
+        upper = min(end, (day + 1) * SECONDS_IN_DAY - 1)
+        offset = day * SECONDS_IN_DAY
+        segments.append(
+            (
+                DateRange(start_date + timedelta(days=day), end_date + timedelta(days=day), "[]"),
+                NumericRange(lower - offset, upper - offset, "[]"),
+            )
+        )
+        lower = (day + 1) * SECONDS_IN_DAY
+    return segments
+
+
+def create_roster_slots(apps, schema_editor):
+    Config = apps.get_model("config", "Config")
+    Roster = apps.get_model("bookings", "Roster")
+    RosterSlot = apps.get_model("bookings", "RosterSlot")
+    config = Config.objects.filter(key="roster_timedelta").first()
+    time_diff = timedelta(hours=config.value if config else 0)
+    for roster in Roster.objects.filter(is_active=True).order_by("id").iterator():
+        segments = get_segments(
+            roster.slot_start_time,
+            roster.slot_end_time,
+            roster.start_date,
+            roster.end_date,
+            time_diff,
+        )
+        try:
+            with transaction.atomic():
+                RosterSlot.objects.bulk_create(
+                    [
+                        RosterSlot(
+                            roster_id=roster.id,
+                            driver_id=roster.driver_id,
+                            vehicle_id=roster.vehicle_id,
+                            dates=dates,
+                            seconds=seconds,
+                        )
+                        for dates, seconds in segments
+                    ]
+                )
+        except IntegrityError:
+            logger.warning("roster {} conflicts with another roster".format(roster.id))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('drivers', '0013_merge_20221226_1545'),
+        ('fleets', '0012_auto_20221222_1838'),
+        ('bookings', '0016_auto_20221226_1555'),
+        ('config', '0001_initial'),
+    ]
+
+    operations = [
+        BtreeGistExtension(),
+        migrations.CreateModel(
+            name='RosterSlot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dates', django.contrib.postgres.fields.ranges.DateRangeField()),
+                ('seconds', django.contrib.postgres.fields.ranges.IntegerRangeField()),
+                ('driver', models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, to='drivers.driver')),
+                ('roster', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='bookings.roster')),
+                ('vehicle', models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, to='fleets.vehicle')),
+            ],
+            options={
+                'verbose_name': 'Roster Slot',
+                'verbose_name_plural': 'Roster Slots',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='rosterslot',
+            constraint=django.contrib.postgres.constraints.ExclusionConstraint(condition=models.Q(('driver__isnull', False)), expressions=[('driver', '='), ('roster', '<>'), ('dates', '&&'), ('seconds', '&&')], name='exclude_overlapping_driver_slots'),
+        ),
+        migrations.AddConstraint(
+            model_name='rosterslot',
+            constraint=django.contrib.postgres.constraints.ExclusionConstraint(condition=models.Q(('vehicle__isnull', False)), expressions=[('vehicle', '='), ('roster', '<>'), ('dates', '&&'), ('seconds', '&&')], name='exclude_overlapping_vehicle_slots'),
+        ),
+        migrations.RunPython(create_roster_slots, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 3.2.13 on 2026-10-18 10:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0017_roster_slot'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='trip',
+            name='gps_km',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='trip',
+            name='odometer_mismatch',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+    ]
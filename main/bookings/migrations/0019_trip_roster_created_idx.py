@@ -0,0 +1,17 @@
+# Generated by Django 3.2.13 on 2026-10-18 10:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0018_trip_gps_km'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='trip',
+            index=models.Index(fields=['roster', '-created_at'], name='trip_roster_created_idx'),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 3.2.13 on 2026-10-18 10:12
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def set_trip_dates(apps, schema_editor):
+    # only the first trip of a roster on a day gets the date, the
+    # duplicates created before the constraint are left without one
+    schema_editor.execute(
+        """
+        UPDATE bookings_trip SET trip_date = first_trips.trip_date
+        FROM (
+            SELECT DISTINCT ON (roster_id, (created_at AT TIME ZONE %s)::date)
+                id, (created_at AT TIME ZONE %s)::date AS trip_date
+            FROM bookings_trip
+            ORDER BY roster_id, (created_at AT TIME ZONE %s)::date, created_at, id
+        ) AS first_trips
+        WHERE bookings_trip.id = first_trips.id
+        """,
+        [settings.TIME_ZONE] * 3,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0019_trip_roster_created_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='trip',
+            name='trip_date',
+            field=models.DateField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(set_trip_dates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='trip',
+            constraint=models.UniqueConstraint(fields=('roster', 'trip_date'), name='unique_roster_trip_date'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 3.2.13 on 2026-10-18 10:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0020_trip_date'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='roster',
+            index=models.Index(fields=['updated_at', 'id'], name='roster_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='trip',
+            index=models.Index(fields=['updated_at', 'id'], name='trip_updated_idx'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 3.2.13 on 2026-10-18 10:17
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0021_roster_trip_updated_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TripEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=64, unique=True)),
+                ('type', models.PositiveSmallIntegerField(choices=[(0, 'Start Ride'), (1, 'Check In'), (2, 'Check Out'), (3, 'End Ride')])),
+                ('timestamp', models.DateTimeField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('trip', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='bookings.trip')),
+            ],
+            options={
+                'verbose_name': 'Trip Event',
+                'verbose_name_plural': 'Trip Events',
+            },
+        ),
+    ]
@@ -0,0 +1,33 @@
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+import django.db.models.deletion
+
+
+def set_event_drivers(apps, schema_editor):
+    TripEvent = apps.get_model("bookings", "TripEvent")
+    Trip = apps.get_model("bookings", "Trip")
+    TripEvent.objects.update(
+        driver_id=Subquery(
+            Trip.objects.filter(id=OuterRef("trip_id")).values("roster__driver_id")[:1]
+        ),
+    )
+    # the keys of rosters left without a driver can't be scoped any more,
+    # a replay of those events is rejected by the trip state instead
+    TripEvent.objects.filter(driver__isnull=True).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('drivers', '0016_drivercontract_updated_idx'),
+        ('bookings', '0022_tripevent'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tripevent',
+            name='driver',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, to='drivers.driver'),
+        ),
+        migrations.RunPython(set_event_drivers, migrations.RunPython.noop),
+    ]
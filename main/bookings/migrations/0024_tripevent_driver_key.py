@@ -0,0 +1,28 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+    # apart from 0023, the backfilled rows would leave pending trigger
+    # events for the ALTER TABLE
+
+    dependencies = [
+        ('bookings', '0023_tripevent_driver'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='tripevent',
+            name='driver',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to='drivers.driver'),
+        ),
+        migrations.AlterField(
+            model_name='tripevent',
+            name='key',
+            field=models.CharField(max_length=64),
+        ),
+        migrations.AddConstraint(
+            model_name='tripevent',
+            constraint=models.UniqueConstraint(fields=('driver', 'key'), name='unique_driver_trip_event_key'),
+        ),
+    ]
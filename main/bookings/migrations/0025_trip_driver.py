@@ -0,0 +1,47 @@
+# Generated by Django 3.2.13 on 2026-10-18 10:43
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+from django.db.models.functions import Coalesce
+import django.db.models.deletion
+
+
+def set_trip_drivers(apps, schema_editor):
+    # the driver of the roster at the start of the trip, from the roster
+    # driver logs, the current driver when the roster never changed hands
+    Trip = apps.get_model("bookings", "Trip")
+    Roster = apps.get_model("bookings", "Roster")
+    RosterDriverLog = apps.get_model("bookings", "RosterDriverLog")
+    logs = RosterDriverLog.objects.filter(roster_id=OuterRef("roster_id"))
+    Trip.objects.update(
+        driver_id=Coalesce(
+            Subquery(
+                logs.filter(created_at__lte=OuterRef("created_at")).order_by(
+                    "-created_at", "-id",
+                ).values("new_driver_id")[:1]
+            ),
+            Subquery(
+                logs.filter(created_at__gt=OuterRef("created_at")).order_by(
+                    "created_at", "id",
+                ).values("old_driver_id")[:1]
+            ),
+            Subquery(Roster.objects.filter(id=OuterRef("roster_id")).values("driver_id")[:1]),
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('drivers', '0016_drivercontract_updated_idx'),
+        ('bookings', '0024_tripevent_driver_key'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='trip',
+            name='driver',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.PROTECT, to='drivers.driver'),
+        ),
+        migrations.RunPython(set_trip_drivers, migrations.RunPython.noop),
+    ]
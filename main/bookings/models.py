@@ -1,9 +1,24 @@
 # python imports
 import logging
-from datetime import datetime
+from datetime import datetime, timedelta
 # django imports
-from django.db import models
-from django.contrib.postgres.fields import ArrayField
+from django.db import models, transaction
+from django.db.utils import IntegrityError
+from django.db.models import (
+    Q,
+    BooleanField,
+    Exists,
+    ExpressionWrapper,
+    OuterRef,
+    Subquery,
+)
+from django.contrib.postgres.fields import (
+    ArrayField,
+    DateRangeField,
+    IntegerRangeField,
+)
+from django.contrib.postgres.constraints import ExclusionConstraint
+from psycopg2.extras import DateRange, NumericRange
 from django.core.exceptions import ValidationError
 from smart_selects.db_fields import ChainedForeignKey
 from django.utils.translation import gettext_lazy as _
@@ -93,61 +108,70 @@ class Roster(BaseModel):
         return self.destination_station.long
 
     @classmethod
-    def is_valid_driver_entry(
+    def with_start_ride_state(cls, driver):
+        """
+        Annotate whether the driver is assigned to the roster, whether the
+        roster has an active trip and the start ride delta, so a start ride
+        needs one query. No driver is assigned to any roster.
+        """
+        return cls.objects.annotate(
+            is_assigned=ExpressionWrapper(
+                Q(driver=driver, driver__isnull=False),
+                output_field=BooleanField(),
+            ),
+            has_active_trip=Exists(
+                Trip.objects.filter(roster=OuterRef("pk"), is_active=True),
+            ),
+            start_ride_delta=Subquery(
+                Config.objects.filter(key="roster_start_ride").values("value")[:1],
+            ),
+        ).only("id", "vehicle_id", "slot_start_time")
+
+    @classmethod
+    def is_valid_slot(
         cls,
-        driver,
+        field,
+        value,
         start_time,
         end_time,
         start_date,
         end_date,
         current_id=None,
     ):
-        time_diff = Config.get_timedelta()
-        tmp = datetime(
-            2000,
-            1,
-            1,
-            start_time.hour,
-            start_time.minute,
-            start_time.second,
-        )
-        start_time = (tmp - time_diff).time()
-        tmp = datetime(
-            2000,
-            1,
-            1,
-            end_time.hour,
-            end_time.minute,
-            end_time.second,
-        )
-        end_time = (tmp + time_diff).time()
-        qs = Roster.objects.filter(driver=driver, is_active=True).exclude(id=current_id)
-            
-        # check if the date is overlapping
-        valid = True
-        for obj in qs:
-            if cls.is_date_overlapped(obj.start_date, obj.end_date, start_date, end_date) is True:
-                if cls.is_time_overlapped(obj.slot_start_time, obj.slot_end_time, start_time, end_time) is True:
-                    valid = False
-                    break
-
-        return valid
+        """
+        Returns true if the given driver/vehicle is free in the slot
+        """
+        qs = RosterSlot.overlapping(
+            start_time,
+            end_time,
+            start_date,
+            end_date,
+            Config.get_timedelta(),
+        ).filter(**{field: value})
+        if current_id is not None:
+            qs = qs.exclude(roster_id=current_id)
+        return not qs.exists()
 
     @classmethod
-    def is_time_overlapped(cls, s1, e1, s2, e2):
-        return any(
-            [
-                s1 <= s2 <= e1,
-                s1 <= e2 <= e1,
-                s2 <= s1 <= e2,
-                s2 <= e1 <= e2,
-            ]
+    def is_valid_driver_entry(
+        cls,
+        driver,
+        start_time,
+        end_time,
+        start_date,
+        end_date,
+        current_id=None,
+    ):
+        return cls.is_valid_slot(
+            "driver",
+            driver,
+            start_time,
+            end_time,
+            start_date,
+            end_date,
+            current_id,
         )
 
-    @classmethod
-    def is_date_overlapped(cls, start1, end1, start2, end2):
-        return (start1 <= end2) and (start2 <= end1)
-
     @classmethod
     def is_valid_vehicle_entry(
         cls,
@@ -158,35 +182,15 @@ class Roster(BaseModel):
         end_date,
         current_id=None,
     ):
-        time_diff = Config.get_timedelta()
-        tmp = datetime(
-            2000,
-            1,
-            1,
-            start_time.hour,
-            start_time.minute,
-            start_time.second,
+        return cls.is_valid_slot(
+            "vehicle",
+            vehicle,
+            start_time,
+            end_time,
+            start_date,
+            end_date,
+            current_id,
         )
-        start_time = (tmp - time_diff).time()
-        tmp = datetime(
-            2000,
-            1,
-            1,
-            end_time.hour,
-            end_time.minute,
-            end_time.second,
-        )
-        end_time = (tmp + time_diff).time()
-        qs = Roster.objects.filter(vehicle=vehicle, is_active=True).exclude(id=current_id)
-
-        # check if the date is overlapping
-        valid = True
-        for obj in qs:
-            if cls.is_date_overlapped(obj.start_date, obj.end_date, start_date, end_date) is True:
-                if cls.is_time_overlapped(obj.slot_start_time, obj.slot_end_time, start_time, end_time) is True:
-                    valid = False
-                    break
-        return valid
 
     def clean(self):
         if self.client_store is None:
@@ -230,9 +234,18 @@ class Roster(BaseModel):
             logger.warning("Roster Creation Failed", exc_info=True)
 
 
+    def save(self, *args, **kwargs):
+        # the roster slots are synced in post_save, a conflicting slot
+        # must roll back the roster as well
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
     class Meta:
         verbose_name = "Roster"
         verbose_name_plural = "Rosters"
+        indexes = [
+            models.Index(fields=["updated_at", "id"], name="roster_updated_idx"),
+        ]
 
     @property
     def is_roster_active(self):
@@ -241,6 +254,141 @@ class Roster(BaseModel):
         return diff_end.days >= 0 and diff_start.days >= 0
 
 
+class RosterSlot(models.Model):
+    """
+    Model to store the daily occupancy of an active roster. A slot crossing
+    midnight (or pushed past it by the roster timedelta) is split into one
+    segment per calendar day so that overlaps are plain range overlaps.
+    """
+    SECONDS_IN_DAY = 24 * 60 * 60
+
+    roster = models.ForeignKey("Roster", on_delete=models.CASCADE)
+    driver = models.ForeignKey("drivers.Driver", on_delete=models.PROTECT, null=True)
+    vehicle = models.ForeignKey("fleets.Vehicle", on_delete=models.PROTECT, null=True)
+    dates = DateRangeField()
+    seconds = IntegerRangeField()
+
+    class Meta:
+        verbose_name = "Roster Slot"
+        verbose_name_plural = "Roster Slots"
+        constraints = [
+            ExclusionConstraint(
+                name="exclude_overlapping_driver_slots",
+                expressions=[
+                    ("driver", "="),
+                    ("roster", "<>"),
+                    ("dates", "&&"),
+                    ("seconds", "&&"),
+                ],
+                condition=Q(driver__isnull=False),
+            ),
+            ExclusionConstraint(
+                name="exclude_overlapping_vehicle_slots",
+                expressions=[
+                    ("vehicle", "="),
+                    ("roster", "<>"),
+                    ("dates", "&&"),
+                    ("seconds", "&&"),
+                ],
+                condition=Q(vehicle__isnull=False),
+            ),
+        ]
+
+    @classmethod
+    def get_segments(cls, start_time, end_time, start_date, end_date, time_diff):
+        """
+        Returns the (dates, seconds) ranges occupied by a roster slot.
+        The end of the slot is extended by the roster timedelta, so two
+        slots overlap when they are less than the timedelta apart.
+        """
+        start = start_time.hour * 3600 + start_time.minute * 60 + start_time.second
+        end = end_time.hour * 3600 + end_time.minute * 60 + end_time.second
+        if end < start:
+            # the slot ends on the next day
+            end += cls.SECONDS_IN_DAY
+        end += int(time_diff.total_seconds())
+
+        segments = []
+        lower = start
+        while lower <= end:
+            day = lower // cls.SECONDS_IN_DAY
+            upper = min(end, (day + 1) * cls.SECONDS_IN_DAY - 1)
+            offset = day * cls.SECONDS_IN_DAY
+            segments.append(
+                (
+                    DateRange(
+                        start_date + timedelta(days=day),
+                        end_date + timedelta(days=day),
+                        "[]",
+                    ),
+                    NumericRange(lower - offset, upper - offset, "[]"),
+                )
+            )
+            lower = (day + 1) * cls.SECONDS_IN_DAY
+        return segments
+
+    @classmethod
+    def overlapping(cls, start_time, end_time, start_date, end_date, time_diff):
+        """
+        Returns the slots overlapping the given roster slot
+        """
+        overlaps = Q()
+        for dates, seconds in cls.get_segments(
+            start_time, end_time, start_date, end_date, time_diff
+        ):
+            overlaps |= Q(dates__overlap=dates, seconds__overlap=seconds)
+        return cls.objects.filter(overlaps)
+
+    @classmethod
+    def sync(cls, roster, time_diff=None):
+        """
+        Replace the slots of the roster, only active rosters occupy slots
+        """
+        cls.objects.filter(roster=roster).delete()
+        if roster.is_active is False:
+            return
+        if time_diff is None:
+            time_diff = Config.get_timedelta()
+        cls.objects.bulk_create(
+            [
+                cls(
+                    roster=roster,
+                    driver_id=roster.driver_id,
+                    vehicle_id=roster.vehicle_id,
+                    dates=dates,
+                    seconds=seconds,
+                )
+                for dates, seconds in cls.get_segments(
+                    roster.slot_start_time,
+                    roster.slot_end_time,
+                    roster.start_date,
+                    roster.end_date,
+                    time_diff,
+                )
+            ]
+        )
+
+    @classmethod
+    def rebuild(cls):
+        """
+        Rebuild the slots of all the active rosters in one transaction.
+        Config changes conflicting with the rosters are refused by the admin,
+        rosters which still conflict are left without slots and their ids
+        are returned.
+        """
+        time_diff = Config.get_timedelta()
+        conflicts = []
+        with transaction.atomic():
+            cls.objects.all().delete()
+            for roster in Roster.objects.filter(is_active=True).order_by("id").iterator():
+                try:
+                    with transaction.atomic():
+                        cls.sync(roster, time_diff)
+                except IntegrityError:
+                    conflicts.append(roster.id)
+        return conflicts
+
+
 class Trip(BaseModel):
     """
     Model to store trips records of a roster
@@ -253,6 +401,14 @@ class Trip(BaseModel):
         RIDE_COMPLETED = 3, _("Ride Completed")
 
     roster = models.ForeignKey("Roster", on_delete=models.PROTECT)
+    # driver of the roster when the trip started
+    driver = models.ForeignKey(
+        "drivers.Driver",
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        editable=False,
+    )
     status = models.PositiveSmallIntegerField(
         choices=STATUS.choices,
         null=True,
@@ -268,16 +424,64 @@ class Trip(BaseModel):
     out_longitude = models.FloatField(null=True, blank=True)
     trip_sheet_photo = models.URLField(null=True, blank=True)
     vehicle_photos = ArrayField(models.URLField(), null=True, blank=True)
+    # travelled km from the driver locations, see compute_trip_distances
+    gps_km = models.FloatField(null=True, blank=True, editable=False)
+    odometer_mismatch = models.BooleanField(default=False, editable=False)
+    # local date of the start of the ride, a roster has one trip a day
+    trip_date = models.DateField(null=True, blank=True, editable=False)
 
     class Meta:
         verbose_name = "Trip"
         verbose_name_plural = "Trips"
+        indexes = [
+            models.Index(
+                fields=["roster", "-created_at"],
+                name="trip_roster_created_idx",
+            ),
+            models.Index(fields=["updated_at", "id"], name="trip_updated_idx"),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["roster", "trip_date"],
+                name="unique_roster_trip_date",
+            ),
+        ]
 
     @property
     def vehicle_regd_no(self):
         return self.vehicle.registration_number
 
 
+class TripEvent(models.Model):
+    """
+    Model to store the trip events uploaded by the driver app, the client
+    generated key makes the replay of an event of the driver a no-op
+    """
+    class TYPE(models.IntegerChoices):
+        START_RIDE = 0, _("Start Ride")
+        CHECK_IN = 1, _("Check In")
+        CHECK_OUT = 2, _("Check Out")
+        END_RIDE = 3, _("End Ride")
+
+    driver = models.ForeignKey("drivers.Driver", on_delete=models.PROTECT)
+    key = models.CharField(max_length=64)
+    trip = models.ForeignKey("Trip", on_delete=models.CASCADE)
+    type = models.PositiveSmallIntegerField(choices=TYPE.choices)
+    # client time of the event
+    timestamp = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Trip Event"
+        verbose_name_plural = "Trip Events"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["driver", "key"],
+                name="unique_driver_trip_event_key",
+            ),
+        ]
+
+
 class RosterDriverLog(models.Model):
     roster = models.ForeignKey("Roster", on_delete=models.PROTECT)
     old_driver = models.ForeignKey("drivers.Driver", on_delete=models.PROTECT, null=True, related_name="old_driver")
@@ -2,6 +2,7 @@
 from rest_framework import serializers
 
 # project imports
+from fleets.models import Vehicle, Station
 from fleets.serializers import (
     VehicleSerializer,
     StationSerializer,
@@ -24,3 +25,44 @@ class RosterSerializer(serializers.ModelSerializer):
     class Meta:
         model = Roster
         fields = "__all__"
+
+
+class RosterFeedVehicleSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Vehicle
+        fields = ["id", "registration_number", "model", "type", "speed"]
+
+
+class RosterFeedStationSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Station
+        fields = ["id", "name", "lat", "long"]
+
+
+class RosterFeedSerializer(serializers.ModelSerializer):
+    """
+    Compact roster payload of the driver app home screen
+    """
+    client_store = serializers.CharField(source="client_store.name", default=None)
+    vehicle = RosterFeedVehicleSerializer()
+    destination_station = RosterFeedStationSerializer()
+
+    class Meta:
+        model = Roster
+        fields = [
+            "id",
+            "type",
+            "status",
+            "client_store",
+            "start_date",
+            "end_date",
+            "holiday",
+            "slot_start_time",
+            "slot_end_time",
+            "lat",
+            "long",
+            "address",
+            "vehicle",
+            "destination_station",
+        ]
+
@@ -1,21 +1,51 @@
 # python imports
 import logging
 # django imports
-from django.db.models.signals import post_save, pre_save
+from django.db import transaction
+from django.db.models.signals import post_save, pre_save, post_delete
 from django.dispatch import receiver
 # project imports
-from fleets.models import Vehicle
-from clients.models import Pricing
+from fleets.models import Vehicle, Station
+from clients.models import ClientStore
+from clients.helpers import pricing_table
+from config.models import Config
 from drivers.models import Driver
 # app imports
 from .models import (
     Roster,
+    RosterSlot,
     RosterVehicleLog,
     RosterDriverLog,
 )
+from .helpers import invalidate_roster_feeds
+from .tasks import rebuild_roster_slots
 
 logger = logging.getLogger(__name__)
 
+SLOT_FIELDS = [
+    "is_active",
+    "driver_id",
+    "vehicle_id",
+    "start_date",
+    "end_date",
+    "slot_start_time",
+    "slot_end_time",
+]
+
+
+@receiver(post_save, sender=Roster)
+def sync_roster_slots(sender, instance, created, **kwargs):
+    # keep the roster slots in sync for the conflict checks
+    if created is True or any(instance.tracker.has_changed(field) for field in SLOT_FIELDS):
+        RosterSlot.sync(instance)
+
+
+@receiver(post_save, sender=Config)
+def schedule_roster_slots_rebuild(sender, instance, **kwargs):
+    # the roster timedelta is part of the stored slots
+    if instance.key == "roster_timedelta" and instance.tracker.has_changed("value"):
+        transaction.on_commit(rebuild_roster_slots.delay)
+
 
 @receiver(post_save, sender=Roster)
 def update_vehicle_status(
@@ -76,7 +106,7 @@ def update_vehicle_status(
                 old_driver=previous_driver,
                 new_driver=current_driver,
                 status=instance.status,
-                created_by=instance.craeted_by,
+                created_by=instance.created_by,
             )
 
 
@@ -84,12 +114,50 @@ def update_vehicle_status(
 def update_roster_pricing(sender, instance, **kwargs):
     # update the roster cost field based on the pricing config
     if instance.is_active is True and instance.vehicle is not None:
-        pricing_config = Pricing.objects.filter(
-            type=instance.type,
-            model=instance.vehicle.model, 
-            client=instance.client, 
-            client_store__in=[instance.client_store],
-            is_active=True,
-        ).last()
-        if pricing_config is not None:
-            instance.cost = pricing_config.price
\ No newline at end of file
+        price = pricing_table.get(
+            instance.client_id,
+            instance.client_store_id,
+            instance.type,
+            instance.vehicle.model,
+        )
+        if price is not None:
+            instance.cost = price
+
+
+@receiver(post_save, sender=Roster)
+@receiver(post_delete, sender=Roster)
+def invalidate_roster_driver_feeds(sender, instance, **kwargs):
+    # the current and the previous driver both see the roster change
+    driver_ids = {instance.driver_id, instance.tracker.previous("driver_id")}
+    invalidate_roster_feeds(
+        Driver.objects.filter(id__in=driver_ids - {None}).values_list("user_id", flat=True)
+    )
+
+
+@receiver(post_save, sender=Vehicle)
+def invalidate_vehicle_roster_feeds(sender, instance, created, **kwargs):
+    if created is False:
+        invalidate_roster_feeds(
+            Roster.objects.filter(vehicle=instance).values_list("driver__user_id", flat=True)
+        )
+
+
+@receiver(post_save, sender=Station)
+def invalidate_station_roster_feeds(sender, instance, created, **kwargs):
+    if created is False:
+        invalidate_roster_feeds(
+            Roster.objects.filter(
+                destination_station=instance,
+            ).values_list("driver__user_id", flat=True)
+        )
+
+
+@receiver(post_save, sender=ClientStore)
+def invalidate_store_roster_feeds(sender, instance, created, **kwargs):
+    if created is False:
+        invalidate_roster_feeds(
+            Roster.objects.filter(
+                client_store=instance,
+            ).values_list("driver__user_id", flat=True)
+        )
+
@@ -0,0 +1,41 @@
+# python imports
+import logging
+from datetime import date, datetime, timedelta
+# django imports
+from django.utils import timezone
+# project imports
+from main.celery import app
+# app imports
+from .models import RosterSlot
+from .helpers import compute_trip_distances
+
+logger = logging.getLogger(__name__)
+
+
+@app.task(name="reconcile_trip_distances")
+def reconcile_trip_distances(day=None):
+    """
+    Compute the gps km of the trips ended on a day, yesterday by default
+    """
+    if day is None:
+        day = timezone.localdate() - timedelta(days=1)
+    else:
+        day = date.fromisoformat(day)
+    return compute_trip_distances(day)
+
+
+@app.task(name="rebuild_roster_slots")
+def rebuild_roster_slots():
+    """
+    Rebuild the roster slots after a roster timedelta change, logs the
+    rosters left without slots
+    """
+    conflicts = RosterSlot.rebuild()
+    for roster_id in conflicts:
+        logger.error(
+            "{} ERROR roster {} conflicts with another roster".format(
+                datetime.now(),
+                roster_id,
+            )
+        )
+    return conflicts
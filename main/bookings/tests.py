@@ -1,3 +1,543 @@
+# python imports
+from datetime import date, datetime, time, timedelta
+from io import BytesIO
+from unittest import mock
+# django imports
+from django.core.cache import cache
+from django.db import connection, IntegrityError
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+# project imports
+from clients.models import Client, ClientStore
+from config.models import Config
+from config.forms import ConfigAdminForm
+from drivers.models import Driver, DriverLocations, Onboarding
+from fleets.models import Station, Vehicle
+# app imports
+from .models import Roster, RosterSlot, Trip, TripEvent
+from .helpers import (
+    roster_import_csv_handler,
+    find_timedelta_conflicts,
+    track_distance,
+    compute_trip_distances,
+    plan_roster_assignments,
+    apply_roster_assignments,
+)
+from .tasks import rebuild_roster_slots
+from .constants import (
+    ROSTER_TRIP_COMPLETED_ALREADY,
+    PREVIOUS_TRIP_ACTIVE,
+    TRIP_INVALID_ACTION,
+)
 
-# Create your tests here.
+# queries of a successful start ride: the token on a cold cache, the
+# roster, the insert and its savepoint
+START_RIDE_QUERY_BUDGET = 5
+
+
+class DriverRosterTestCase(TestCase):
+    """
+    A driver assigned to a roster running all day, with a vehicle
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        client = Client.objects.create(
+            name="Client",
+            gst="GST",
+            contract="https://example.com/contract.pdf",
+            address="Address",
+            city="Chennai",
+            locality="Locality",
+            state="Tamil Nadu",
+            contact_person="Contact",
+            contact_number=9000000000,
+            onboarding_date=date(2023, 1, 1),
+            renewal_date=date(2030, 1, 1),
+            status=Client.Status.ACTIVE,
+            service_type=Client.ServiceType.DRIVER,
+        )
+        store = ClientStore.objects.create(
+            client=client,
+            name="Store",
+            lat=13.0,
+            long=80.2,
+            address="Address",
+            city="Chennai",
+            locality="Locality",
+            state="Tamil Nadu",
+            contact_number=9000000000,
+        )
+        station = Station.objects.create(
+            name="Station",
+            city="Chennai",
+            state="Tamil Nadu",
+            address="Address",
+            area="Area",
+            pincode=600001,
+            lat=13.05,
+            long=80.25,
+        )
+        vehicle = Vehicle.objects.create(
+            registration_number="TN 01 0001",
+            model=Vehicle.MODEL.PIMO,
+            status=Vehicle.STATUS.FOR_DEPLOYMENT,
+            speed=Vehicle.SPEED.LOW,
+            station=station,
+        )
+        onboarding = Onboarding.objects.create(
+            full_name="Driver",
+            dob=date(1990, 1, 1),
+            mobile_no=9100000000,
+            house_no="1",
+            street="Street",
+            locality="Locality",
+            city="Chennai",
+            pincode=600001,
+            state="Tamil Nadu",
+            photo="https://example.com/photo.jpg",
+            aadhar_number=100000000000,
+            aadhar_front="https://example.com/front.jpg",
+            aadhar_back="https://example.com/back.jpg",
+            has_driver_license=False,
+            account_number="1234567890",
+            account_name="Driver",
+            ifsc_code="IFSC0000001",
+        )
+        cls.driver = Driver.objects.create(onboarding=onboarding, doj=date(2023, 1, 1))
+        cls.driver.refresh_from_db()
+        cls.roster = Roster.objects.create(
+            client=client,
+            client_store=store,
+            driver=cls.driver,
+            vehicle=vehicle,
+            start_date=date(2023, 1, 1),
+            end_date=date(2030, 1, 1),
+            slot_start_time=time(0, 0),
+            slot_end_time=time(23, 0),
+            lat=store.lat,
+            long=store.long,
+            address=store.address,
+            destination_station=station,
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.token, __ = Token.objects.get_or_create(user=self.driver.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION="Token {}".format(self.token.key))
+
+
+class DriverAuthenticationTestCase(DriverRosterTestCase):
+
+    def test_cached_token_resolves_the_driver(self):
+        self.client.get("/bookings/rosters/")
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get("/bookings/rosters/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([roster["id"] for roster in response.data], [self.roster.id])
+        # only the rosters are queried
+        self.assertEqual(len(queries), 1)
+
+    def test_deleted_token_is_rejected(self):
+        self.client.get("/bookings/rosters/")
+        self.token.delete()
+        response = self.client.get("/bookings/rosters/")
+        self.assertEqual(response.status_code, 401)
+
+    def test_deactivated_driver_is_rejected(self):
+        self.client.get("/bookings/rosters/")
+        self.driver.is_active = False
+        self.driver.save()
+        response = self.client.get("/bookings/rosters/")
+        self.assertEqual(response.status_code, 401)
+
+
+class StartRideTestCase(DriverRosterTestCase):
+
+    def start_ride(self):
+        return self.client.post(
+            "/bookings/trips/start-ride/",
+            {"roster": self.roster.id, "start_km": 100},
+            format="json",
+        )
+
+    def test_start_ride_query_budget(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.start_ride()
+        self.assertEqual(response.status_code, 200)
+        self.assertLessEqual(len(queries), START_RIDE_QUERY_BUDGET)
+
+    def test_active_trip_blocks_start_ride(self):
+        self.start_ride()
+        response = self.start_ride()
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(response.data, PREVIOUS_TRIP_ACTIVE)
+
+    def test_one_trip_per_roster_a_day(self):
+        self.start_ride()
+        Trip.objects.filter(roster=self.roster).update(is_active=False)
+        response = self.start_ride()
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data, ROSTER_TRIP_COMPLETED_ALREADY)
+        self.assertEqual(Trip.objects.filter(roster=self.roster).count(), 1)
+
+
+class TripEventsTestCase(DriverRosterTestCase):
+
+    def post_events(self, events):
+        return self.client.post(
+            "/bookings/trips/events/",
+            {"events": events},
+            format="json",
+        )
+
+    def shift(self, start=None):
+        if start is None:
+            start = timezone.now() - timedelta(minutes=10)
+        data = [
+            ("start", "start_ride", {"start_km": 100}),
+            ("in", "check_in", {"in_latitude": 13.0, "in_longitude": 80.2}),
+            ("out", "check_out", {"out_latitude": 13.1, "out_longitude": 80.3}),
+            ("end", "end_ride", {"end_km": 120, "trip_sheet_photo": "https://example.com/sheet.jpg"}),
+        ]
+        return [
+            {
+                "key": key,
+                "type": type,
+                "roster": self.roster.id,
+                "timestamp": (start + timedelta(minutes=minutes)).isoformat(),
+                **fields,
+            }
+            for minutes, (key, type, fields) in enumerate(data)
+        ]
+
+    def test_shift_in_one_request(self):
+        # uploaded out of order, applied in client time order
+        response = self.post_events(list(reversed(self.shift())))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [result["status"] for result in response.data["results"]],
+            ["applied"] * 4,
+        )
+        trip = Trip.objects.get(roster=self.roster)
+        self.assertEqual(trip.status, Trip.STATUS.RIDE_COMPLETED)
+        self.assertEqual(trip.end_km, 120)
+        self.assertFalse(trip.is_active)
+
+    def test_shift_across_midnight(self):
+        midnight = timezone.make_aware(
+            datetime.combine(timezone.localdate() - timedelta(days=1), time.min),
+        )
+        events = self.shift(midnight - timedelta(minutes=2))
+        self.assertEqual(
+            [result["status"] for result in self.post_events(events[:1]).data["results"]],
+            ["applied"],
+        )
+        response = self.post_events(events[1:])
+        self.assertEqual(
+            [result["status"] for result in response.data["results"]],
+            ["applied"] * 3,
+        )
+        trip = Trip.objects.get(roster=self.roster)
+        self.assertEqual(trip.trip_date, midnight.date() - timedelta(days=1))
+        self.assertEqual(trip.status, Trip.STATUS.RIDE_COMPLETED)
+        self.assertFalse(trip.is_active)
+
+    def test_replayed_events_are_duplicates(self):
+        events = self.shift()
+        self.post_events(events[:2])
+        response = self.post_events(events)
+        self.assertEqual(
+            [result["status"] for result in response.data["results"]],
+            ["duplicate", "duplicate", "applied", "applied"],
+        )
+        self.assertEqual(TripEvent.objects.count(), 4)
+        self.assertEqual(Trip.objects.filter(roster=self.roster).count(), 1)
+
+    def test_invalid_transition_is_rejected(self):
+        events = self.shift()
+        response = self.post_events([events[0], events[2]])
+        self.assertEqual(response.data["results"][1]["status"], "rejected")
+        self.assertEqual(response.data["results"][1]["error"], TRIP_INVALID_ACTION)
+
+    def test_keys_are_scoped_to_the_driver(self):
+        onboarding = Onboarding.objects.create(
+            full_name="Other",
+            dob=date(1990, 1, 1),
+            mobile_no=9100000001,
+            house_no="1",
+            street="Street",
+            locality="Locality",
+            city="Chennai",
+            pincode=600001,
+            state="Tamil Nadu",
+            photo="https://example.com/photo.jpg",
+            aadhar_number=100000000001,
+            aadhar_front="https://example.com/front.jpg",
+            aadhar_back="https://example.com/back.jpg",
+            has_driver_license=False,
+            account_number="1234567890",
+            account_name="Other",
+            ifsc_code="IFSC0000001",
+        )
+        other = Driver.objects.create(onboarding=onboarding, doj=date(2023, 1, 1))
+        trip = Trip.objects.create(
+            roster=self.roster,
+            start_km=0,
+            is_active=False,
+            trip_date=timezone.localdate() - timedelta(days=1),
+        )
+        TripEvent.objects.create(
+            driver=other,
+            key="start",
+            trip=trip,
+            type=TripEvent.TYPE.START_RIDE,
+            timestamp=timezone.now(),
+        )
+        response = self.post_events(self.shift())
+        self.assertEqual(
+            [result["status"] for result in response.data["results"]],
+            ["applied"] * 4,
+        )
+
+    def test_repeated_key_in_a_batch(self):
+        events = self.shift()
+        response = self.post_events(events[:2] + [dict(events[1])])
+        self.assertEqual(
+            [result["status"] for result in response.data["results"]],
+            ["applied", "applied", "duplicate"],
+        )
+
+    def test_concurrent_key_is_retried(self):
+        bulk_create = TripEvent.objects.bulk_create
+        calls = []
+
+        def conflict_once(objs, *args, **kwargs):
+            calls.append(objs)
+            if len(calls) == 1:
+                raise IntegrityError
+            return bulk_create(objs, *args, **kwargs)
+
+        with mock.patch.object(TripEvent.objects, "bulk_create", side_effect=conflict_once):
+            response = self.post_events(self.shift())
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [result["status"] for result in response.data["results"]],
+            ["applied"] * 4,
+        )
+        self.assertEqual(Trip.objects.filter(roster=self.roster).count(), 1)
+        self.assertEqual(TripEvent.objects.count(), 4)
+
+    def test_malformed_batch(self):
+        response = self.post_events([{"key": "start", "type": "fly"}])
+        self.assertEqual(response.status_code, 400)
+
+
+class RosterFeedTestCase(DriverRosterTestCase):
+
+    def test_csv_import_drops_the_feed(self):
+        feed = self.client.get("/bookings/rosters/feed/").data
+        self.assertEqual([roster["id"] for roster in feed], [self.roster.id])
+        Vehicle.objects.create(
+            registration_number="TN 01 0002",
+            model=Vehicle.MODEL.PIMO,
+            status=Vehicle.STATUS.FOR_DEPLOYMENT,
+            speed=Vehicle.SPEED.LOW,
+            station=self.roster.destination_station,
+        )
+        file = BytesIO(
+            b"driver,vehicle,client_store,start_date,end_date,holiday,start_time,"
+            b"end_time,lat,long,destination_station\n"
+            b"9100000000,TN 01 0002,Store,2031-01-01,2031-12-31,,09:00 AM,"
+            b"06:00 PM,13.0,80.2,Station\n"
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            added, errors = roster_import_csv_handler(file, self.driver.user)
+        self.assertEqual((added, errors), (1, []))
+        feed = self.client.get("/bookings/rosters/feed/").data
+        self.assertEqual(len(feed), 2)
+
+
+class RosterSlotTestCase(DriverRosterTestCase):
+
+    def create_roster(self, vehicle, start_time, end_time):
+        return Roster.objects.create(
+            client=self.roster.client,
+            client_store=self.roster.client_store,
+            vehicle=vehicle,
+            start_date=date(2031, 1, 1),
+            end_date=date(2031, 12, 31),
+            slot_start_time=start_time,
+            slot_end_time=end_time,
+            lat=self.roster.lat,
+            long=self.roster.long,
+            address=self.roster.address,
+            destination_station=self.roster.destination_station,
+        )
+
+    def create_rosters(self):
+        vehicle = Vehicle.objects.create(
+            registration_number="TN 01 0002",
+            model=Vehicle.MODEL.PIMO,
+            status=Vehicle.STATUS.FOR_DEPLOYMENT,
+            speed=Vehicle.SPEED.LOW,
+            station=self.roster.destination_station,
+        )
+        return (
+            self.create_roster(vehicle, time(9, 0), time(17, 0)),
+            self.create_roster(vehicle, time(19, 0), time(20, 0)),
+        )
+
+    def test_slot_across_midnight_is_split(self):
+        segments = RosterSlot.get_segments(
+            time(22, 0),
+            time(2, 0),
+            date(2031, 1, 1),
+            date(2031, 1, 31),
+            timedelta(hours=1),
+        )
+        self.assertEqual(
+            [(dates.lower, dates.upper, seconds.lower, seconds.upper) for dates, seconds in segments],
+            [
+                (date(2031, 1, 1), date(2031, 1, 31), 22 * 3600, 24 * 3600 - 1),
+                (date(2031, 1, 2), date(2031, 2, 1), 0, 3 * 3600),
+            ],
+        )
+
+    def test_timedelta_conflicts(self):
+        first, second = self.create_rosters()
+        self.assertEqual(find_timedelta_conflicts(timedelta(hours=1)), {})
+        self.assertEqual(
+            find_timedelta_conflicts(timedelta(hours=2)),
+            {first.id: [("vehicle", second.id)], second.id: [("vehicle", first.id)]},
+        )
+
+    def test_conflicting_timedelta_is_refused(self):
+        first, second = self.create_rosters()
+        form = ConfigAdminForm(data={"key": "roster_timedelta", "value": "2"})
+        self.assertFalse(form.is_valid())
+        self.assertIn("Rosters {}, {}".format(first.id, second.id), str(form.errors))
+        form = ConfigAdminForm(data={"key": "roster_timedelta", "value": "1"})
+        self.assertTrue(form.is_valid())
+
+    def test_unchanged_timedelta_is_not_rebuilt(self):
+        with mock.patch.object(rebuild_roster_slots, "delay") as delay:
+            with self.captureOnCommitCallbacks(execute=True):
+                config = Config.objects.create(key="roster_timedelta", value=1)
+            self.assertEqual(delay.call_count, 1)
+            with self.captureOnCommitCallbacks(execute=True):
+                config.save()
+            self.assertEqual(delay.call_count, 1)
+            config.value = 2
+            with self.captureOnCommitCallbacks(execute=True):
+                config.save()
+            self.assertEqual(delay.call_count, 2)
+
+    def test_rebuild(self):
+        first, second = self.create_rosters()
+        Config.objects.create(key="roster_timedelta", value=1)
+        self.assertEqual(RosterSlot.rebuild(), [])
+        slot = RosterSlot.objects.get(roster=first)
+        self.assertEqual((slot.seconds.lower, slot.seconds.upper), (9 * 3600, 18 * 3600 + 1))
+
+
+class TripDistanceTestCase(DriverRosterTestCase):
+
+    def get_points(self, start):
+        # one ping a minute, 0.01 degree of latitude apart, about 67 km/h
+        return [
+            (13.0 + i * 0.01, 80.2, start + timedelta(minutes=i))
+            for i in range(5)
+        ]
+
+    def test_noisy_first_ping(self):
+        start = timezone.now()
+        points = [(14.0, 80.2, start - timedelta(minutes=1))] + self.get_points(start)
+        self.assertAlmostEqual(track_distance(points), track_distance(points[1:]))
+        self.assertAlmostEqual(track_distance(points[1:]), 4.448, places=2)
+
+    def test_trip_of_a_reassigned_roster(self):
+        day = date(2024, 1, 10)
+        start = timezone.make_aware(datetime(2024, 1, 10, 10, 0))
+        trip = Trip.objects.create(
+            roster=self.roster,
+            driver=self.driver,
+            start_km=100,
+            end_km=104,
+            status=Trip.STATUS.RIDE_COMPLETED,
+            is_active=False,
+            trip_date=day,
+            ended_at=start + timedelta(minutes=10),
+        )
+        Trip.objects.filter(id=trip.id).update(created_at=start, updated_at=start)
+        DriverLocations.objects.bulk_create(
+            [
+                DriverLocations(driver=self.driver, lat=lat, long=long, created_at=created_at)
+                for lat, long, created_at in self.get_points(start + timedelta(minutes=1))
+            ]
+        )
+        Roster.objects.filter(id=self.roster.id).update(driver=None)
+        self.assertEqual(compute_trip_distances(day), 1)
+        trip.refresh_from_db()
+        self.assertAlmostEqual(trip.gps_km, 4.448, places=2)
+        self.assertFalse(trip.odometer_mismatch)
+        # picked up by the delta sync
+        self.assertGreater(trip.updated_at, start)
+
+
+class RosterAssignmentTestCase(DriverRosterTestCase):
+
+    def setUp(self):
+        super().setUp()
+        # the driver has no licence, the roster only misses its vehicle
+        self.open_roster = Roster.objects.create(
+            client=self.roster.client,
+            client_store=self.roster.client_store,
+            driver=self.driver,
+            start_date=date(2031, 1, 1),
+            end_date=date(2031, 12, 31),
+            slot_start_time=time(9, 0),
+            slot_end_time=time(17, 0),
+            lat=self.roster.lat,
+            long=self.roster.long,
+            address=self.roster.address,
+            destination_station=self.roster.destination_station,
+            created_by=self.driver.user,
+        )
+        self.high_speed = self.create_vehicle("TN 01 0002", Vehicle.SPEED.HIGH)
+
+    def create_vehicle(self, registration_number, speed):
+        return Vehicle.objects.create(
+            registration_number=registration_number,
+            model=Vehicle.MODEL.PIMO,
+            status=Vehicle.STATUS.FOR_DEPLOYMENT,
+            speed=speed,
+            station=self.roster.destination_station,
+        )
+
+    def plan(self):
+        with mock.patch("bookings.helpers.get_live_positions", return_value={}):
+            return plan_roster_assignments(date(2031, 1, 1), date(2031, 1, 31))
+
+    def test_unlicensed_driver_gets_no_high_speed_vehicle(self):
+        self.assertEqual(self.plan(), (1, []))
+        low_speed = self.create_vehicle("TN 01 0003", Vehicle.SPEED.LOW)
+        total, plan = self.plan()
+        self.assertEqual([(item["roster"], item["vehicle"]) for item in plan], [(self.open_roster.id, low_speed.id)])
+
+    def test_invalid_pair_is_skipped(self):
+        updated, skipped = apply_roster_assignments(
+            [{"roster": self.open_roster.id, "vehicle": self.high_speed.id, "driver": None}]
+        )
+        self.assertEqual((updated, skipped), ([], [self.open_roster.id]))
+        self.open_roster.refresh_from_db()
+        self.assertIsNone(self.open_roster.vehicle_id)
+        low_speed = self.create_vehicle("TN 01 0003", Vehicle.SPEED.LOW)
+        updated, skipped = apply_roster_assignments(
+            [{"roster": self.open_roster.id, "vehicle": low_speed.id, "driver": None}]
+        )
+        self.assertEqual((updated, skipped), ([self.open_roster], []))
@@ -1,35 +1,49 @@
 # python imports
-from datetime import datetime
+from datetime import datetime, date, time, timedelta
 
 # django imports
+from django.db import transaction, IntegrityError
+from django.utils import timezone
 from rest_framework import viewsets, status
 from rest_framework.response import Response
 from rest_framework.decorators import action
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAuthenticated, IsAdminUser
 
 # project imports
 from fleets.models import Vehicle
-from config.models import Config
 from libs.paginations import CustomCursorPagination
+from libs.parsers import GzipJSONParser
+from libs.mixins import DriverRequestMixin
 from bookings.constants import TRIP_NOT_FOUND
+from drivers.constants import DRIVER_NOT_FOUND
 from libs.constants import INVALID_DATA
-from drivers.models import Driver
+from clients.models import ClientStore
 
 # app imports
 from .models import Trip, Roster
 from .serializers import TripSerializer, RosterSerializer
+from .helpers import (
+    suggest_assignments,
+    get_roster_feed,
+    is_too_early_to_start,
+    parse_trip_events,
+    apply_trip_events,
+)
 from .constants import (
     PREVIOUS_TRIP_ACTIVE,
     ROSTER_NOT_ASSIGNED,
     ROSTER_TRIP_COMPLETED_ALREADY,
-    TRIP_START_TIME_DELTA,
     TRIP_CANNOT_START,
     TRIP_INVALID_ACTION,
     TRIP_VEHICLE_NOT_ASSIGNED,
+    INVALID_TRIP_EVENTS,
+    INVALID_SUGGESTION_SEARCH,
+    SUGGESTION_LIMIT,
+    SUGGESTION_MAX_LIMIT,
 )
 
 
-class TripViewSet(viewsets.ModelViewSet):
+class TripViewSet(DriverRequestMixin, viewsets.ModelViewSet):
     queryset = Trip.objects.all()
     serializer_class = TripSerializer
     permission_classes = [IsAuthenticated]
@@ -37,9 +51,37 @@ class TripViewSet(viewsets.ModelViewSet):
     pagination_class = CustomCursorPagination
 
     def list(self, request):
-        qs = self.queryset
-        serializer = TripSerializer(qs, many=True)
-        return Response(serializer.data)
+        """
+        Trips of the driver, newest first, optionally between
+        start_date and end_date
+        """
+        if request.driver is None:
+            return Response(
+                DRIVER_NOT_FOUND,
+                status=status.HTTP_404_NOT_FOUND,
+            )
+        qs = self.queryset.filter(driver=request.driver)
+        try:
+            if "start_date" in request.query_params:
+                start_date = date.fromisoformat(request.query_params["start_date"])
+                qs = qs.filter(
+                    created_at__gte=timezone.make_aware(datetime.combine(start_date, time.min)),
+                )
+            if "end_date" in request.query_params:
+                end_date = date.fromisoformat(request.query_params["end_date"])
+                qs = qs.filter(
+                    created_at__lt=timezone.make_aware(
+                        datetime.combine(end_date + timedelta(days=1), time.min)
+                    ),
+                )
+        except ValueError:
+            return Response(
+                INVALID_DATA,
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        page = self.paginate_queryset(qs)
+        serializer = TripSerializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
 
     # start_ride creates the trip object
     # check_in add the in_latitude, in_longitude, in_time
@@ -49,85 +91,87 @@ class TripViewSet(viewsets.ModelViewSet):
     def start_ride(self, request):
         start_time = datetime.now()
         try:
-            driver = Driver.objects.get(onboarding__mobile_no=request.user.username)
-            roster = Roster.objects.get(id=int(request.data["roster"]))
+            roster_id = int(request.data["roster"])
             start_km = float(int(request.data["start_km"]))
             vehicle_photos = request.data.get("vehicle_photos", [])
-        except (KeyError, Roster.DoesNotExist, Driver.DoesNotExist):
+            # the assignment, active trip and start delta in one query
+            roster = Roster.with_start_ride_state(request.driver).get(id=roster_id)
+        except (KeyError, ValueError, Roster.DoesNotExist):
             return Response(
                 INVALID_DATA,
                 status=status.HTTP_400_BAD_REQUEST,
             )
         
-        if roster.driver != driver:
+        if not roster.is_assigned:
             return Response(
                 ROSTER_NOT_ASSIGNED,
                 status=status.HTTP_403_FORBIDDEN,
             )
         
-        if roster.vehicle is None:
+        if roster.vehicle_id is None:
             return Response(
                 TRIP_VEHICLE_NOT_ASSIGNED,
                 status=status.HTTP_403_FORBIDDEN,
             )
 
         # roster_start_time validation
-        roster_start_time = roster.slot_start_time
-        roster_start_time = datetime(
-            year=start_time.year,
-            month=start_time.month,
-            day=start_time.day,
-            hour=roster_start_time.hour,
-            minute=roster_start_time.minute,
-            second=roster_start_time.second,
-        )
-        roster_start_delta = Config.get_value("roster_start_ride") or TRIP_START_TIME_DELTA
-        if start_time <= roster_start_time:
-            if (roster_start_time - start_time).seconds / 60 > roster_start_delta:
-                return Response(
-                    TRIP_CANNOT_START,
-                    status=status.HTTP_400_BAD_REQUEST,
-                )
+        if is_too_early_to_start(roster, start_time):
+            return Response(
+                TRIP_CANNOT_START,
+                status=status.HTTP_400_BAD_REQUEST,
+            )
 
         # check if there's an active trip
-        past_active_trips = Trip.objects.filter(
-            is_active=True,
-            roster=roster,
-        )
-        if past_active_trips.count() > 0:
+        if roster.has_active_trip:
             return Response(
                 PREVIOUS_TRIP_ACTIVE,
                 status=status.HTTP_403_FORBIDDEN,
             )
 
-        # check if a trip for the roster was created earlier for the day
-        # date today at 00:00:00
-        dt = datetime.now()
-        dt = dt.replace(hour=0, minute=0, second=0, microsecond=0)
-        roster_trip_today = Trip.objects.filter(
-            roster=roster,
-            created_at__gte=dt,
-        )
-        if roster_trip_today.count() > 0:
-            return Response(
-                ROSTER_TRIP_COMPLETED_ALREADY,
-                status=status.HTTP_400_BAD_REQUEST,
-            )
-
-        # create the trip object
+        # create the trip object, the unique roster / trip date constraint
+        # rejects a second trip of the roster for the day
         trip = Trip(
             roster=roster,
+            driver=request.driver,
             start_km=start_km,
             status=Trip.STATUS.RIDE_STARTED,
             vehicle_photos=vehicle_photos,
             is_active=True,
+            trip_date=timezone.localdate(),
         )
-
-        trip.save()
+        try:
+            with transaction.atomic():
+                trip.save()
+        except IntegrityError:
+            return Response(
+                ROSTER_TRIP_COMPLETED_ALREADY,
+                status=status.HTTP_400_BAD_REQUEST,
+            )
         serializer = TripSerializer(trip)
         return Response(serializer.data)
 
 
+    @action(
+        methods=["POST"],
+        detail=False,
+        url_path="events",
+        parser_classes=[GzipJSONParser],
+    )
+    def events(self, request):
+        """
+        Apply a batch of start ride, check in, check out and end ride
+        events recorded offline, the body may be gzip compressed
+        """
+        events = parse_trip_events(
+            request.data.get("events") if isinstance(request.data, dict) else None
+        )
+        if events is None:
+            return Response(
+                INVALID_TRIP_EVENTS,
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        return Response({"results": apply_trip_events(request.driver, events)})
+
     @action(methods=['POST'], detail=True, url_path='check-in')
     def check_in(self, request, *args, **kwargs):
         trip = self.get_object()
@@ -213,7 +257,7 @@ class TripViewSet(viewsets.ModelViewSet):
         return Response(serializer.data)
 
 
-class RosterViewSet(viewsets.ModelViewSet):
+class RosterViewSet(DriverRequestMixin, viewsets.ModelViewSet):
     queryset = Roster.objects.filter(is_active=True)
     serializer_class = RosterSerializer
     lookup_field = "id"
@@ -221,10 +265,23 @@ class RosterViewSet(viewsets.ModelViewSet):
     http_method_names = ["get", "post"]
 
     def list(self, request):
-        qs = self.queryset.filter(driver__onboarding__mobile_no=request.user.username)
+        if request.driver is None:
+            return Response([])
+        qs = self.queryset.filter(
+            driver=request.driver,
+        ).select_related("vehicle", "destination_station")
         serializer = RosterSerializer(qs, many=True)
         return Response(serializer.data)
 
+    @action(methods=["GET"], detail=False, url_path="feed")
+    def feed(self, request, *args, **kwargs):
+        """
+        Compact active rosters of the driver for the app home screen
+        """
+        if request.driver is None:
+            return Response([])
+        return Response(get_roster_feed(request.driver))
+
     @action(methods=['GET'], detail=True, url_path='trip')
     def trip(self, request, *args, **kwargs):
         """
@@ -236,5 +293,38 @@ class RosterViewSet(viewsets.ModelViewSet):
         if qs is not None:
             data = TripSerializer(qs).data
         return Response(data)
-        
 
+    @action(
+        methods=["GET"],
+        detail=False,
+        url_path="suggestions",
+        permission_classes=[IsAdminUser],
+    )
+    def suggestions(self, request, *args, **kwargs):
+        """
+        Nearest vehicles and drivers free for a roster slot of a client store
+        """
+        params = request.query_params
+        try:
+            client_store = ClientStore.objects.get(id=int(params["client_store"]))
+            start_date = date.fromisoformat(params["start_date"])
+            end_date = date.fromisoformat(params["end_date"])
+            start_time = time.fromisoformat(params["slot_start_time"])
+            end_time = time.fromisoformat(params["slot_end_time"])
+            limit = int(params.get("limit", SUGGESTION_LIMIT))
+            roster_id = int(params["roster"]) if params.get("roster") else None
+        except (KeyError, ValueError, ClientStore.DoesNotExist):
+            return Response(INVALID_SUGGESTION_SEARCH, status=status.HTTP_400_BAD_REQUEST)
+        if end_date < start_date or not 0 < limit <= SUGGESTION_MAX_LIMIT:
+            return Response(INVALID_SUGGESTION_SEARCH, status=status.HTTP_400_BAD_REQUEST)
+        return Response(
+            suggest_assignments(
+                client_store,
+                start_time,
+                end_time,
+                start_date,
+                end_date,
+                limit=limit,
+                roster_id=roster_id,
+            )
+        )
@@ -186,6 +186,8 @@ class PricingAdmin(BaseMixin, ExportCSVMixin):
         "model",
         "type",
         "price",
+        "effective_from",
+        "effective_to",
     ]
     form = PricingForm
     model = Pricing
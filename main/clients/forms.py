@@ -2,6 +2,7 @@
 from django import forms
 from crispy_forms.helper import FormHelper
 from django.core.exceptions import ValidationError
+from django.db.models import Q
 # app imports
 from .models import Pricing
 
@@ -23,11 +24,24 @@ class PricingForm(forms.ModelForm):
         fields = '__all__'
 
     def clean(self):
+        effective_from = self.cleaned_data.get('effective_from')
+        effective_to = self.cleaned_data.get('effective_to')
+        if effective_from and effective_to and effective_from > effective_to:
+            raise ValidationError("Effective from must be before effective to")
         pricings = Pricing.objects.filter(
             client=self.cleaned_data['client'],
             type=self.cleaned_data['type'],
             model=self.cleaned_data['model'],
         )
+        # only overlapping validity windows conflict
+        if effective_to:
+            pricings = pricings.filter(
+                Q(effective_from__isnull=True) | Q(effective_from__lte=effective_to),
+            )
+        if effective_from:
+            pricings = pricings.filter(
+                Q(effective_to__isnull=True) | Q(effective_to__gte=effective_from),
+            )
         if hasattr(self, "pid") and self.pid is not None:
             pricings = pricings.exclude(id=self.pid)
         if pricings.count() > 0:
@@ -0,0 +1,152 @@
+# python imports
+import time
+from bisect import bisect_right
+from collections import defaultdict
+from datetime import date, timedelta
+# django imports
+from django.core.cache import cache
+from django.db.models import F, Q, OuterRef, Subquery
+from django.utils import timezone
+# project imports
+from bookings.models import Roster
+# app imports
+from .models import Pricing
+
+PRICING_VERSION_KEY = "pricing_version"
+
+
+def build_pricing_timeline(rules):
+    """
+    Compile the (effective from, effective to, id, price) rules of a pricing
+    key into sorted start dates and the price from each start, None in the
+    gaps. The latest starting rule wins on overlaps, then the latest rule.
+    """
+    starts = {date.min}
+    for start, end, __, __ in rules:
+        if start is not None:
+            starts.add(start)
+        if end is not None and end < date.max:
+            starts.add(end + timedelta(days=1))
+    starts = sorted(starts)
+    prices = []
+    for day in starts:
+        valid = [
+            rule for rule in rules
+            if (rule[0] or date.min) <= day <= (rule[1] or date.max)
+        ]
+        best = max(valid, key=lambda rule: (rule[0] or date.min, rule[2]), default=None)
+        prices.append(best[3] if best is not None else None)
+    return starts, prices
+
+
+class PricingTable():
+    """
+    In-process lookup of the active pricing keyed by (client, client store,
+    type, vehicle model), each key holds the timeline of its effective dated
+    prices. Every worker rebuilds its table when the version stamp in the
+    cache, bumped after each pricing change, moves.
+    """
+    def __init__(self):
+        self.version = None
+        self.rules = {}
+
+    def get_version(self):
+        version = cache.get(PRICING_VERSION_KEY)
+        if version is None:
+            cache.add(PRICING_VERSION_KEY, time.time_ns(), timeout=None)
+            version = cache.get(PRICING_VERSION_KEY)
+        return version
+
+    def load(self):
+        qs = Pricing.client_store.through.objects.filter(
+            pricing__is_active=True,
+        ).values_list(
+            "pricing__client_id",
+            "clientstore_id",
+            "pricing__type",
+            "pricing__model",
+            "pricing__effective_from",
+            "pricing__effective_to",
+            "pricing_id",
+            "pricing__price",
+        )
+        rules = defaultdict(list)
+        for client_id, store_id, type, model, *rule in qs:
+            rules[(client_id, store_id, type, model)].append(rule)
+        return {key: build_pricing_timeline(value) for key, value in rules.items()}
+
+    def refresh(self):
+        version = self.get_version()
+        if version != self.version:
+            self.rules = self.load()
+            self.version = version
+
+    def lookup(self, key, day):
+        timeline = self.rules.get(key)
+        if timeline is None:
+            return None
+        starts, prices = timeline
+        return prices[bisect_right(starts, day) - 1]
+
+    def get(self, client_id, store_id, type, model, day=None):
+        """
+        Returns the price for a roster on a day, today by default, or None
+        """
+        self.refresh()
+        return self.lookup(
+            (client_id, store_id, type, model),
+            day or timezone.localdate(),
+        )
+
+    @staticmethod
+    def invalidate():
+        cache.set(PRICING_VERSION_KEY, time.time_ns(), timeout=None)
+
+
+pricing_table = PricingTable()
+
+
+def recompute_roster_pricing(client_id, type, model):
+    """
+    Recompute the current cost of the active rosters of a client for a
+    roster type and vehicle model with a single UPDATE. The pricing rule
+    is the one of the pricing table, rosters without a pricing today are
+    reset. Returns the number of rosters whose cost changed.
+    """
+    price = Pricing.objects.filter(
+        Pricing.effective_on(timezone.localdate()),
+        client_id=client_id,
+        type=type,
+        model=model,
+        client_store=OuterRef("client_store"),
+        is_active=True,
+    ).order_by(
+        F("effective_from").desc(nulls_last=True),
+        "-id",
+    ).values("price")[:1]
+    rosters = Roster.objects.filter(
+        client_id=client_id,
+        type=type,
+        vehicle__model=model,
+        is_active=True,
+    ).annotate(
+        new_cost=Subquery(price),
+    ).filter(
+        Q(cost__isnull=False, new_cost__isnull=True)
+        | Q(cost__isnull=True, new_cost__isnull=False)
+        | (Q(cost__isnull=False, new_cost__isnull=False) & ~Q(cost=F("new_cost")))
+    )
+    return rosters.update(cost=Subquery(price))
+
+
+def get_pricing_scopes_changed_on(day):
+    """
+    Returns the (client, type, model) scopes with a pricing starting on the
+    day or ended the day before, their roster costs change on that day
+    """
+    return set(
+        Pricing.objects.filter(
+            Q(effective_from=day) | Q(effective_to=day - timedelta(days=1)),
+            is_active=True,
+        ).values_list("client_id", "type", "model").distinct()
+    )
@@ -0,0 +1,27 @@
+# Generated by Django 3.2.13 on 2026-10-18 09:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clients', '0009_rename_clientcontractlogs_clientcontractlog'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pricing',
+            name='effective_from',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='pricing',
+            name='effective_to',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='pricing',
+            index=models.Index(fields=['client', 'type', 'model', 'effective_from', 'effective_to'], name='pricing_effective_idx'),
+        ),
+    ]
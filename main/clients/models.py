@@ -3,6 +3,7 @@ import logging
 # from cerberus import Validator, DocumentError
 # django imports
 from django.db import models
+from django.db.models import Q
 from django.utils.translation import gettext_lazy as _
 # from django.core.exceptions import ValidationError
 from django.core.validators import (
@@ -133,7 +134,27 @@ class Pricing(BaseModel):
     )
     model = models.IntegerField(choices=Vehicle.MODEL.choices)
     price = models.FloatField()
+    # validity window, open ended when empty
+    effective_from = models.DateField(null=True, blank=True)
+    effective_to = models.DateField(null=True, blank=True)
+    tracker = FieldTracker(fields=["client", "type", "model"])
 
     class Meta:
         verbose_name = "Pricing Configuration"
         verbose_name_plural = "Pricing Configurations"
+        indexes = [
+            models.Index(
+                fields=["client", "type", "model", "effective_from", "effective_to"],
+                name="pricing_effective_idx",
+            ),
+        ]
+
+    @classmethod
+    def effective_on(cls, date, prefix=""):
+        """
+        Filter for the pricing valid on a date
+        """
+        return (
+            (Q(**{f"{prefix}effective_from__isnull": True}) | Q(**{f"{prefix}effective_from__lte": date}))
+            & (Q(**{f"{prefix}effective_to__isnull": True}) | Q(**{f"{prefix}effective_to__gte": date}))
+        )
@@ -2,16 +2,17 @@
 import logging
 from datetime import datetime
 # django imports
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models.signals import post_save, m2m_changed
 from django.dispatch import receiver
-# project imports
-from bookings.models import Roster
 # app imports
 from .models import (
     Client, 
     ClientContractLog,
     Pricing,
 )
+from .tasks import recompute_roster_pricing_task
+from .helpers import PricingTable
 
 logger = logging.getLogger(__name__)
 
@@ -39,22 +40,37 @@ def create_client_contract_logs(
                     ), exc_info=True,
                 )
 
+def queue_roster_pricing(scopes):
+    """
+    Invalidate the pricing tables and recompute the roster costs of the
+    (client, type, model) scopes once the transaction commits
+    """
+    transaction.on_commit(PricingTable.invalidate)
+    for scope in scopes:
+        transaction.on_commit(
+            lambda scope=scope: recompute_roster_pricing_task.delay(*scope),
+        )
+
+
 @receiver(post_save, sender=Pricing)
 def set_roster_pricing(sender, instance, created, **kwargs):
     """
         Set the pricing in the roster model
     """
-    rosters = Roster.objects.filter(
-        client=instance.client,
-        type=instance.type,
-        vehicle__model=instance.model,
-    )
-    if instance.client_store.count() > 0:
-        rosters = rosters.filter(
-            client_store__in=instance.client_store.filter(),
-        )   
+    scopes = {(instance.client_id, instance.type, instance.model)}
+    if created is False and instance.tracker.changed():
+        scopes.add((
+            instance.tracker.previous("client"),
+            instance.tracker.previous("type"),
+            instance.tracker.previous("model"),
+        ))
+    queue_roster_pricing(scopes)
 
-    # set the pricing
-    for roster in rosters:
-        roster.cost = instance.price if instance.is_active is True else None
-        roster.save()
\ No newline at end of file
+
+@receiver(m2m_changed, sender=Pricing.client_store.through)
+def set_roster_store_pricing(sender, instance, action, reverse, **kwargs):
+    """
+        Set the pricing in the roster model when the pricing stores change
+    """
+    if reverse is False and action in ["post_add", "post_remove", "post_clear"]:
+        queue_roster_pricing({(instance.client_id, instance.type, instance.model)})
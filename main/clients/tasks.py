@@ -0,0 +1,42 @@
+# python imports
+import logging
+from datetime import datetime
+# django imports
+from django.utils import timezone
+# project imports
+from main.celery import app
+# app imports
+from .helpers import recompute_roster_pricing, get_pricing_scopes_changed_on
+
+logger = logging.getLogger(__name__)
+
+
+@app.task(name="recompute_roster_pricing")
+def recompute_roster_pricing_task(client_id, type, model):
+    """
+    Recompute the roster costs for a pricing scope, returns the number
+    of rosters changed
+    """
+    updated = recompute_roster_pricing(client_id, type, model)
+    logger.info(
+        "{} roster pricing recomputed for client {} type {} model {}: {} rosters updated".format(
+            datetime.now(),
+            client_id,
+            type,
+            model,
+            updated,
+        )
+    )
+    return updated
+
+
+@app.task(name="recompute_effective_roster_pricing")
+def recompute_effective_roster_pricing():
+    """
+    Recompute the roster costs of the pricing scopes whose pricing window
+    starts or ends today, returns the number of rosters changed
+    """
+    updated = 0
+    for client_id, type, model in get_pricing_scopes_changed_on(timezone.localdate()):
+        updated += recompute_roster_pricing_task(client_id, type, model)
+    return updated
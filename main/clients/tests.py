@@ -0,0 +1,45 @@
+# python imports
+from datetime import timedelta
+# django imports
+from django.utils import timezone
+# project imports
+from bookings.models import Roster
+from bookings.tests import DriverRosterTestCase
+# app imports
+from .models import Pricing
+from .tasks import recompute_effective_roster_pricing
+
+
+class EffectiveRosterPricingTestCase(DriverRosterTestCase):
+
+    def create_pricing(self, price, **kwargs):
+        pricing = Pricing.objects.create(
+            title="Pricing",
+            description="Pricing",
+            client=self.roster.client,
+            type=self.roster.type,
+            model=self.roster.vehicle.model,
+            price=price,
+            **kwargs,
+        )
+        pricing.client_store.add(self.roster.client_store)
+        return pricing
+
+    def test_pricing_starting_today(self):
+        today = timezone.localdate()
+        self.create_pricing(500, effective_to=today - timedelta(days=1))
+        self.create_pricing(600, effective_from=today)
+        self.assertEqual(recompute_effective_roster_pricing(), 1)
+        self.roster.refresh_from_db()
+        self.assertEqual(self.roster.cost, 600)
+
+    def test_pricing_ended_yesterday(self):
+        self.create_pricing(500, effective_to=timezone.localdate() - timedelta(days=1))
+        Roster.objects.filter(id=self.roster.id).update(cost=500)
+        self.assertEqual(recompute_effective_roster_pricing(), 1)
+        self.roster.refresh_from_db()
+        self.assertIsNone(self.roster.cost)
+
+    def test_unchanged_window(self):
+        self.create_pricing(500, effective_from=timezone.localdate() - timedelta(days=1))
+        self.assertEqual(recompute_effective_roster_pricing(), 0)
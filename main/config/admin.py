@@ -3,6 +3,7 @@ from django.contrib import admin
 
 # app level imports
 from .models import Config
+from .forms import ConfigAdminForm
 
 
 class ConfigAdmin(admin.ModelAdmin):
@@ -10,6 +11,7 @@ class ConfigAdmin(admin.ModelAdmin):
     Admin View for the configuration module
     """
 
+    form = ConfigAdminForm
     list_display = (
         "key",
         "value",
@@ -0,0 +1,34 @@
+# python imports
+from datetime import timedelta
+# django imports
+from django import forms
+# project imports
+from bookings.helpers import find_timedelta_conflicts
+# app imports
+from .models import Config
+
+
+class ConfigAdminForm(forms.ModelForm):
+    """
+    Refuses a roster timedelta the active rosters don't fit in
+    """
+
+    class Meta:
+        model = Config
+        fields = "__all__"
+
+    def clean(self):
+        cleaned_data = super().clean()
+        value = cleaned_data.get("value")
+        if cleaned_data.get("key") != "roster_timedelta" or "value" not in cleaned_data:
+            return cleaned_data
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or value < 0:
+            raise forms.ValidationError("Roster timedelta must be a number of hours")
+        conflicts = find_timedelta_conflicts(timedelta(hours=value))
+        if conflicts:
+            raise forms.ValidationError(
+                "Rosters {} would conflict with this timedelta".format(
+                    ", ".join(str(roster_id) for roster_id in sorted(conflicts)),
+                )
+            )
+        return cleaned_data
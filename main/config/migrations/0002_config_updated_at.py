@@ -0,0 +1,24 @@
+# Generated by Django 3.2.13 on 2026-10-18 10:20
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('config', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='config',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddIndex(
+            model_name='config',
+            index=models.Index(fields=['updated_at', 'id'], name='config_updated_idx'),
+        ),
+    ]
@@ -3,6 +3,7 @@ from datetime import timedelta
 
 # django imports
 from django.db import models
+from model_utils import FieldTracker
 
 
 class Config(models.Model):
@@ -12,23 +13,27 @@ class Config(models.Model):
 
     key = models.CharField(max_length=50, unique=True)
     value = models.JSONField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    tracker = FieldTracker(fields=["value"])
 
     @classmethod
     def get_value(cls, key):
-        qs = Config.objects.filter(key=key).first()
-        if qs is not None:
-            return qs.value
-        return None
+        # only the value column, forms read configs at import time, before
+        # the migrations of the other columns run
+        return Config.objects.filter(key=key).values_list("value", flat=True).first()
 
     @classmethod
     def get_timedelta(cls):
         """
         Get the timedelta difference between two roster's creation
         """
-        qs = Config.objects.filter(key="roster_timedelta").first()
-        td = qs.value if qs else 0
+        td = cls.get_value("roster_timedelta") or 0
         return timedelta(hours=td)
 
     class Meta:
         verbose_name = "Config"
         verbose_name_plural = "Configs"
+        indexes = [
+            models.Index(fields=["updated_at", "id"], name="config_updated_idx"),
+        ]
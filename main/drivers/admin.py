@@ -3,6 +3,7 @@ import logging
 from datetime import datetime
 # django imports
 from django.contrib import admin, messages
+from django.db import transaction
 from django.http import HttpResponse, HttpResponseRedirect
 from django.urls import reverse, path
 from django.utils.html import escape, mark_safe
@@ -26,6 +27,8 @@ from .models import (
     DriverContract,
     DriverContractLog,
 )
+from .tasks import approve_onboardings
+from .constants import ONBOARDING_APPROVAL_BATCH
 
 logger = logging.getLogger(__name__)
 
@@ -156,12 +159,14 @@ class OnboardingAdmin(BaseMixin):
                 status = form.cleaned_data["status"]
                 remarks = form.cleaned_data["remarks"]
                 vendor = form.cleaned_data["vendor"]
-                if len(queryset) > 1:
-                    return HttpResponse(
-                        "please select one candidate at a time"
-                    )
                 if status == "3" and not remarks:
                     return HttpResponse("remarks required if rejected")
+                if len(queryset) > 1:
+                    if int(status) != Onboarding.Status.APPROVED:
+                        return HttpResponse(
+                            "please select one candidate at a time"
+                        )
+                    return self.approve(request, queryset, remarks, vendor)
                 for obj in queryset:
                     if obj.status is Onboarding.Status.APPROVED.value:
                         return HttpResponse("driver has been approved already")
@@ -210,6 +215,34 @@ class OnboardingAdmin(BaseMixin):
             {"title": "Choose status", "objects": queryset, "form": form},
         )
 
+    def approve(self, request, queryset, remarks, vendor):
+        """
+        Queue the approval of the onboardings in batches, hashing the
+        passwords of their users is too slow for the request
+        """
+        ids = list(
+            queryset.exclude(
+                status=Onboarding.Status.APPROVED,
+            ).filter(driver__isnull=True).values_list("id", flat=True)
+        )
+        vendor_id = vendor.id if vendor is not None else None
+        for start in range(0, len(ids), ONBOARDING_APPROVAL_BATCH):
+            batch = ids[start:start + ONBOARDING_APPROVAL_BATCH]
+            transaction.on_commit(
+                lambda batch=batch: approve_onboardings.delay(
+                    batch,
+                    remarks,
+                    vendor_id,
+                    request.user.id,
+                ),
+            )
+        messages.add_message(
+            request,
+            messages.INFO,
+            f"{len(ids)} candidates queued for approval",
+        )
+        return HttpResponseRedirect(".")
+
     def upload_documents(self, request, queryset):
         onboarding = queryset.first()
         if "set_status" in request.POST:
@@ -12,3 +12,64 @@ ONBOARDING_STATUS = [
 ]
 
 VENDOR_PER_TRIP_AMOUNT = 0
+
+# onboardings approved together are split into tasks of this size
+ONBOARDING_APPROVAL_BATCH = 20
+
+# driver location batches
+LOCATION_BATCH_LIMIT = 1000
+# pings ahead of the server clock by more than this are rejected
+LOCATION_MAX_CLOCK_SKEW = 300
+# months of location partitions kept ahead of the current one
+LOCATION_PARTITIONS_AHEAD = 2
+# raw pings older than this are rolled up into hourly tracks
+LOCATION_RAW_RETENTION_DAYS = 30
+# drivers rolled up per transaction
+LOCATION_ROLLUP_DRIVER_BATCH = 100
+# Douglas-Peucker tolerance of the hourly tracks, in metres
+LOCATION_SIMPLIFY_TOLERANCE = 10
+LOCATION_HISTORY_MAX_DAYS = 31
+
+# live driver positions in redis
+LIVE_POSITIONS_KEY = "drivers:positions"
+LIVE_LAST_SEEN_KEY = "drivers:last_seen"
+LIVE_SEEN_AT_KEY = "drivers:seen_at"
+# drivers not seen for this long are left out of the nearby search
+LIVE_POSITION_MAX_AGE = 15 * 60
+NEARBY_MAX_RADIUS = 50
+
+# delta sync of the driver app, rows per entity and call
+SYNC_PAGE_SIZE = 200
+# rows saved in the last seconds may still commit out of order, they
+# are left for the next sync
+SYNC_SETTLE_SECONDS = 5
+
+INVALID_LOCATIONS = {
+    "code": "DRV_400",
+    "error": "locations must be a list of at most 1000 [lat, long, timestamp]",
+}
+
+DRIVER_NOT_FOUND = {
+    "code": "DRV_404",
+    "error": "driver not found for the user",
+}
+
+INVALID_LOCATION_RANGE = {
+    "code": "DRV_401",
+    "error": "start and end must be ISO 8601 datetimes at most 31 days apart",
+}
+
+INVALID_NEARBY_SEARCH = {
+    "code": "DRV_402",
+    "error": "a store or station and a radius of at most 50 km are required",
+}
+
+LOCATION_NOT_FOUND = {
+    "code": "DRV_405",
+    "error": "no known position for the driver",
+}
+
+INVALID_SYNC_CURSOR = {
+    "code": "DRV_406",
+    "error": "invalid sync cursor",
+}
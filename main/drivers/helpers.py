@@ -1,19 +1,41 @@
 # Python imports
+import re
+import math
 import logging
 import datetime as dt
+from array import array
 from datetime import datetime
 
 
 # Django imports
+from django.contrib.auth.hashers import make_password
 from django.core.exceptions import ValidationError
+from django.db import connection
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django_redis import get_redis_connection
 
 # project level imports
 from fleets.models import Vehicle, Station
+from users.models import User
+from users.helpers import invalidate_auth_tokens
 
 # app level imports
+from .constants import (
+    LOCATION_MAX_CLOCK_SKEW,
+    LOCATION_PARTITIONS_AHEAD,
+    LOCATION_SIMPLIFY_TOLERANCE,
+    LIVE_POSITIONS_KEY,
+    LIVE_LAST_SEEN_KEY,
+    LIVE_SEEN_AT_KEY,
+    LIVE_POSITION_MAX_AGE,
+)
 
 logger = logging.getLogger(__name__)
 
+EARTH_RADIUS = 6371000
+LOCATION_PARTITION_PATTERN = re.compile(r"^drivers_driverlocations_(\d{4})_(\d{2})$")
+
 
 def driver_age_validator(date):
     """
@@ -24,3 +46,245 @@ def driver_age_validator(date):
     if age < 18:
         raise ValidationError("Minimum age for driver is 18 years")
     return date
+
+
+def get_driver_password(full_name, mobile_no):
+    """
+    Initial password of a driver, derived from the name and mobile number
+    """
+    return full_name.replace(" ", "")[:4] + str(mobile_no)[:4]
+
+
+def provision_driver_users(onboardings):
+    """
+    Create the users of the onboardings, or update the users already
+    registered with their mobile numbers. Returns a dict of onboarding id
+    -> user. Hashing dominates, bigger batches are approved by the
+    approve_onboardings tasks.
+    """
+    passwords = [
+        make_password(get_driver_password(onboarding.full_name, onboarding.mobile_no))
+        for onboarding in onboardings
+    ]
+    existing = User.objects.in_bulk(
+        [str(onboarding.mobile_no) for onboarding in onboardings],
+        field_name="username",
+    )
+    users = {}
+    for onboarding, password in zip(onboardings, passwords):
+        user = existing.get(str(onboarding.mobile_no)) or User(
+            username=str(onboarding.mobile_no),
+            role=User.Role.NON_STAFF,
+        )
+        user.full_name = onboarding.full_name
+        user.phone_no = onboarding.mobile_no
+        user.password = password
+        users[onboarding.id] = user
+    User.objects.bulk_create([user for user in users.values() if user.pk is None])
+    updated = [user for user in users.values() if user.username in existing]
+    User.objects.bulk_update(updated, ["full_name", "phone_no", "password"])
+    invalidate_auth_tokens([user.id for user in updated])
+    return users
+
+
+def parse_locations(items):
+    """
+    Validate a batch of [lat, long, timestamp] points, the timestamp is
+    an epoch in seconds or an ISO 8601 string. Returns the valid points
+    as (lat, long, datetime) and the number of rejected ones.
+    """
+    latest = timezone.now() + dt.timedelta(seconds=LOCATION_MAX_CLOCK_SKEW)
+    points = []
+    rejected = 0
+    for item in items:
+        if isinstance(item, dict):
+            item = (item.get("lat"), item.get("long"), item.get("timestamp"))
+        try:
+            lat, long, timestamp = item
+            lat = float(lat)
+            long = float(long)
+            if isinstance(timestamp, (int, float)):
+                created_at = datetime.fromtimestamp(timestamp, tz=dt.timezone.utc)
+            else:
+                created_at = parse_datetime(timestamp)
+                if timezone.is_naive(created_at):
+                    created_at = timezone.make_aware(created_at)
+        except (TypeError, ValueError, OverflowError, AttributeError):
+            rejected += 1
+            continue
+        if not (-90 <= lat <= 90 and -180 <= long <= 180) or created_at > latest:
+            rejected += 1
+            continue
+        points.append((lat, long, created_at))
+    return points, rejected
+
+
+def create_location_partitions(start, months=LOCATION_PARTITIONS_AHEAD + 1):
+    """
+    Create the monthly partitions of the driver locations table from the
+    month of `start`, existing partitions are left as is
+    """
+    month = start.replace(day=1)
+    with connection.cursor() as cursor:
+        for __ in range(months):
+            next_month = (month + dt.timedelta(days=32)).replace(day=1)
+            cursor.execute(
+                "CREATE TABLE IF NOT EXISTS drivers_driverlocations_{:%Y_%m} "
+                "PARTITION OF drivers_driverlocations "
+                "FOR VALUES FROM (%s) TO (%s)".format(month),
+                [month, next_month],
+            )
+            month = next_month
+
+
+def get_location_partitions():
+    """
+    Returns the monthly location partitions as (name, start, end) sorted
+    by month, the bounds are UTC datetimes
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT c.relname FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = 'drivers_driverlocations'::regclass"
+        )
+        names = [row[0] for row in cursor.fetchall()]
+    partitions = []
+    for name in names:
+        match = LOCATION_PARTITION_PATTERN.match(name)
+        if match is None:
+            continue
+        start = datetime(int(match[1]), int(match[2]), 1, tzinfo=dt.timezone.utc)
+        end = (start + dt.timedelta(days=32)).replace(day=1)
+        partitions.append((name, start, end))
+    return sorted(partitions, key=lambda partition: partition[1])
+
+
+def simplify_track(points, tolerance=LOCATION_SIMPLIFY_TOLERANCE):
+    """
+    Douglas-Peucker simplification of (lat, long, timestamp) points, the
+    distances are in metres on an equirectangular projection
+    """
+    if len(points) < 3:
+        return list(points)
+    scale = math.cos(math.radians(points[0][0]))
+    xy = [
+        (math.radians(long) * scale * EARTH_RADIUS, math.radians(lat) * EARTH_RADIUS)
+        for lat, long, __ in points
+    ]
+    keep = [False] * len(points)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(points) - 1)]
+    while stack:
+        first, last = stack.pop()
+        (x1, y1), (x2, y2) = xy[first], xy[last]
+        dx = x2 - x1
+        dy = y2 - y1
+        norm = math.hypot(dx, dy)
+        index, distance = None, tolerance
+        for i in range(first + 1, last):
+            x, y = xy[i]
+            if norm == 0:
+                d = math.hypot(x - x1, y - y1)
+            else:
+                d = abs(dy * (x - x1) - dx * (y - y1)) / norm
+            if d > distance:
+                index, distance = i, d
+        if index is not None:
+            keep[index] = True
+            stack.append((first, index))
+            stack.append((index, last))
+    return [point for point, kept in zip(points, keep) if kept]
+
+
+def encode_track(points):
+    """
+    Pack (lat, long, timestamp) points as consecutive doubles
+    """
+    values = array("d")
+    for lat, long, created_at in points:
+        values.extend((lat, long, created_at.timestamp()))
+    return values.tobytes()
+
+
+def decode_track(data):
+    """
+    Unpack the points of encode_track
+    """
+    values = array("d")
+    values.frombytes(bytes(data))
+    return [
+        (values[i], values[i + 1], datetime.fromtimestamp(values[i + 2], tz=dt.timezone.utc))
+        for i in range(0, len(values), 3)
+    ]
+
+
+def update_live_position(driver_id, lat, long, created_at):
+    """
+    Move the driver in the redis geo set and the last seen hash, older
+    pings than the stored one are ignored
+    """
+    redis = get_redis_connection("default")
+    timestamp = created_at.timestamp()
+    if not redis.zadd(LIVE_SEEN_AT_KEY, {driver_id: timestamp}, gt=True, ch=True):
+        return False
+    pipe = redis.pipeline()
+    pipe.geoadd(LIVE_POSITIONS_KEY, (long, lat, driver_id))
+    pipe.hset(LIVE_LAST_SEEN_KEY, driver_id, f"{lat},{long},{timestamp}")
+    pipe.execute()
+    return True
+
+
+def get_live_positions(driver_ids):
+    """
+    Returns a dict of driver id to the last known (lat, long, timestamp),
+    drivers never seen are left out
+    """
+    driver_ids = list(driver_ids)
+    if not driver_ids:
+        return {}
+    values = get_redis_connection("default").hmget(LIVE_LAST_SEEN_KEY, driver_ids)
+    positions = {}
+    for driver_id, value in zip(driver_ids, values):
+        if value is None:
+            continue
+        lat, long, timestamp = value.decode().split(",")
+        positions[driver_id] = (
+            float(lat),
+            float(long),
+            datetime.fromtimestamp(float(timestamp), tz=dt.timezone.utc),
+        )
+    return positions
+
+
+def get_live_position(driver_id):
+    """
+    Returns the last known (lat, long, timestamp) of a driver or None
+    """
+    return get_live_positions([driver_id]).get(driver_id)
+
+
+def get_drivers_nearby(lat, long, radius, max_age=LIVE_POSITION_MAX_AGE):
+    """
+    Returns the (driver id, distance in km) of the drivers seen in the
+    last max_age seconds within radius km, nearest first
+    """
+    redis = get_redis_connection("default")
+    results = redis.geosearch(
+        LIVE_POSITIONS_KEY,
+        longitude=long,
+        latitude=lat,
+        radius=radius,
+        unit="km",
+        withdist=True,
+        sort="ASC",
+    )
+    if not results:
+        return []
+    seen_at = redis.zmscore(LIVE_SEEN_AT_KEY, [member for member, __ in results])
+    oldest = timezone.now().timestamp() - max_age
+    return [
+        (int(member), distance)
+        for (member, distance), timestamp in zip(results, seen_at)
+        if timestamp is not None and timestamp >= oldest
+    ]
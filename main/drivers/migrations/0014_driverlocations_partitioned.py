@@ -0,0 +1,80 @@
+import datetime
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def create_partitioned_table(apps, schema_editor):
+    """
+    Replace the driver locations table with a table partitioned by month
+    on created_at and copy the existing rows over
+    """
+    execute = schema_editor.execute
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT min(created_at) FROM drivers_driverlocations")
+        oldest = cursor.fetchone()[0]
+
+    execute("ALTER TABLE drivers_driverlocations RENAME TO drivers_driverlocations_old")
+    execute(
+        "CREATE TABLE drivers_driverlocations ("
+        "id bigint NOT NULL DEFAULT nextval('drivers_driverlocations_id_seq'), "
+        "created_at timestamp with time zone NOT NULL, "
+        "lat double precision NOT NULL, "
+        "long double precision NOT NULL, "
+        "driver_id bigint NOT NULL REFERENCES drivers_driver (id) DEFERRABLE INITIALLY DEFERRED, "
+        "PRIMARY KEY (id, created_at)"
+        ") PARTITION BY RANGE (created_at)"
+    )
+    execute("ALTER SEQUENCE drivers_driverlocations_id_seq OWNED BY drivers_driverlocations.id")
+    execute(
+        "CREATE INDEX driverlocation_driver_time_idx "
+        "ON drivers_driverlocations (driver_id, created_at)"
+    )
+
+    # a partition per month from the oldest row to the next months
+    month = (oldest.date() if oldest else timezone.now().date()).replace(day=1)
+    last = (timezone.now().date() + datetime.timedelta(days=93)).replace(day=1)
+    while month < last:
+        next_month = (month + datetime.timedelta(days=32)).replace(day=1)
+        execute(
+            "CREATE TABLE drivers_driverlocations_{:%Y_%m} "
+            "PARTITION OF drivers_driverlocations "
+            "FOR VALUES FROM (%s) TO (%s)".format(month),
+            [month, next_month],
+        )
+        month = next_month
+    execute(
+        "CREATE TABLE drivers_driverlocations_default "
+        "PARTITION OF drivers_driverlocations DEFAULT"
+    )
+
+    execute(
+        "INSERT INTO drivers_driverlocations (id, created_at, lat, long, driver_id) "
+        "SELECT id, created_at, lat, long, driver_id FROM drivers_driverlocations_old"
+    )
+    execute("DROP TABLE drivers_driverlocations_old")
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('drivers', '0013_merge_20221226_1545'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunPython(create_partitioned_table),
+            ],
+            state_operations=[
+                migrations.AlterField(
+                    model_name='driverlocations',
+                    name='driver',
+                    field=models.ForeignKey(db_index=False, on_delete=models.deletion.PROTECT, to='drivers.driver'),
+                ),
+                migrations.AddIndex(
+                    model_name='driverlocations',
+                    index=models.Index(fields=['driver', 'created_at'], name='driverlocation_driver_time_idx'),
+                ),
+            ],
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 3.2.13 on 2026-10-18 10:03
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('drivers', '0014_driverlocations_partitioned'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DriverLocationTrack',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hour', models.DateTimeField()),
+                ('points', models.BinaryField()),
+                ('raw_count', models.PositiveIntegerField(default=0)),
+                ('driver', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to='drivers.driver')),
+            ],
+            options={
+                'verbose_name': 'Driver Location Track',
+                'verbose_name_plural': 'Driver Location Tracks',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='driverlocationtrack',
+            constraint=models.UniqueConstraint(fields=('driver', 'hour'), name='unique_driver_location_track'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 3.2.13 on 2026-10-18 10:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('drivers', '0015_driverlocationtrack'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='drivercontract',
+            index=models.Index(fields=['updated_at', 'id'], name='drivercontract_updated_idx'),
+        ),
+    ]
@@ -15,7 +15,7 @@ from libs.models import BaseModel
 from users.models import User
 
 # app level imports
-from .helpers import driver_age_validator
+from .helpers import driver_age_validator, decode_track
 
 logger = logging.getLogger(__name__)
 
@@ -100,6 +100,8 @@ class Onboarding(BaseModel):
         null=True,
         blank=True,
     )
+    # the credentials of the driver user are derived from these
+    tracker = FieldTracker(fields=["full_name", "mobile_no"])
 
     def __str__(self):
         return f"{self.id} | {self.mobile_no}"
@@ -211,7 +213,11 @@ class Driver(BaseModel):
 
 
 class DriverLocations(models.Model):
-    driver = models.ForeignKey(Driver, on_delete=models.PROTECT)
+    """
+    Model to store the driver pings. The table is partitioned by month on
+    created_at, see create_location_partitions.
+    """
+    driver = models.ForeignKey(Driver, on_delete=models.PROTECT, db_index=False)
     created_at = models.DateTimeField()
     lat = models.FloatField()
     long = models.FloatField()
@@ -219,6 +225,61 @@ class DriverLocations(models.Model):
     class Meta:
         verbose_name = "Driver Location"
         verbose_name_plural = "Driver Locations"
+        indexes = [
+            models.Index(
+                fields=["driver", "created_at"],
+                name="driverlocation_driver_time_idx",
+            ),
+        ]
+
+    @classmethod
+    def get_history(cls, driver_id, start, end):
+        """
+        Returns the (lat, long, timestamp) points of a driver between start
+        and end, from the raw pings and from the hourly tracks of the
+        rolled up months
+        """
+        hour = start.replace(minute=0, second=0, microsecond=0)
+        points = [
+            point
+            for track in DriverLocationTrack.objects.filter(
+                driver_id=driver_id,
+                hour__gte=hour,
+                hour__lt=end,
+            ).values_list("points", flat=True)
+            for point in decode_track(track)
+            if start <= point[2] < end
+        ]
+        points.extend(
+            cls.objects.filter(
+                driver_id=driver_id,
+                created_at__gte=start,
+                created_at__lt=end,
+            ).values_list("lat", "long", "created_at")
+        )
+        return sorted(points, key=lambda point: point[2])
+
+
+class DriverLocationTrack(models.Model):
+    """
+    Model to store the simplified track of a driver for an hour, the raw
+    pings are rolled up into tracks once past retention
+    """
+    driver = models.ForeignKey(Driver, on_delete=models.PROTECT)
+    hour = models.DateTimeField()
+    # (lat, long, timestamp) doubles, see encode_track
+    points = models.BinaryField()
+    raw_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Driver Location Track"
+        verbose_name_plural = "Driver Location Tracks"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["driver", "hour"],
+                name="unique_driver_location_track",
+            ),
+        ]
 
 
 class DriverAadharDetails(models.Model):
@@ -257,6 +318,9 @@ class DriverContract(BaseModel):
     class Meta:
         verbose_name = "Driver Contract"
         verbose_name_plural = "Driver Contracts"
+        indexes = [
+            models.Index(fields=["updated_at", "id"], name="drivercontract_updated_idx"),
+        ]
 
 
 class DriverContractLog(models.Model):
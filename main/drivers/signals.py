@@ -11,6 +11,7 @@ from django.dispatch import receiver
 from rest_framework.authtoken.models import Token
 # project level imports
 from users.models import User
+from users.helpers import invalidate_auth_tokens
 from config.models import Config
 
 # app level imports
@@ -20,37 +21,29 @@ from .models import (
     DriverAadharDetails,
     DriverContract,
 )
+from .helpers import get_driver_password, provision_driver_users
 
 logger = logging.getLogger(__name__)
 
 
 @receiver(pre_save, sender=Driver)
 def driver_pre_save_handler(sender, instance, **kwargs):
-    user = User.objects.filter(username=str(instance.onboarding.mobile_no)).first()
-    if user is not None:
-        user.username = str(instance.onboarding.mobile_no)
-        user.full_name = instance.onboarding.full_name
-        user.phone_no = instance.onboarding.mobile_no
-        user.set_password(instance.onboarding.full_name.replace(" ", "")[:4] + str(instance.onboarding.mobile_no)[:4])
-        user.save()
+    """
+        Provision the user of a new driver, name and mobile number changes
+        are synced by sync_driver_user
+    """
+    if instance.user_id is not None:
         return
-    username = str(instance.onboarding.mobile_no)
-    password = instance.onboarding.full_name[:4] + username[:4]
     try:
-        user = User.objects.create_user(
-            username=username,
-            password=password,
-            full_name=instance.onboarding.full_name,
-            phone_no=instance.onboarding.mobile_no,
-            role=0,
-        )
+        user = provision_driver_users([instance.onboarding])[instance.onboarding.id]
         instance.user = user
-        instance.id = user.id
+        if instance._state.adding:
+            instance.id = user.id
     except Exception:
         logger.error(
             "{} ERROR creating user for the driver {}".format(
                 datetime.now(),
-                username,
+                instance.onboarding.mobile_no,
             ), exc_info=True
         )
 
@@ -64,29 +57,46 @@ def driver_post_save_handler(sender, instance, **kwargs):
         try:
             user = instance.user
             if instance.is_active is False:
+                # the cached token goes with it, see token_post_delete_handler
                 user.auth_token.delete()
                 user.is_active = False
             else:
                 user.is_active = True
                 Token.objects.create(user=user)
+            # drops the cached token of the user
             user.save()
         except Exception:
             logger.error("Error deleting the user token", exc_info=True)
 
 
+@receiver(post_save, sender=Driver)
+def driver_token_cache_handler(sender, instance, **kwargs):
+    """
+        Drop the cached token of the user, it holds the driver
+    """
+    if instance.user_id is not None:
+        invalidate_auth_tokens([instance.user_id])
+
+
 @receiver(post_save, sender=Onboarding)
 def onboarding_post_save_handler(sender, instance, created, **kwargs):
+    invalidate_auth_tokens(Driver.objects.filter(onboarding=instance).values("user_id"))
     if instance.status is Onboarding.Status.APPROVED.value:
         mobile_no = instance.mobile_no
         vendor = None
         if hasattr(instance, "vendor"):
             vendor = instance.vendor
+        # the user provisioned in a batch by approve_onboardings
+        defaults = {}
+        if getattr(instance, "driver_user", None) is not None:
+            defaults = {"id": instance.driver_user.id, "user": instance.driver_user}
         try:
             Driver.objects.get_or_create(
                 onboarding=instance,
                 doj=datetime.now().date(),
                 vendor=vendor,
                 remarks=instance.remarks,
+                defaults=defaults,
             )
         except IntegrityError:
             logger.info(
@@ -97,6 +107,24 @@ def onboarding_post_save_handler(sender, instance, created, **kwargs):
             )
 
 
+@receiver(pre_save, sender=Onboarding)
+def sync_driver_user(sender, instance, **kwargs):
+    """
+        Update the user of the driver when the name or mobile number
+        changes, the password is derived from both
+    """
+    if instance._state.adding or not instance.tracker.changed():
+        return
+    user = User.objects.filter(driver__onboarding=instance).first()
+    if user is None:
+        return
+    user.username = str(instance.mobile_no)
+    user.full_name = instance.full_name
+    user.phone_no = instance.mobile_no
+    user.set_password(get_driver_password(instance.full_name, instance.mobile_no))
+    user.save()
+
+
 @receiver(pre_save, sender=Onboarding)
 def verify_onboarding(sender, instance, update_fields=None, **kwargs):
     # set has_driving_license field
@@ -144,3 +172,4 @@ def mark_contract_accepted_false(sender, instance, created, **kwargs):
         contract_config.value = instance.id
         contract_config.save()
         Driver.objects.all().update(contract_accepted=False)
+        invalidate_auth_tokens(Driver.objects.values("user_id"))
@@ -1,14 +1,201 @@
 from main.celery import app
+from django.contrib.admin.models import LogEntry, CHANGE
+from django.contrib.contenttypes.models import ContentType
 from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Min
+from django.utils import timezone
+from datetime import datetime, timedelta
+from itertools import groupby
 from time import sleep
 import logging
 
+from vendors.models import Vendor
+from .models import Onboarding, DriverLocations, DriverLocationTrack
+from .helpers import (
+    provision_driver_users,
+    get_location_partitions,
+    create_location_partitions,
+    simplify_track,
+    encode_track,
+    decode_track,
+)
+from .constants import LOCATION_RAW_RETENTION_DAYS, LOCATION_ROLLUP_DRIVER_BATCH
+
 logger = logging.getLogger("drivers.views")
 
 
+@app.task(name="approve_onboardings")
+def approve_onboardings(onboarding_ids, remarks, vendor_id, user_id):
+    """
+    Approve the onboardings like the single candidate status change, the
+    users of the drivers are provisioned together before
+    """
+    onboardings = list(
+        Onboarding.objects.filter(id__in=onboarding_ids).exclude(
+            status=Onboarding.Status.APPROVED,
+        ).filter(driver__isnull=True)
+    )
+    vendor = Vendor.objects.filter(id=vendor_id).first() if vendor_id is not None else None
+    users = provision_driver_users(onboardings)
+    ctype = ContentType.objects.get_for_model(Onboarding)
+    message = f"status has been marked - APPROVED with the following\
+        remarks - {remarks} & vendor - {vendor}"
+    for onboarding in onboardings:
+        onboarding.status = Onboarding.Status.APPROVED.value
+        onboarding.remarks = remarks
+        onboarding.vendor = vendor
+        onboarding.updated_by_id = user_id
+        onboarding.driver_user = users[onboarding.id]
+        with transaction.atomic():
+            onboarding.save()
+        LogEntry.objects.log_action(
+            user_id=user_id,
+            content_type_id=ctype.id,
+            object_id=onboarding.id,
+            object_repr=str(onboarding),
+            change_message=message,
+            action_flag=CHANGE,
+        )
+    return len(onboardings)
+
+
 @app.task(name="print_hello")
 def print_hello():
     cache.set("hello", "world", timeout=3600)
     logging.info("msg")
     sleep(10)
     print("hello world")
+
+
+def rollup_driver_locations_batch(driver_ids, start, end, merge=False):
+    """
+    Replace the hourly tracks of the drivers between start and end with
+    the simplified pings, in one transaction. With merge the pings are
+    added to the existing tracks and deleted instead.
+    """
+    with transaction.atomic():
+        existing = {}
+        tracks = DriverLocationTrack.objects.filter(
+            driver_id__in=driver_ids,
+            hour__gte=start,
+            hour__lt=end,
+        )
+        if merge:
+            existing = {
+                (driver_id, hour): (track_id, decode_track(points), raw_count)
+                for track_id, driver_id, hour, points, raw_count in tracks.values_list(
+                    "id",
+                    "driver_id",
+                    "hour",
+                    "points",
+                    "raw_count",
+                )
+            }
+        else:
+            tracks.delete()
+        locations = DriverLocations.objects.filter(
+            driver_id__in=driver_ids,
+            created_at__gte=start,
+            created_at__lt=end,
+        )
+        rows = locations.order_by("driver_id", "created_at").values_list(
+            "driver_id",
+            "lat",
+            "long",
+            "created_at",
+        ).iterator(chunk_size=10000)
+        tracks = []
+        replaced = []
+        for (driver_id, hour), group in groupby(
+            rows,
+            key=lambda row: (row[0], row[3].replace(minute=0, second=0, microsecond=0)),
+        ):
+            points = [(lat, long, created_at) for __, lat, long, created_at in group]
+            raw_count = len(points)
+            if (driver_id, hour) in existing:
+                track_id, previous, previous_count = existing[(driver_id, hour)]
+                replaced.append(track_id)
+                points = sorted(previous + points, key=lambda point: point[2])
+                raw_count += previous_count
+            tracks.append(
+                DriverLocationTrack(
+                    driver_id=driver_id,
+                    hour=hour,
+                    points=encode_track(simplify_track(points)),
+                    raw_count=raw_count,
+                )
+            )
+            if len(tracks) >= 1000:
+                DriverLocationTrack.objects.filter(id__in=replaced).delete()
+                DriverLocationTrack.objects.bulk_create(tracks)
+                tracks = []
+                replaced = []
+        DriverLocationTrack.objects.filter(id__in=replaced).delete()
+        DriverLocationTrack.objects.bulk_create(tracks)
+        if merge:
+            locations.delete()
+
+
+def rollup_location_partition(name, start, end):
+    """
+    Roll the pings of a partition up into simplified hourly tracks, one
+    transaction per batch of drivers, and drop the partition once every
+    batch is committed. A failed run is retried from scratch, the batches
+    replace their tracks.
+    """
+    driver_ids = sorted(
+        DriverLocations.objects.filter(
+            created_at__gte=start,
+            created_at__lt=end,
+        ).values_list("driver_id", flat=True).distinct()
+    )
+    for index in range(0, len(driver_ids), LOCATION_ROLLUP_DRIVER_BATCH):
+        rollup_driver_locations_batch(
+            driver_ids[index:index + LOCATION_ROLLUP_DRIVER_BATCH],
+            start,
+            end,
+        )
+    with connection.cursor() as cursor:
+        cursor.execute(f'DROP TABLE "{name}"')
+
+
+def rollup_default_locations(cutoff):
+    """
+    Roll up the pings past retention left in the default partition, the
+    pings of months without a partition, e.g. sent late for a month rolled
+    up already. They are merged into the hourly tracks.
+    """
+    end = min([cutoff] + [start for __, start, __ in get_location_partitions()])
+    end = end.replace(minute=0, second=0, microsecond=0)
+    locations = DriverLocations.objects.filter(created_at__lt=end)
+    start = locations.aggregate(start=Min("created_at"))["start"]
+    if start is None:
+        return
+    start = start.replace(minute=0, second=0, microsecond=0)
+    driver_ids = sorted(locations.values_list("driver_id", flat=True).distinct())
+    for index in range(0, len(driver_ids), LOCATION_ROLLUP_DRIVER_BATCH):
+        rollup_driver_locations_batch(
+            driver_ids[index:index + LOCATION_ROLLUP_DRIVER_BATCH],
+            start,
+            end,
+            merge=True,
+        )
+
+
+@app.task(name="rollup_driver_locations")
+def rollup_driver_locations():
+    """
+    Roll up the location partitions and the default partition pings past
+    retention and create the upcoming partitions
+    """
+    cutoff = timezone.now() - timedelta(days=LOCATION_RAW_RETENTION_DAYS)
+    for name, start, end in get_location_partitions():
+        if end > cutoff:
+            break
+        rollup_location_partition(name, start, end)
+        logger.info(f"{datetime.now()} driver locations {name} rolled up")
+    rollup_default_locations(cutoff)
+    # the partitions are only created here, pings of a month without one
+    # land in the default partition
+    create_location_partitions(timezone.localdate())
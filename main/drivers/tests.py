@@ -0,0 +1,308 @@
+# python imports
+import gzip
+import json
+from datetime import date, datetime, timedelta
+from unittest import mock
+# django imports
+from django.db import connection
+from django.utils import timezone
+import fakeredis
+from django.test import SimpleTestCase
+from django.test.utils import CaptureQueriesContext
+# project imports
+from bookings.tests import DriverRosterTestCase
+from users.models import User
+from vendors.models import Vendor
+# app imports
+from .models import Driver, DriverLocations, DriverLocationTrack, Onboarding
+from .helpers import (
+    provision_driver_users,
+    create_location_partitions,
+    get_location_partitions,
+    update_live_position,
+    get_live_position,
+    get_drivers_nearby,
+    parse_locations,
+    encode_track,
+)
+from .tasks import approve_onboardings, rollup_location_partition, rollup_default_locations
+
+
+def create_onboardings(count):
+    return [
+        Onboarding.objects.create(
+            full_name="Driver {}".format(i),
+            dob=date(1990, 1, 1),
+            mobile_no=9200000000 + i,
+            house_no="1",
+            street="Street",
+            locality="Locality",
+            city="Chennai",
+            pincode=600001,
+            state="Tamil Nadu",
+            photo="https://example.com/photo.jpg",
+            aadhar_number=200000000000 + i,
+            aadhar_front="https://example.com/front.jpg",
+            aadhar_back="https://example.com/back.jpg",
+            has_driver_license=False,
+            account_number="1234567890",
+            account_name="Driver",
+            ifsc_code="IFSC0000001",
+        )
+        for i in range(count)
+    ]
+
+
+class DriverCredentialsTestCase(DriverRosterTestCase):
+
+    def test_driver_save_keeps_the_password(self):
+        password = self.driver.user.password
+        self.driver.remarks = "remarks"
+        self.driver.save()
+        self.driver.user.refresh_from_db()
+        self.assertEqual(self.driver.user.password, password)
+        self.assertTrue(self.driver.user.check_password("Driv9100"))
+
+    def test_name_change_updates_the_password(self):
+        onboarding = self.driver.onboarding
+        onboarding.full_name = "New Name"
+        onboarding.save()
+        self.driver.user.refresh_from_db()
+        self.assertEqual(self.driver.user.full_name, "New Name")
+        self.assertTrue(self.driver.user.check_password("NewN9100"))
+
+    def test_app_version_is_one_update(self):
+        url = "/drivers/drivers/{}/app-version/".format(self.driver.id)
+        self.client.get("/drivers/drivers/")
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(url, {"app_version": "1.2.0"}, format="json")
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(len(queries), 1)
+        self.assertTrue(queries[0]["sql"].startswith("UPDATE"))
+        self.assertEqual(self.client.get("/drivers/drivers/").data["app_version"], "1.2.0")
+
+    def test_batch_provisioning(self):
+        users = provision_driver_users(create_onboardings(3))
+        self.assertEqual(len(users), 3)
+        user = User.objects.get(username="9200000001")
+        self.assertEqual(user.role, User.Role.NON_STAFF)
+        self.assertTrue(user.check_password("Driv9200"))
+
+    def test_batch_approval(self):
+        vendor = Vendor.objects.create(
+            name="Vendor",
+            address="Address",
+            city="Chennai",
+            locality="Locality",
+            state="Tamil Nadu",
+            contact_person="Contact",
+            contact_number=9000000000,
+            gst="GST",
+            account_number=1234567890,
+            account_name="Vendor",
+            ifsc_code="IFSC0000001",
+        )
+        onboardings = create_onboardings(2)
+        ids = [onboarding.id for onboarding in onboardings]
+        self.assertEqual(approve_onboardings(ids, "remarks", vendor.id, self.driver.user.id), 2)
+        drivers = Driver.objects.filter(onboarding_id__in=ids).select_related("user", "onboarding")
+        self.assertEqual(len(drivers), 2)
+        for driver in drivers:
+            self.assertEqual(driver.id, driver.user_id)
+            self.assertEqual(driver.vendor, vendor)
+            self.assertEqual(driver.remarks, "remarks")
+            self.assertEqual(driver.onboarding.status, Onboarding.Status.APPROVED)
+            self.assertTrue(driver.user.check_password("Driv9200"))
+        # approved onboardings are skipped
+        self.assertEqual(approve_onboardings(ids, "remarks", None, self.driver.user.id), 0)
+
+
+class LocationRollupTestCase(DriverRosterTestCase):
+
+    def setUp(self):
+        super().setUp()
+        create_location_partitions(date(2024, 2, 1), months=1)
+        self.partition = [
+            partition for partition in get_location_partitions()
+            if partition[0] == "drivers_driverlocations_2024_02"
+        ][0]
+        onboarding, = create_onboardings(1)
+        self.drivers = [
+            self.driver,
+            Driver.objects.create(onboarding=onboarding, doj=date(2023, 1, 1)),
+        ]
+        start = timezone.make_aware(datetime(2024, 2, 10, 10, 0))
+        DriverLocations.objects.bulk_create(
+            [
+                DriverLocations(
+                    driver=driver,
+                    lat=13.0 + i * 0.001,
+                    long=80.2,
+                    created_at=start + timedelta(minutes=i),
+                )
+                for driver in self.drivers
+                for i in range(5)
+            ]
+        )
+        # the deferred driver checks would block the drop in the test transaction
+        with connection.cursor() as cursor:
+            cursor.execute("SET CONSTRAINTS ALL IMMEDIATE")
+
+    def get_tracks(self):
+        return sorted(DriverLocationTrack.objects.values_list("driver_id", "raw_count"))
+
+    def test_partition_is_dropped_after_every_batch(self):
+        with mock.patch("drivers.tasks.LOCATION_ROLLUP_DRIVER_BATCH", 1), mock.patch(
+            "drivers.tasks.simplify_track",
+            side_effect=[[], RuntimeError],
+        ):
+            with self.assertRaises(RuntimeError):
+                rollup_location_partition(*self.partition)
+        # the first batch is committed, the partition is kept
+        self.assertEqual(self.get_tracks(), [(self.drivers[0].id, 5)])
+        self.assertIn(self.partition, get_location_partitions())
+
+        with mock.patch("drivers.tasks.LOCATION_ROLLUP_DRIVER_BATCH", 1):
+            rollup_location_partition(*self.partition)
+        self.assertEqual(self.get_tracks(), [(driver.id, 5) for driver in self.drivers])
+        self.assertNotIn(self.partition, get_location_partitions())
+
+    def test_default_partition_is_merged(self):
+        hour = datetime(2024, 1, 10, 10, 0, tzinfo=timezone.utc)
+        DriverLocationTrack.objects.create(
+            driver=self.driver,
+            hour=hour,
+            points=encode_track([(13.0, 80.2, hour), (13.001, 80.2, hour + timedelta(minutes=1))]),
+            raw_count=2,
+        )
+        # no partition for january, the pings land in the default one
+        DriverLocations.objects.bulk_create(
+            [
+                DriverLocations(
+                    driver=self.driver,
+                    lat=13.002 + i * 0.001,
+                    long=80.2,
+                    created_at=hour + timedelta(minutes=2 + i * 20),
+                )
+                for i in range(5)
+            ]
+        )
+        rollup_default_locations(timezone.now() - timedelta(days=30))
+        self.assertEqual(
+            sorted(DriverLocationTrack.objects.values_list("hour", "raw_count")),
+            [(hour, 5), (hour + timedelta(hours=1), 2)],
+        )
+        self.assertFalse(DriverLocations.objects.filter(created_at__lt=self.partition[1]).exists())
+        self.assertEqual(DriverLocations.objects.count(), 10)
+
+
+class LivePositionTestCase(SimpleTestCase):
+
+    def setUp(self):
+        redis = fakeredis.FakeRedis()
+        patcher = mock.patch("drivers.helpers.get_redis_connection", return_value=redis)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.now = timezone.now()
+
+    def test_stale_ping_is_ignored(self):
+        self.assertTrue(update_live_position(1, 13.0, 80.2, self.now))
+        self.assertFalse(update_live_position(1, 13.1, 80.3, self.now - timedelta(minutes=1)))
+        self.assertEqual(get_live_position(1)[:2], (13.0, 80.2))
+        self.assertTrue(update_live_position(1, 13.2, 80.4, self.now + timedelta(minutes=1)))
+        self.assertEqual(get_live_position(1)[:2], (13.2, 80.4))
+        self.assertEqual(get_drivers_nearby(13.2, 80.4, 1)[0][0], 1)
+
+    def test_nearby_skips_drivers_not_seen_lately(self):
+        update_live_position(1, 13.01, 80.2, self.now)
+        update_live_position(2, 13.0, 80.2, self.now - timedelta(minutes=20))
+        update_live_position(3, 14.0, 80.2, self.now)
+        self.assertEqual([driver_id for driver_id, __ in get_drivers_nearby(13.0, 80.2, 5)], [1])
+        self.assertEqual(
+            [driver_id for driver_id, __ in get_drivers_nearby(13.0, 80.2, 5, max_age=3600)],
+            [2, 1],
+        )
+
+
+class ParseLocationsTestCase(SimpleTestCase):
+
+    def test_timestamp_formats(self):
+        now = timezone.now().replace(microsecond=0)
+        naive = datetime(2024, 1, 10, 10, 0)
+        points, rejected = parse_locations(
+            [
+                [13.0, 80.2, now.timestamp()],
+                ["13.0", "80.2", now.isoformat()],
+                {"lat": 13.0, "long": 80.2, "timestamp": naive.isoformat()},
+            ]
+        )
+        self.assertEqual(rejected, 0)
+        self.assertEqual(
+            points,
+            [
+                (13.0, 80.2, now),
+                (13.0, 80.2, now),
+                (13.0, 80.2, timezone.make_aware(naive)),
+            ],
+        )
+
+    def test_invalid_points_are_rejected(self):
+        now = timezone.now()
+        points, rejected = parse_locations(
+            [
+                [13.0, 80.2],
+                ["lat", 80.2, now.timestamp()],
+                [91, 80.2, now.timestamp()],
+                [13.0, 181, now.timestamp()],
+                [13.0, 80.2, (now + timedelta(minutes=10)).timestamp()],
+                [13.0, 80.2, "yesterday"],
+                [13.0, 80.2, None],
+                {"lat": 13.0},
+                [13.0, 80.2, now.timestamp()],
+            ]
+        )
+        self.assertEqual((len(points), rejected), (1, 8))
+
+
+class LocationBatchTestCase(DriverRosterTestCase):
+
+    def post_batch(self, locations, **extra):
+        body = json.dumps({"locations": locations}).encode()
+        if extra.get("HTTP_CONTENT_ENCODING") == "gzip":
+            body = gzip.compress(body)
+        with mock.patch(
+            "drivers.views.update_live_position",
+        ), CaptureQueriesContext(connection) as queries:
+            response = self.client.generic(
+                "POST",
+                "/drivers/locations/batch/",
+                body,
+                content_type="application/json",
+                **extra,
+            )
+        self.assertFalse([query for query in queries if "CREATE TABLE" in query["sql"]])
+        return response
+
+    def test_gzip_batch(self):
+        now = timezone.now().timestamp()
+        response = self.post_batch(
+            [[13.0, 80.2, now - 60], [13.001, 80.2, now], [91, 80.2, now]],
+            HTTP_CONTENT_ENCODING="gzip",
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data, {"accepted": 2, "rejected": 1})
+        self.assertEqual(DriverLocations.objects.filter(driver=self.driver).count(), 2)
+
+    def test_plain_batch(self):
+        response = self.post_batch([[13.0, 80.2, timezone.now().timestamp()]])
+        self.assertEqual(response.data, {"accepted": 1, "rejected": 0})
+
+    def test_invalid_gzip_body(self):
+        response = self.client.generic(
+            "POST",
+            "/drivers/locations/batch/",
+            b"not gzip",
+            content_type="application/json",
+            HTTP_CONTENT_ENCODING="gzip",
+        )
+        self.assertEqual(response.status_code, 400)
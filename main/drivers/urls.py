@@ -9,6 +9,7 @@ router = routers.DefaultRouter()
 router.register(r"onboardings", views.OnboardingViewSet)
 router.register(r"drivers", views.DriverViewSet)
 router.register(r"contracts", views.DriverContractViewSet)
+router.register(r"locations", views.DriverLocationsViewSet)
 
 urlpatterns = [
     path("s3-upload/", views.GetUploadURL.as_view()),
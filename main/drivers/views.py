@@ -5,18 +5,27 @@ import boto3
 import requests
 import logging
 import threading
+from datetime import datetime, timedelta
 from botocore.client import Config as Cfg
 
 # Django imports
 from django.conf import settings
 from django.core.cache import cache
+from django.core.exceptions import ObjectDoesNotExist
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 from rest_framework import viewsets, views, status
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from rest_framework.decorators import api_view, action
 
 # project imports
 from config.models import Config
+from config.serializers import ConfigSerializer
+from fleets.models import Station
+from clients.models import ClientStore
+from bookings.models import Roster, Trip, RosterDriverLog
+from bookings.serializers import RosterFeedSerializer, TripSerializer
 
 # app imports
 from .models import (
@@ -33,7 +42,30 @@ from .serializers import (
     DriverLocationsSerializer,
     DriverContractSerializer,
 )
+from .helpers import (
+    parse_locations,
+    update_live_position,
+    get_live_position,
+    get_drivers_nearby,
+)
+from .constants import (
+    LOCATION_BATCH_LIMIT,
+    LOCATION_HISTORY_MAX_DAYS,
+    INVALID_LOCATIONS,
+    INVALID_LOCATION_RANGE,
+    INVALID_NEARBY_SEARCH,
+    NEARBY_MAX_RADIUS,
+    DRIVER_NOT_FOUND,
+    LOCATION_NOT_FOUND,
+    SYNC_PAGE_SIZE,
+    SYNC_SETTLE_SECONDS,
+    INVALID_SYNC_CURSOR,
+)
 from libs.constants import INVALID_DATA
+from libs.parsers import GzipJSONParser
+from libs.paginations import sync_page, decode_sync_cursor
+from libs.mixins import DriverRequestMixin
+from users.helpers import invalidate_request_token
 
 logger = logging.getLogger(__name__)
 
@@ -44,22 +76,138 @@ class OnboardingViewSet(viewsets.ModelViewSet):
     http_method_names = ["post"]
 
 
-class DriverLocationsViewSet(viewsets.ModelViewSet):
+class DriverLocationsViewSet(DriverRequestMixin, viewsets.GenericViewSet):
     queryset = DriverLocations.objects.all()
     serializer_class = DriverLocationsSerializer
     permission_classes = [IsAuthenticated]
-    http_method_names = ["post"]
+    http_method_names = ["get", "post"]
+
+    @action(
+        methods=["POST"],
+        detail=False,
+        url_path="batch",
+        parser_classes=[GzipJSONParser],
+    )
+    def batch(self, request, *args, **kwargs):
+        """
+        Store a batch of [lat, long, timestamp] pings of the driver,
+        the body may be gzip compressed
+        """
+        locations = request.data.get("locations") if isinstance(request.data, dict) else None
+        if not isinstance(locations, list) or len(locations) > LOCATION_BATCH_LIMIT:
+            return Response(INVALID_LOCATIONS, status=status.HTTP_400_BAD_REQUEST)
+        if request.driver is None:
+            return Response(DRIVER_NOT_FOUND, status=status.HTTP_404_NOT_FOUND)
+        driver_id = request.driver.id
+        points, rejected = parse_locations(locations)
+        DriverLocations.objects.bulk_create(
+            [
+                DriverLocations(driver_id=driver_id, lat=lat, long=long, created_at=created_at)
+                for lat, long, created_at in points
+            ],
+            batch_size=LOCATION_BATCH_LIMIT,
+        )
+        if points:
+            try:
+                update_live_position(driver_id, *max(points, key=lambda point: point[2]))
+            except Exception:
+                logger.error(
+                    "{} ERROR updating live position of driver {}".format(
+                        datetime.now(),
+                        driver_id,
+                    ), exc_info=True,
+                )
+        return Response(
+            {"accepted": len(points), "rejected": rejected},
+            status=status.HTTP_201_CREATED,
+        )
+
+    @action(methods=["GET"], detail=False, url_path="history")
+    def history(self, request, *args, **kwargs):
+        """
+        Location history of a driver between start and end, staff users
+        may pass any driver
+        """
+        start = parse_datetime(request.query_params.get("start", ""))
+        end = parse_datetime(request.query_params.get("end", ""))
+        if (
+            start is None or end is None
+            or timezone.is_naive(start) or timezone.is_naive(end)
+            or not timedelta(0) < end - start <= timedelta(days=LOCATION_HISTORY_MAX_DAYS)
+        ):
+            return Response(INVALID_LOCATION_RANGE, status=status.HTTP_400_BAD_REQUEST)
+        if request.user.is_staff and request.query_params.get("driver", "").isdigit():
+            driver_id = request.query_params["driver"]
+        else:
+            driver_id = getattr(request.driver, "id", None)
+        if driver_id is None:
+            return Response(DRIVER_NOT_FOUND, status=status.HTTP_404_NOT_FOUND)
+        points = DriverLocations.get_history(driver_id, start, end)
+        return Response(
+            {
+                "driver": int(driver_id),
+                "locations": [
+                    [lat, long, created_at.isoformat()]
+                    for lat, long, created_at in points
+                ],
+            }
+        )
+
+    @action(
+        methods=["GET"],
+        detail=False,
+        url_path="nearby",
+        permission_classes=[IsAdminUser],
+    )
+    def nearby(self, request, *args, **kwargs):
+        """
+        Drivers recently seen within radius km of a client store or station
+        """
+        params = request.query_params
+        try:
+            radius = float(params["radius"])
+            if "store" in params:
+                place = ClientStore.objects.values("lat", "long").get(id=int(params["store"]))
+            else:
+                place = Station.objects.values("lat", "long").get(id=int(params["station"]))
+        except (KeyError, ValueError, ObjectDoesNotExist):
+            return Response(INVALID_NEARBY_SEARCH, status=status.HTTP_400_BAD_REQUEST)
+        if not 0 < radius <= NEARBY_MAX_RADIUS:
+            return Response(INVALID_NEARBY_SEARCH, status=status.HTTP_400_BAD_REQUEST)
+        drivers = get_drivers_nearby(place["lat"], place["long"], radius)
+        return Response(
+            [
+                {"driver": driver_id, "distance": round(distance, 3)}
+                for driver_id, distance in drivers
+            ]
+        )
+
+    @action(methods=["GET"], detail=False, url_path="last")
+    def last(self, request, *args, **kwargs):
+        """
+        Last known position of a driver, staff users may pass any driver
+        """
+        if request.user.is_staff and request.query_params.get("driver", "").isdigit():
+            driver_id = int(request.query_params["driver"])
+        else:
+            driver_id = getattr(request.driver, "id", None)
+        position = get_live_position(driver_id) if driver_id is not None else None
+        if position is None:
+            return Response(LOCATION_NOT_FOUND, status=status.HTTP_404_NOT_FOUND)
+        lat, long, seen_at = position
+        return Response(
+            {"driver": driver_id, "lat": lat, "long": long, "timestamp": seen_at.isoformat()}
+        )
 
 
-class DriverViewSet(viewsets.ModelViewSet):
+class DriverViewSet(DriverRequestMixin, viewsets.ModelViewSet):
     queryset = Driver.objects.filter(is_active=True)
     serializer_class = DriverSerializer
     permission_classes = [IsAuthenticated]
     http_method_names = ["get", "post"]
 
     def list(self, request):
-        driver = Driver.objects.filter(user=request.user).first()
-        serializer = DriverSerializer(driver)
+        serializer = DriverSerializer(request.driver)
         return Response(serializer.data)
 
     def retrieve(self, request, pk=None):
@@ -69,19 +217,87 @@ class DriverViewSet(viewsets.ModelViewSet):
     
     @action(methods=['POST'], detail=True, url_path='app-version')
     def app_version(self, request, *args, **kwargs):
-        driver = self.get_object()
-        try:
-            driver.app_version = request.data["app_version"]
-        except KeyError:
+        """
+        Store the app version of the calling driver with a single update
+        """
+        app_version = request.data.get("app_version")
+        max_length = Driver._meta.get_field("app_version").max_length
+        if not isinstance(app_version, str) or len(app_version) > max_length:
             return Response(
                 INVALID_DATA,
                 status=status.HTTP_400_BAD_REQUEST,
             )
-        driver.save()
+        if request.driver is None or str(request.driver.id) != kwargs["pk"]:
+            return Response(DRIVER_NOT_FOUND, status=status.HTTP_404_NOT_FOUND)
+        Driver.objects.filter(id=request.driver.id).update(
+            app_version=app_version,
+            updated_at=timezone.now(),
+        )
+        invalidate_request_token(request)
         return Response(status=status.HTTP_204_NO_CONTENT)
 
+    @action(methods=["GET"], detail=False, url_path="sync")
+    def sync(self, request, *args, **kwargs):
+        """
+        Rosters, trips, contracts and configs changed since the cursor of
+        each, a missing cursor syncs from the start. Inactive rosters and
+        contracts, and rosters moved to another driver, are sent as removed.
+        """
+        if request.driver is None:
+            return Response(DRIVER_NOT_FOUND, status=status.HTTP_404_NOT_FOUND)
+        driver_id = request.driver.id
+        until = timezone.now() - timedelta(seconds=SYNC_SETTLE_SECONDS)
+        # name: (queryset, serializer, inactive rows are removed)
+        entities = {
+            "rosters": (
+                Roster.objects.filter(driver_id=driver_id).select_related(
+                    "client_store",
+                    "vehicle",
+                    "destination_station",
+                ),
+                RosterFeedSerializer,
+                True,
+            ),
+            "trips": (Trip.objects.filter(driver_id=driver_id), TripSerializer, False),
+            "contracts": (DriverContract.objects.all(), DriverContractSerializer, True),
+            "configs": (Config.objects.all(), ConfigSerializer, False),
+        }
+        data = {}
+        try:
+            for name, (queryset, serializer_class, tombstones) in entities.items():
+                rows, cursor, more = sync_page(
+                    queryset,
+                    request.query_params.get(name),
+                    SYNC_PAGE_SIZE,
+                    until,
+                )
+                removed = [row for row in rows if tombstones and not row.is_active]
+                data[name] = {
+                    "changed": serializer_class(
+                        [row for row in rows if row not in removed],
+                        many=True,
+                    ).data,
+                    "removed": [row.id for row in removed],
+                    "cursor": cursor,
+                    "more": more,
+                }
+            if request.query_params.get("rosters"):
+                since, __ = decode_sync_cursor(request.query_params["rosters"])
+                data["rosters"]["removed"].extend(
+                    RosterDriverLog.objects.filter(
+                        old_driver_id=driver_id,
+                        created_at__gt=since,
+                        created_at__lte=until,
+                    ).exclude(
+                        roster__driver_id=driver_id,
+                    ).values_list("roster_id", flat=True).distinct()
+                )
+        except ValueError:
+            return Response(INVALID_SYNC_CURSOR, status=status.HTTP_400_BAD_REQUEST)
+        return Response(data)
+
 
-class DriverContractViewSet(viewsets.ModelViewSet):
+class DriverContractViewSet(DriverRequestMixin, viewsets.ModelViewSet):
     queryset = DriverContract.objects.all()
     serializer_class = DriverContractSerializer
     permission_classes = [IsAuthenticated]
@@ -110,7 +326,9 @@ class DriverContractViewSet(viewsets.ModelViewSet):
 
     @action(methods=['POST'], detail=False, url_path='accept-contract')
     def accept_contract(self, request, *args, **kwargs):
-        driver = Driver.objects.get(id=request.user.id)
+        driver = request.driver
+        if driver is None:
+            return Response(DRIVER_NOT_FOUND, status=status.HTTP_404_NOT_FOUND)
         latest_contract = Config.get_value("latest_contract")
         contract = DriverContract.objects.get(id=latest_contract)
         if not driver.contract_accepted:
@@ -5,7 +5,7 @@ from django.contrib import admin, messages
 from django.shortcuts import render
 from django.urls import reverse, path
 from django.utils.html import escape, mark_safe
-from django.http import HttpResponseRedirect, HttpResponse
+from django.http import HttpResponseRedirect
 from django.conf import settings
 # project imports
 from libs.mixins import BaseMixin, ExportCSVMixin
@@ -13,6 +13,8 @@ from libs.forms import ImportCSVForm
 from libs.helpers import S3FileUpload
 from services.forms import ServiceForm
 from services.models import Service
+from jobs.models import ImportJob
+from jobs.helpers import start_import_job
 # app imports
 from .forms import (
     VehicleForm,
@@ -28,13 +30,6 @@ from .models import (
     Charger,
     GPSTracker,
 )
-from .helpers import (
-    tracker_import_csv_handler,
-    charger_import_csv_handler,
-    battery_import_csv_handler,
-    station_import_csv_handler,
-    vehicle_import_csv_handler,
-)
 
 admin.site.site_header = "Fyn Platform"
 admin.site.site_title = "Ops Center"
@@ -249,27 +244,7 @@ class VehicleAdmin(BaseMixin, ExportCSVMixin):
         if "import_csv" in request.POST:
             form = ImportCSVForm(request.POST, request.FILES)
             if form.is_valid():
-                f = request.FILES["file"]
-                added, skipped, invalid = vehicle_import_csv_handler(
-                    f,
-                    request.user,
-                )
-                if added == -1 and skipped == -1 and invalid == -1:
-                    return HttpResponse("Invalid vehicle CSV.")
-                messages.add_message(
-                    request,
-                    messages.INFO,
-                    f"{added} entries added. {skipped} skipped.",
-                )
-                if invalid:
-                    messages.add_message(
-                        request,
-                        messages.ERROR,
-                        f"{invalid} invalid entries. Reason:\
-                        Duplicate/invalid registration number,\
-                        station not found",
-                    )
-                return HttpResponseRedirect("..")
+                return start_import_job(request, ImportJob.TYPE.VEHICLE)
         else:
             form = ImportCSVForm()
 
@@ -323,16 +298,7 @@ class StationAdmin(BaseMixin, ExportCSVMixin):
         if "import_csv" in request.POST:
             form = ImportCSVForm(request.POST, request.FILES)
             if form.is_valid():
-                f = request.FILES["file"]
-                added, skipped = station_import_csv_handler(f, request.user)
-                if added == -1 and skipped == -1:
-                    return HttpResponse("Invalid Station CSV")
-                messages.add_message(
-                    request,
-                    messages.INFO,
-                    f"{added} entries added. {skipped} skipped.",
-                )
-                return HttpResponseRedirect("..")
+                return start_import_job(request, ImportJob.TYPE.STATION)
         else:
             form = ImportCSVForm()
 
@@ -403,16 +369,7 @@ class BatteryAdmin(BaseMixin, ExportCSVMixin):
         if "import_csv" in request.POST:
             form = ImportCSVForm(request.POST, request.FILES)
             if form.is_valid():
-                f = request.FILES["file"]
-                added, skipped = battery_import_csv_handler(f, request.user)
-                if added == -1 and skipped == -1:
-                    return HttpResponse("Invalid Battery CSV")
-                messages.add_message(
-                    request,
-                    messages.INFO,
-                    f"{added} entries added. {skipped} skipped.",
-                )
-                return HttpResponseRedirect("..")
+                return start_import_job(request, ImportJob.TYPE.BATTERY)
         else:
             form = ImportCSVForm()
 
@@ -491,16 +448,7 @@ class ChargerAdmin(BaseMixin, ExportCSVMixin):
         if "import_csv" in request.POST:
             form = ImportCSVForm(request.POST, request.FILES)
             if form.is_valid():
-                f = request.FILES["file"]
-                added, skipped = charger_import_csv_handler(f, request.user)
-                if added == -1 and skipped == -1:
-                    return HttpResponse("Invalid Charger CSV")
-                messages.add_message(
-                    request,
-                    messages.INFO,
-                    f"{added} entries added. {skipped} skipped.",
-                )
-                return HttpResponseRedirect("..")
+                return start_import_job(request, ImportJob.TYPE.CHARGER)
         else:
             form = ImportCSVForm()
 
@@ -568,16 +516,7 @@ class GPSTrackerAdmin(BaseMixin, ExportCSVMixin):
         if "import_csv" in request.POST:
             form = ImportCSVForm(request.POST, request.FILES)
             if form.is_valid():
-                f = request.FILES["file"]
-                added, skipped = tracker_import_csv_handler(f, request.user)
-                if added == -1 and skipped == -1:
-                    return HttpResponse("Invalid Tracker CSV")
-                messages.add_message(
-                    request,
-                    messages.INFO,
-                    f"{added} entries added. {skipped} skipped.",
-                )
-                return HttpResponseRedirect("..")
+                return start_import_job(request, ImportJob.TYPE.TRACKER)
         else:
             form = ImportCSVForm()
 
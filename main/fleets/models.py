@@ -18,6 +18,12 @@ from config.models import Config
 from users.models import User
 
 
+REGISTRATION_PATTERNS = {
+    1: re.compile(r"^PI [1-9][0-9]{4}$"),
+    2: re.compile(r"^([A-Z]{2}\s{1}\d{2}\s{1}[A-Z]{1,2}\s{1}\d{1,4})?([A-Z]{3}\s{1}\d{1,4})?$"),
+}
+
+
 class Vehicle(BaseModel):
     """
     Model to store vehicle details
@@ -112,12 +118,8 @@ class Vehicle(BaseModel):
         """
         Returns true if a registration number is valid
         """
-        pattern = r""
-        if speed == Vehicle.SPEED.LOW:
-            pattern = r"^PI [1-9][0-9]{4}$"
-        if speed == Vehicle.SPEED.HIGH:
-            pattern = r"^([A-Z]{2}\s{1}\d{2}\s{1}[A-Z]{1,2}\s{1}\d{1,4})?([A-Z]{3}\s{1}\d{1,4})?$"
-        if re.match(pattern, rno):
+        pattern = REGISTRATION_PATTERNS.get(speed)
+        if pattern is not None and pattern.match(rno):
             return True
         return False
 
@@ -0,0 +1,77 @@
+# python imports
+from io import BytesIO
+# django imports
+from django.test import TestCase
+# app imports
+from .models import Station, Vehicle
+from .helpers import StationImporter, VehicleImporter
+
+VEHICLE_HEADER = (
+    "registration_number,model,type,status,speed,station,insurance_start_date,"
+    "insurance_renewal_date,chassis_number,engine_number,dealer,financier,is_active"
+)
+
+
+class CSVImporterTestCase(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.station = Station.objects.create(
+            name="Station",
+            city="Chennai",
+            state="Tamil Nadu",
+            address="Address",
+            area="Area",
+            pincode=600001,
+            lat=13.05,
+            long=80.25,
+        )
+        Vehicle.objects.create(
+            registration_number="PI 10001",
+            model=Vehicle.MODEL.PIMO,
+            status=Vehicle.STATUS.FOR_DEPLOYMENT,
+            speed=Vehicle.SPEED.LOW,
+            station=cls.station,
+            chassis_number="CH1",
+            engine_number="EN1",
+        )
+
+    def import_vehicles(self, *lines):
+        return VehicleImporter().run(BytesIO("\n".join((VEHICLE_HEADER,) + lines).encode()))
+
+    def vehicle_line(self, registration_number, chassis_number, engine_number=""):
+        return "{},Pimo,L1,For Deployment,Low,Station,,,{},{},,,true".format(
+            registration_number,
+            chassis_number,
+            engine_number,
+        )
+
+    def test_unique_columns_are_reported(self):
+        added, errors = self.import_vehicles(
+            self.vehicle_line("PI 10002", "CH2", "EN2"),
+            self.vehicle_line("PI 10003", "CH1"),
+            self.vehicle_line("PI 10004", "CH4", "EN2"),
+            self.vehicle_line("PI 10001", "CH5"),
+            self.vehicle_line("PI 10005", ""),
+        )
+        self.assertEqual(added, 2)
+        self.assertEqual(
+            errors,
+            [
+                (2, "chassis_number already exists"),
+                (3, "engine_number duplicate of line 1"),
+                (4, "already exists"),
+            ],
+        )
+        self.assertEqual(Vehicle.objects.count(), 3)
+
+    def test_generated_codes_are_checked(self):
+        importer = StationImporter()
+        importer.get_defaults = lambda row: {"code": self.station.code}
+        added, errors = importer.run(
+            BytesIO(
+                b"name,city,area,pincode,state,address,lat,long,is_active\n"
+                b"Other,Chennai,Area,600001,Tamil Nadu,Address,13.1,80.3,true"
+            )
+        )
+        self.assertEqual((added, errors), (0, [(1, "code already exists")]))
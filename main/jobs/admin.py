@@ -0,0 +1,142 @@
+# django imports
+from django.contrib import admin
+from django.http import FileResponse, HttpResponseRedirect, Http404
+from django.shortcuts import render, get_object_or_404
+from django.urls import path
+# project imports
+from libs.helpers import FileStorage
+from libs.mixins import BaseLogMixin
+# app imports
+from .models import ImportJob, ExportJob
+
+
+class ImportJobAdmin(BaseLogMixin):
+    list_display = [
+        "id",
+        "type",
+        "status",
+        "progress",
+        "total_rows",
+        "created_by",
+        "created_at",
+    ]
+    list_filter = [
+        "type",
+        "status",
+    ]
+    readonly_fields = [
+        "type",
+        "status",
+        "file",
+        "total_rows",
+        "processed_rows",
+        "counts",
+        "errors",
+        "created_by",
+        "created_at",
+        "updated_at",
+    ]
+    date_hierarchy = 'created_at'
+    model = ImportJob
+
+    def get_urls(self):
+        urls = super().get_urls()
+        my_urls = [
+            path(
+                "<int:job_id>/status/",
+                self.admin_site.admin_view(self.status),
+                name="import_job_status",
+            ),
+        ]
+        return my_urls + urls
+
+    def status(self, request, job_id):
+        """
+        Status page of an import job, refreshes itself until the job finishes
+        """
+        job = get_object_or_404(ImportJob, id=job_id)
+        return render(
+            request,
+            "jobs/html/import_status.html",
+            {"title": f"Import Job {job.id}", "job": job},
+        )
+
+
+class ExportJobAdmin(BaseLogMixin):
+    list_display = [
+        "id",
+        "model",
+        "status",
+        "progress",
+        "total_rows",
+        "created_by",
+        "created_at",
+    ]
+    list_filter = [
+        "model",
+        "status",
+    ]
+    readonly_fields = [
+        "model",
+        "status",
+        "file",
+        "total_rows",
+        "processed_rows",
+        "created_by",
+        "created_at",
+        "updated_at",
+    ]
+    date_hierarchy = 'created_at'
+    model = ExportJob
+
+    def get_urls(self):
+        urls = super().get_urls()
+        my_urls = [
+            path(
+                "<int:job_id>/status/",
+                self.admin_site.admin_view(self.status),
+                name="export_job_status",
+            ),
+            path(
+                "<int:job_id>/download/",
+                self.admin_site.admin_view(self.download),
+                name="export_job_download",
+            ),
+        ]
+        return my_urls + urls
+
+    def status(self, request, job_id):
+        """
+        Status page of an export job, refreshes itself until the job finishes
+        """
+        job = get_object_or_404(ExportJob, id=job_id)
+        return render(
+            request,
+            "jobs/html/export_status.html",
+            {"title": f"Export Job {job.id}", "job": job},
+        )
+
+    def download(self, request, job_id):
+        """
+        Download the file of a completed export job
+        """
+        job = get_object_or_404(
+            ExportJob,
+            id=job_id,
+            status=ExportJob.STATUS.COMPLETED,
+        )
+        storage = FileStorage()
+        if storage.backend == "s3":
+            return HttpResponseRedirect(storage.url(job.file))
+        try:
+            return FileResponse(
+                open(storage.get_path(job.file), "rb"),
+                as_attachment=True,
+                filename=job.file.split("/")[-1],
+            )
+        except FileNotFoundError:
+            raise Http404("export file not found")
+
+
+admin.site.register(ImportJob, ImportJobAdmin)
+admin.site.register(ExportJob, ExportJobAdmin)
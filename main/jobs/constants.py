@@ -0,0 +1,3 @@
+# number of csv lines a worker imports or exports before the progress is saved
+IMPORT_CHUNK_SIZE = 500
+EXPORT_CHUNK_SIZE = 2000
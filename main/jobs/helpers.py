@@ -0,0 +1,83 @@
+# python imports
+import io
+import time
+import pickle
+# django imports
+from django.conf import settings
+from django.urls import reverse
+from django.http import HttpResponseRedirect
+# project imports
+from libs.helpers import FileStorage
+from fleets.helpers import (
+    tracker_import_csv_handler,
+    charger_import_csv_handler,
+    battery_import_csv_handler,
+    station_import_csv_handler,
+    vehicle_import_csv_handler,
+)
+from bookings.helpers import roster_import_csv_handler
+# app imports
+from .models import ImportJob, ExportJob
+
+IMPORT_HANDLERS = {
+    ImportJob.TYPE.VEHICLE: vehicle_import_csv_handler,
+    ImportJob.TYPE.STATION: station_import_csv_handler,
+    ImportJob.TYPE.BATTERY: battery_import_csv_handler,
+    ImportJob.TYPE.CHARGER: charger_import_csv_handler,
+    ImportJob.TYPE.TRACKER: tracker_import_csv_handler,
+    ImportJob.TYPE.ROSTER: roster_import_csv_handler,
+}
+
+
+def import_csv_chunk(type, content, user):
+    """
+    Run the import handler on a chunk of csv lines, returns the counts
+    and the list of (line number, error) for the chunk
+    """
+    added, errors = IMPORT_HANDLERS[type](io.BytesIO(content), user)
+    return {"added": added, "skipped": len(errors)}, errors
+
+
+def start_import_job(request, type):
+    """
+    Store the uploaded csv, queue the import and redirect to its status page
+    """
+    from .tasks import run_import_job
+
+    file = request.FILES["file"]
+    key = "{}{}_{}.csv".format(
+        settings.AWS_CONFIG["S3"]["FOLDERS"]["imports"],
+        int(time.time()),
+        request.user.id,
+    )
+    job = ImportJob.objects.create(
+        type=type,
+        file=FileStorage().save(key, file),
+        created_by=request.user,
+    )
+    run_import_job.delay(job.id)
+    return HttpResponseRedirect(
+        reverse("admin:import_job_status", args=[job.id]),
+    )
+
+
+def start_export_job(request, queryset):
+    """
+    Queue the csv export of the queryset and redirect to its status page
+    """
+    from .tasks import run_export_job
+
+    job = ExportJob.objects.create(
+        model=queryset.model._meta.label_lower,
+        query=pickle.dumps(queryset.query),
+        created_by=request.user,
+    )
+    run_export_job.delay(
+        job.id,
+        request.build_absolute_uri(
+            reverse("admin:export_job_download", args=[job.id]),
+        ),
+    )
+    return HttpResponseRedirect(
+        reverse("admin:export_job_status", args=[job.id]),
+    )
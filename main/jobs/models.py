@@ -0,0 +1,87 @@
+# django imports
+from django.db import models
+from django.utils.translation import gettext_lazy as _
+# project imports
+from libs.models import BaseModel
+
+
+class BaseJob(BaseModel):
+    """
+    Abstract model for the jobs processed by the workers
+    """
+    class STATUS(models.IntegerChoices):
+        PENDING = 0, _("Pending")
+        RUNNING = 1, _("Running")
+        COMPLETED = 2, _("Completed")
+        FAILED = 3, _("Failed")
+
+    status = models.PositiveSmallIntegerField(
+        choices=STATUS.choices,
+        default=STATUS.PENDING,
+    )
+    total_rows = models.PositiveIntegerField(default=0)
+    processed_rows = models.PositiveIntegerField(default=0)
+    created_by = models.ForeignKey(
+        "users.User",
+        on_delete=models.PROTECT,
+        editable=False,
+    )
+
+    class Meta:
+        abstract = True
+        ordering = ["-id"]
+
+    @property
+    def progress(self):
+        if self.total_rows == 0:
+            return 100 if self.status == BaseJob.STATUS.COMPLETED else 0
+        return int(self.processed_rows * 100 / self.total_rows)
+
+    @property
+    def is_finished(self):
+        return self.status in [
+            BaseJob.STATUS.COMPLETED.value,
+            BaseJob.STATUS.FAILED.value,
+        ]
+
+
+class ImportJob(BaseJob):
+    """
+    Model to store the csv imports processed by the workers
+    """
+    class TYPE(models.IntegerChoices):
+        VEHICLE = 0, _("Vehicle")
+        STATION = 1, _("Station")
+        BATTERY = 2, _("Battery")
+        CHARGER = 3, _("Charger")
+        TRACKER = 4, _("GPS Tracker")
+        ROSTER = 5, _("Roster")
+
+    type = models.PositiveSmallIntegerField(choices=TYPE.choices)
+    file = models.CharField(max_length=250)
+    counts = models.JSONField(default=dict)
+    errors = models.JSONField(default=list)
+
+    class Meta(BaseJob.Meta):
+        verbose_name = "Import Job"
+        verbose_name_plural = "Import Jobs"
+
+    def __str__(self):
+        return f"{self.id} | {self.get_type_display()}"
+
+
+class ExportJob(BaseJob):
+    """
+    Model to store the csv exports written by the workers
+    """
+    model = models.CharField(max_length=100)
+    # pickled query of the exported queryset
+    query = models.BinaryField(editable=False)
+    file = models.CharField(max_length=250, blank=True)
+
+    class Meta(BaseJob.Meta):
+        verbose_name = "Export Job"
+        verbose_name_plural = "Export Jobs"
+
+    def __str__(self):
+        return f"{self.id} | {self.model}"
@@ -0,0 +1,108 @@
+# python imports
+import csv
+import gzip
+import time
+import pickle
+import logging
+import tempfile
+from datetime import datetime
+# django imports
+from django.apps import apps
+from django.conf import settings
+from django.contrib import admin
+# project imports
+from main.celery import app
+from libs.helpers import FileStorage, email
+# app imports
+from .models import ImportJob, ExportJob
+from .helpers import import_csv_chunk
+from .constants import IMPORT_CHUNK_SIZE, EXPORT_CHUNK_SIZE
+
+logger = logging.getLogger(__name__)
+
+
+@app.task(name="run_import_job")
+def run_import_job(job_id):
+    """
+    Import the csv of the job in chunks and save the progress after each chunk
+    """
+    job = ImportJob.objects.select_related("created_by").get(id=job_id)
+    job.status = ImportJob.STATUS.RUNNING
+    job.save(update_fields=["status", "updated_at"])
+    try:
+        lines = FileStorage().read(job.file).decode().strip().splitlines()
+        header, rows = lines[0], lines[1:]
+        job.total_rows = len(rows)
+        for offset in range(0, len(rows), IMPORT_CHUNK_SIZE):
+            chunk = rows[offset:offset + IMPORT_CHUNK_SIZE]
+            counts, errors = import_csv_chunk(
+                job.type,
+                "\n".join([header] + chunk).encode(),
+                job.created_by,
+            )
+            for key, value in counts.items():
+                job.counts[key] = job.counts.get(key, 0) + value
+            job.errors.extend([[offset + lineno, error] for lineno, error in errors])
+            job.processed_rows = offset + len(chunk)
+            job.save(update_fields=["total_rows", "processed_rows", "counts", "errors", "updated_at"])
+        job.status = ImportJob.STATUS.COMPLETED
+    except Exception:
+        logger.error(
+            "{} ERROR import job {} failed".format(
+                datetime.now(),
+                job.id,
+            ), exc_info=True,
+        )
+        job.status = ImportJob.STATUS.FAILED
+    job.save(update_fields=["status", "updated_at"])
+
+
+@app.task(name="run_export_job")
+def run_export_job(job_id, download_url):
+    """
+    Write the csv export of the job as a gzip file, save the progress
+    every chunk of rows and mail the download link when done
+    """
+    job = ExportJob.objects.select_related("created_by").get(id=job_id)
+    job.status = ExportJob.STATUS.RUNNING
+    job.save(update_fields=["status", "updated_at"])
+    try:
+        model = apps.get_model(job.model)
+        model_admin = admin.site._registry[model]
+        queryset = model.objects.all()
+        queryset.query = pickle.loads(job.query)
+        job.total_rows = queryset.count()
+        rows = model_admin.get_csv_rows(model_admin.get_csv_queryset(queryset))
+        with tempfile.TemporaryFile() as tmp:
+            with gzip.open(tmp, "wt", newline="") as f:
+                writer = csv.writer(f)
+                writer.writerow(model_admin.csv_fields)
+                for index, row in enumerate(rows, 1):
+                    writer.writerow(row)
+                    if index % EXPORT_CHUNK_SIZE == 0:
+                        job.processed_rows = index
+                        job.save(update_fields=["total_rows", "processed_rows", "updated_at"])
+            tmp.seek(0)
+            key = "{}{}_{}.csv.gz".format(
+                settings.AWS_CONFIG["S3"]["FOLDERS"]["exports"],
+                model._meta.model_name,
+                int(time.time()),
+            )
+            job.file = FileStorage().save(key, tmp)
+        job.processed_rows = job.total_rows
+        job.status = ExportJob.STATUS.COMPLETED
+    except Exception:
+        logger.error(
+            "{} ERROR export job {} failed".format(
+                datetime.now(),
+                job.id,
+            ), exc_info=True,
+        )
+        job.status = ExportJob.STATUS.FAILED
+    job.save(update_fields=["status", "file", "total_rows", "processed_rows", "updated_at"])
+    if job.status == ExportJob.STATUS.COMPLETED and job.created_by.email:
+        email(
+            f"{model._meta.verbose_name_plural.capitalize()} export is ready",
+            f"Download the export from {download_url}",
+            [job.created_by.email],
+        )
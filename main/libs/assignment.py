@@ -0,0 +1,72 @@
+# python imports
+import heapq
+
+
+def min_cost_assignment(costs):
+    """
+    Min cost bipartite matching by successive shortest paths.
+    costs holds a dict of column -> non negative cost per row, pairs left
+    out can not be matched. As many rows as possible are matched, at the
+    least total cost. Returns a dict of row index -> column.
+    """
+    columns = sorted({column for row_costs in costs for column in row_costs})
+    # nodes: source, one per row, one per column, sink
+    source = 0
+    sink = len(costs) + len(columns) + 1
+    nodes = {column: len(costs) + 1 + i for i, column in enumerate(columns)}
+    # an edge is [to, capacity, cost, index of the reverse edge]
+    graph = [[] for __ in range(sink + 1)]
+
+    def add_edge(start, end, cost):
+        graph[start].append([end, 1, cost, len(graph[end])])
+        graph[end].append([start, 0, -cost, len(graph[start]) - 1])
+
+    for row, row_costs in enumerate(costs):
+        add_edge(source, row + 1, 0)
+        for column, cost in row_costs.items():
+            add_edge(row + 1, nodes[column], cost)
+    for node in nodes.values():
+        add_edge(node, sink, 0)
+
+    # the potentials keep the reduced costs non negative for dijkstra
+    potential = [0] * (sink + 1)
+    while True:
+        distance = [None] * (sink + 1)
+        previous = [None] * (sink + 1)
+        distance[source] = 0
+        done = [False] * (sink + 1)
+        heap = [(0, source)]
+        while heap:
+            dist, node = heapq.heappop(heap)
+            if done[node]:
+                continue
+            done[node] = True
+            if node == sink:
+                break
+            for i, (end, capacity, cost, __) in enumerate(graph[node]):
+                if capacity == 0:
+                    continue
+                end_dist = dist + cost + potential[node] - potential[end]
+                if distance[end] is None or end_dist < distance[end]:
+                    distance[end] = end_dist
+                    previous[end] = (node, i)
+                    heapq.heappush(heap, (end_dist, end))
+        if distance[sink] is None:
+            break
+        # nodes left unsettled are at least as far as the sink
+        for node in range(sink + 1):
+            potential[node] += distance[node] if done[node] else distance[sink]
+        node = sink
+        while node != source:
+            start, i = previous[node]
+            edge = graph[start][i]
+            edge[1] -= 1
+            graph[node][edge[3]][1] += 1
+            node = start
+
+    matching = {}
+    for row in range(len(costs)):
+        for end, capacity, __, __ in graph[row + 1]:
+            if end != source and capacity == 0:
+                matching[row] = columns[end - len(costs) - 1]
+    return matching
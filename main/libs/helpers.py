@@ -1,14 +1,20 @@
 # python imports
+import os
+import csv
+import math
 import time
+import shutil
 import logging
 # django imports
 from django.core.mail import send_mail
 from django.conf import settings
-from django.http import HttpResponse
+from django.http import HttpResponse, StreamingHttpResponse
 import boto3
 
 logger = logging.getLogger(__name__)
 
+EARTH_RADIUS_KM = 6371.0088
+
 
 def csv_dispatcher(content):
     """
@@ -20,6 +26,40 @@ def csv_dispatcher(content):
     return response
 
 
+def haversine(lat1, long1, lat2, long2):
+    """
+    Great circle distance in km between two points
+    """
+    lat1, long1, lat2, long2 = map(math.radians, (lat1, long1, lat2, long2))
+    a = (
+        math.sin((lat2 - lat1) / 2) ** 2
+        + math.cos(lat1) * math.cos(lat2) * math.sin((long2 - long1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+class Echo():
+    """
+    File-like object returning what is written, to stream a csv writer
+    """
+    def write(self, value):
+        return value
+
+
+def csv_stream_dispatcher(rows):
+    """
+    Stream an iterable of rows as a csv download
+    """
+    filename = int(time.time())
+    writer = csv.writer(Echo())
+    response = StreamingHttpResponse(
+        (writer.writerow(row) for row in rows),
+        content_type="text/csv",
+    )
+    response["Content-Disposition"] = f'attachment; filename="{filename}.csv"'
+    return response
+
+
 class S3FileUpload():
     def __init__(self, *args, **kwargs):
         session = boto3.Session(
@@ -44,5 +84,45 @@ class S3FileUpload():
             return False, None
 
 
+class FileStorage():
+    """
+    Store files on the backend selected by FILE_UPLOAD_STORAGE (local | s3)
+    """
+    def __init__(self, *args, **kwargs):
+        self.backend = settings.FILE_UPLOAD_STORAGE
+        if self.backend == "s3":
+            self.s3 = S3FileUpload().s3
+            self.bucket = settings.AWS_CONFIG["S3"]["AWS_STORAGE_BUCKET_NAME"]
+
+    def get_path(self, key):
+        return os.path.join(settings.MEDIA_ROOT, key)
+
+    def save(self, key, file):
+        if self.backend == "s3":
+            self.s3.Bucket(self.bucket).put_object(Key=key, Body=file)
+            return key
+        path = self.get_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            shutil.copyfileobj(file, f)
+        return key
+
+    def read(self, key):
+        if self.backend == "s3":
+            return self.s3.Object(self.bucket, key).get()["Body"].read()
+        with open(self.get_path(key), "rb") as f:
+            return f.read()
+
+    def url(self, key, expires_in=3600):
+        """
+        Temporary download url of a file stored on s3
+        """
+        return self.s3.meta.client.generate_presigned_url(
+            "get_object",
+            Params={"Bucket": self.bucket, "Key": key},
+            ExpiresIn=expires_in,
+        )
+
+
 def email(subject, message, recipient_list, email_from=settings.EMAIL_HOST_USER):
     send_mail( subject, message, email_from, recipient_list )
\ No newline at end of file
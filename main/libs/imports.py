@@ -0,0 +1,227 @@
+# python imports
+import csv
+import logging
+from datetime import datetime
+# django imports
+from django.db.models.functions import Lower
+
+logger = logging.getLogger(__name__)
+
+
+def parse_bool(value):
+    return value.lower() == "true"
+
+
+def parse_date(format):
+    def parser(value):
+        return datetime.strptime(value, format).date()
+    return parser
+
+
+def parse_choice(choices):
+    """
+    Parse a choice from its label, case insensitive
+    """
+    mapping = dict((choice.label.lower(), choice.value) for choice in choices)
+
+    def parser(value):
+        return mapping[value.lower()]
+    return parser
+
+
+class Lookup():
+    """
+    Resolve the csv values of a foreign key column with a single query
+    """
+    def __init__(self, queryset, field, iexact=False):
+        self.queryset = queryset
+        self.field = field
+        self.iexact = iexact
+
+    def normalize(self, value):
+        value = str(value)
+        return value.lower() if self.iexact else value
+
+    def fetch(self, values):
+        values = {self.normalize(value) for value in values}
+        if self.iexact:
+            qs = self.queryset.annotate(lookup_key=Lower(self.field)).filter(
+                lookup_key__in=values,
+            )
+        else:
+            qs = self.queryset.filter(**{f"{self.field}__in": values})
+        return {self.normalize(getattr(obj, self.field)): obj for obj in qs}
+
+
+class Column():
+    """
+    A csv column, parsed with `parser` and resolved with `lookup`.
+    Empty values are None, a required column rejects them.
+    """
+    def __init__(self, name, parser=str, required=True, lookup=None):
+        self.name = name
+        self.parser = parser
+        self.required = required
+        self.lookup = lookup
+
+
+class CSVImporter():
+    """
+    Declarative csv import. Subclasses declare the model, the columns in csv
+    order and the unique fields, rows matching an existing object on the
+    unique fields are skipped. Rows are parsed column by column, foreign keys
+    are fetched with one query per column. The other unique columns of the
+    model are checked against the file and the table, so every new object
+    is written by the batched INSERTs.
+    """
+    model = None
+    columns = []
+    unique_fields = []
+    batch_size = 1000
+
+    def __init__(self, user=None):
+        self.user = user
+
+    def get_defaults(self, row):
+        """
+        Extra model fields for a valid row, overriding the csv values
+        """
+        return {}
+
+    def validate(self, row):
+        """
+        Raise ValueError with the reason to reject a row
+        """
+
+    def get_key(self, values):
+        return tuple(
+            value.pk if hasattr(value, "pk") else value
+            for value in values
+        )
+
+    def get_existing_keys(self, rows):
+        field = self.unique_fields[0]
+        qs = self.model.objects.filter(
+            **{f"{field}__in": {row[field] for row in rows.values()}},
+        ).values_list(*self.unique_fields)
+        return {self.get_key(values) for values in qs}
+
+    def get_unique_columns(self):
+        """
+        Single column unique fields of the model besides the unique fields
+        """
+        return [
+            field for field in self.model._meta.concrete_fields
+            if field.unique and not field.primary_key and [field.name] != self.unique_fields
+        ]
+
+    def check_unique_columns(self, objs, errors):
+        """
+        Reject the objects of the lines holding the value of a unique column
+        of an earlier line or of an existing object
+        """
+        for field in self.get_unique_columns():
+            values = {}
+            for lineno, obj in objs.items():
+                value = getattr(obj, field.attname)
+                if value is None or lineno in errors:
+                    continue
+                value = field.to_python(value)
+                if value in values:
+                    errors[lineno] = f"{field.name} duplicate of line {values[value]}"
+                else:
+                    values[value] = lineno
+            for value in self.model.objects.filter(
+                **{f"{field.attname}__in": values},
+            ).values_list(field.attname, flat=True):
+                errors[values[value]] = f"{field.name} already exists"
+
+    def run(self, file):
+        """
+        Import the csv file, returns the number of objects added and
+        a list of (line number, error) for the skipped lines
+        """
+        lines = file.read().decode().strip().splitlines()
+        header = next(csv.reader(lines[:1]), [])
+        if len(header) != len(self.columns):
+            raise ValueError(f"invalid csv for {self.model._meta.verbose_name_plural}")
+
+        errors = {}
+        rows = {}
+        for lineno, fields in enumerate(csv.reader(lines[1:]), 1):
+            if len(fields) != len(self.columns):
+                errors[lineno] = "invalid line"
+            else:
+                rows[lineno] = [field.strip() or None for field in fields]
+
+        # parse one column at a time
+        for index, column in enumerate(self.columns):
+            for lineno, fields in rows.items():
+                if lineno in errors:
+                    continue
+                value = fields[index]
+                if value is None:
+                    if column.required:
+                        errors[lineno] = f"{column.name} is required"
+                    continue
+                try:
+                    fields[index] = column.parser(value)
+                except (ValueError, KeyError):
+                    errors[lineno] = f"invalid {column.name}"
+        rows = {
+            lineno: {column.name: value for column, value in zip(self.columns, fields)}
+            for lineno, fields in rows.items()
+            if lineno not in errors
+        }
+
+        # resolve the foreign keys with one query per column
+        for column in self.columns:
+            if column.lookup is None:
+                continue
+            objects = column.lookup.fetch(
+                row[column.name] for row in rows.values() if row[column.name] is not None
+            )
+            for lineno, row in rows.items():
+                if lineno in errors or row[column.name] is None:
+                    continue
+                obj = objects.get(column.lookup.normalize(row[column.name]))
+                if obj is None:
+                    errors[lineno] = f"{column.name} not found"
+                row[column.name] = obj
+
+        for lineno, row in rows.items():
+            if lineno in errors:
+                continue
+            try:
+                self.validate(row)
+            except ValueError as e:
+                errors[lineno] = str(e)
+        rows = {lineno: row for lineno, row in rows.items() if lineno not in errors}
+
+        existing = self.get_existing_keys(rows)
+        seen = {}
+        objs = {}
+        for lineno, row in rows.items():
+            key = self.get_key(row[field] for field in self.unique_fields)
+            if key in existing:
+                errors[lineno] = "already exists"
+            elif key in seen:
+                errors[lineno] = f"duplicate of line {seen[key]}"
+            else:
+                seen[key] = lineno
+                objs[lineno] = self.model(**{**row, **self.get_defaults(row)})
+        self.check_unique_columns(objs, errors)
+        objs = [obj for lineno, obj in objs.items() if lineno not in errors]
+        self.model.objects.bulk_create(objs, batch_size=self.batch_size)
+
+        errors = sorted(errors.items())
+        for lineno, error in errors:
+            logger.info(
+                "{} {} skipped line {}: {}".format(
+                    datetime.now(),
+                    self.model._meta.verbose_name,
+                    lineno,
+                    error,
+                )
+            )
+        return len(objs), errors
@@ -1,23 +1,30 @@
-import datetime
+import itertools
 from django.contrib import admin
+from django.db.models import Manager
+from django.core.exceptions import FieldDoesNotExist
 
 # user imports
-from libs.helpers import csv_dispatcher
+from libs.helpers import csv_stream_dispatcher
+from users.helpers import get_user_driver
 
 
 class ExportCSVMixin():
     model = ""
     csv_fields = list()
+    # relations reached through properties, e.g. driver.mobile_no
+    csv_select_related = list()
+    csv_chunk_size = 2000
+    # bigger exports are written to a file by a worker
+    csv_async_threshold = 20000
 
     def get_repr(self, value): 
         if value is None:
             return "-"
         if isinstance(value, list):
-            value = ", ".join(value)
-        if isinstance(value, str) and "," in value:
-            value = value.replace(",", "|")
-        if isinstance(value, (datetime.date, datetime.time, int, float)):
-            return str(value)
+            value = ", ".join(str(item) for item in value)
+        if isinstance(value, Manager):
+            # to-many relations are not exported
+            return "-"
         if callable(value):
             return '%s' % value()
         return value
@@ -32,16 +39,88 @@ class ExportCSVMixin():
                 return None
         return attr
 
+    def get_tracked_relations(self, model):
+        """
+        Foreign keys of the model FieldTracker, the tracker reads them
+        when an instance is loaded so they can't be deferred
+        """
+        tracker = getattr(model, "tracker", None)
+        return [
+            field for field in getattr(tracker, "fields", None) or []
+            if model._meta.get_field(field).is_relation
+        ]
+
+    def get_csv_queryset(self, queryset):
+        """
+        Derive select_related and only() from the dotted csv fields.
+        only() is applied when every csv field ends on a concrete field,
+        properties and reverse relations may read any column.
+        """
+        related = set(self.csv_select_related)
+        only = set(self.get_tracked_relations(self.model))
+        concrete = not related
+        for field in self.csv_fields:
+            model = self.model
+            path = []
+            for elem in field.split("."):
+                try:
+                    model_field = model._meta.get_field(elem)
+                except FieldDoesNotExist:
+                    concrete = False
+                    break
+                path.append(elem)
+                if model_field.is_relation:
+                    if not (model_field.many_to_one or model_field.one_to_one):
+                        concrete = False
+                        break
+                    related.add("__".join(path))
+                    model = model_field.related_model
+                    only.update(
+                        "__".join(path + [name])
+                        for name in self.get_tracked_relations(model)
+                    )
+                    continue
+                only.add("__".join(path))
+                break
+            else:
+                # the field is a related object
+                concrete = False
+        if related:
+            queryset = queryset.select_related(*related)
+        if concrete:
+            queryset = queryset.only(*only)
+        return queryset
+
+    def get_csv_rows(self, queryset):
+        """
+        Rows of the csv, fetched in chunks
+        """
+        for obj in queryset.iterator(chunk_size=self.csv_chunk_size):
+            yield [self.get_repr(self.get_field(obj, field)) for field in self.csv_fields]
+
     def export_selected(self, request, queryset=None):
-        fields = self.csv_fields
-        csv = ""
-        csv += ",".join(self.csv_fields) + "\n"
+        """
+        Stream the queryset as csv, exports above csv_async_threshold
+        rows are handed to an export job
+        """
         if queryset is None:
             queryset = self.model.objects.all()
-        for obj in queryset:
-            row = [self.get_repr(self.get_field(obj, field)) for field in fields]
-            csv += ",".join(row) + "\n"
-        return csv_dispatcher(csv)
+        if queryset.count() > self.csv_async_threshold:
+            from jobs.helpers import start_export_job
+            return start_export_job(request, queryset)
+        rows = self.get_csv_rows(self.get_csv_queryset(queryset))
+        return csv_stream_dispatcher(itertools.chain([self.csv_fields], rows))
+
+
+class DriverRequestMixin():
+    """
+    Sets request.driver to the driver of the authenticated user, None for
+    other users. The token authentication has already loaded the driver.
+    """
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        request.driver = get_user_driver(request.user)
 
 
 class BaseMixin(admin.ModelAdmin):
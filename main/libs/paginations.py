@@ -1,5 +1,48 @@
+from datetime import datetime, timedelta, timezone
+
+from django.db.models import Q
 from rest_framework.pagination import CursorPagination
 
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
 
 class CustomCursorPagination(CursorPagination):
-    ordering = "-checkin_time"
+    # the cursor needs a non null, indexed and mostly unique ordering
+    ordering = "-created_at"
+
+
+def encode_sync_cursor(updated_at, id):
+    """
+    Opaque cursor of a row for the delta sync, microseconds since the
+    epoch and the id
+    """
+    return f"{(updated_at - EPOCH) // timedelta(microseconds=1)}-{id}"
+
+
+def decode_sync_cursor(cursor):
+    """
+    Returns the (updated_at, id) of a sync cursor, raises ValueError
+    """
+    microseconds, id = cursor.split("-")
+    return EPOCH + timedelta(microseconds=int(microseconds)), int(id)
+
+
+def sync_page(queryset, cursor, size, until):
+    """
+    Rows of the queryset changed after the cursor and up to until, in
+    (updated_at, id) order. Returns the rows, the cursor of the last row
+    and whether more rows are left.
+    """
+    queryset = queryset.filter(updated_at__lte=until)
+    if cursor is not None:
+        updated_at, id = decode_sync_cursor(cursor)
+        queryset = queryset.filter(
+            Q(updated_at__gt=updated_at) | Q(updated_at=updated_at, id__gt=id),
+        )
+    rows = list(queryset.order_by("updated_at", "id")[:size + 1])
+    more = len(rows) > size
+    rows = rows[:size]
+    if rows:
+        cursor = encode_sync_cursor(rows[-1].updated_at, rows[-1].id)
+    return rows, cursor, more
+
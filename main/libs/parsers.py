@@ -0,0 +1,20 @@
+# python imports
+import gzip
+import zlib
+# django imports
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+
+
+class GzipJSONParser(JSONParser):
+    """
+    JSON parser accepting gzip compressed bodies (Content-Encoding: gzip)
+    """
+    def parse(self, stream, media_type=None, parser_context=None):
+        request = (parser_context or {}).get("request")
+        if request is None or request.META.get("HTTP_CONTENT_ENCODING") != "gzip":
+            return super().parse(stream, media_type, parser_context)
+        try:
+            return super().parse(gzip.GzipFile(fileobj=stream), media_type, parser_context)
+        except (OSError, EOFError, zlib.error) as exc:
+            raise ParseError("Gzip parse error - %s" % exc)
@@ -13,6 +13,7 @@ https://docs.djangoproject.com/en/4.0/ref/settings/
 from pathlib import Path
 import os
 from decouple import config
+from celery.schedules import crontab
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -45,6 +46,7 @@ DEFAULT_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
     "rest_framework",
     "rest_framework.authtoken",
     "smart_selects",
@@ -61,6 +63,8 @@ USER_APPS = [
     "vendors",
     "bookings",
     "services",
+    "jobs",
+    "billing",
 ]
 
 THIRDPARTY_APPS = ['django_extensions',]
@@ -191,8 +195,7 @@ AUTH_PASSWORD_VALIDATORS = [
 
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": [
-        "rest_framework.authentication.BasicAuthentication",
-        "rest_framework.authentication.TokenAuthentication",
+        "users.authentication.DriverTokenAuthentication",
     ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.LimitOffsetPagination',
     "PAGE_SIZE": 20,
@@ -211,11 +214,14 @@ USE_TZ = True
 
 AUTH_USER_MODEL = "users.User"
 
+AUTHENTICATION_BACKENDS = ["users.backends.CachedPermissionBackend"]
+
 # Static files (CSS, JavaScript, Images)
 # https://docs.djangoproject.com/en/4.0/howto/static-files/
 
 STATIC_URL = "static/"
 STATIC_ROOT = os.path.join(BASE_DIR, "static")
+MEDIA_ROOT = os.path.join(BASE_DIR, "media")
 # STATICFILES_DIRS = (os.path.join(BASE_DIR, "static"),)
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.0/ref/settings/#default-auto-field
@@ -227,6 +233,20 @@ CELERY_TASK_TRACK_STARTED = True
 CELERY_TASK_TIME_LIMIT = 30 * 60
 CELERY_BROKER_URL = "redis://127.0.0.1:6379/0"
 CELERY_RESULT_BACKEND = "redis://127.0.0.1:6379/0"
+CELERY_BEAT_SCHEDULE = {
+    "rollup-driver-locations": {
+        "task": "rollup_driver_locations",
+        "schedule": crontab(hour=3, minute=0),
+    },
+    "reconcile-trip-distances": {
+        "task": "reconcile_trip_distances",
+        "schedule": crontab(hour=4, minute=0),
+    },
+    "recompute-effective-roster-pricing": {
+        "task": "recompute_effective_roster_pricing",
+        "schedule": crontab(hour=0, minute=5),
+    },
+}
 
 KYC_TOKEN = config("KYC_TOKEN")
 KYC_URL = config("KYC_URL")
@@ -250,6 +270,8 @@ AWS_CONFIG = {
             "driver-kyc-documents": "driver-kyc-documents/images/",
             "vehicle-documents": "vehicle-documents/files/",
             "client-documents": "client-documents/files/",
+            "imports": "imports/files/",
+            "exports": "exports/files/",
         }
     }
 }
@@ -0,0 +1,37 @@
+# django imports
+from django.core.cache import cache
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+
+# app imports
+from .constants import AUTH_TOKEN_KEY, AUTH_TOKEN_TIMEOUT
+
+
+class DriverTokenAuthentication(TokenAuthentication):
+    """
+    Token authentication resolving the user, its driver and onboarding in
+    one query, so reading request.user.driver is free. The token is kept in
+    redis until it, its user or driver changes, an authenticated request
+    usually doesn't query at all.
+    """
+
+    def get_token(self, key):
+        cache_key = AUTH_TOKEN_KEY.format(key)
+        token = cache.get(cache_key)
+        if token is None:
+            token = self.get_model().objects.select_related(
+                "user__driver__onboarding",
+            ).filter(key=key).first()
+            if token is None:
+                return None
+            cache.set(cache_key, token, timeout=AUTH_TOKEN_TIMEOUT)
+        return token
+
+    def authenticate_credentials(self, key):
+        token = self.get_token(key)
+        if token is None:
+            raise exceptions.AuthenticationFailed(_("Invalid token."))
+        if not token.user.is_active:
+            raise exceptions.AuthenticationFailed(_("User inactive or deleted."))
+        return (token.user, token)
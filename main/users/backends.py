@@ -0,0 +1,26 @@
+# django imports
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+
+# app imports
+from .constants import USER_PERMS_KEY, USER_PERMS_TIMEOUT
+
+
+class CachedPermissionBackend(ModelBackend):
+    """
+    Model backend keeping the permission set of a user in the cache, the
+    admin checks permissions many times on every page. The set is dropped
+    whenever the groups or permissions of the user change.
+    """
+
+    def get_all_permissions(self, user_obj, obj=None):
+        if not user_obj.is_active or user_obj.is_anonymous or obj is not None:
+            return set()
+        if not hasattr(user_obj, "_perm_cache"):
+            key = USER_PERMS_KEY.format(user_obj.pk)
+            perms = cache.get(key)
+            if perms is None:
+                perms = super().get_all_permissions(user_obj)
+                cache.set(key, perms, timeout=USER_PERMS_TIMEOUT)
+            user_obj._perm_cache = perms
+        return user_obj._perm_cache
@@ -10,3 +10,63 @@ USER_INACTIVE = {
     "code": "USR_404",
     "error": "user not found or incorrect credentials.",
 }
+
+# token -> user, driver and onboarding, dropped whenever one of them
+# changes or the token is deleted
+AUTH_TOKEN_KEY = "auth_token_{}"
+AUTH_TOKEN_TIMEOUT = 5 * 60
+
+# role: [(models, codename prefix)], no prefix grants every permission of
+# the models. Each role is a group of the same name, kept in sync by the
+# sync_role_groups command.
+ROLE_PERMISSIONS = {
+    1: [
+        (
+            (
+                "onboarding",
+                "trip",
+                "roster",
+                "driver",
+                "drivercontract",
+                "drivercontractlog",
+                "vendor",
+                "station",
+                "vehicle",
+                "config",
+                "user",
+                "client",
+                "clientstore",
+                "group",
+                "gpstracker",
+                "battery",
+            ),
+            None,
+        ),
+    ],
+    2: [
+        (
+            (
+                "onboarding",
+                "trip",
+                "roster",
+                "driver",
+                "station",
+                "vehicle",
+                "client",
+                "clientstore",
+            ),
+            "view",
+        ),
+    ],
+    3: [
+        (("vehicle", "station"), "view"),
+    ],
+    4: [
+        (("roster", "vehicle", "station"), None),
+        (("driver", "onboarding", "client", "clientstore", "trip", "user"), "view"),
+    ],
+}
+
+# permission set of a user, for the admin permission checks
+USER_PERMS_KEY = "user_perms_{}"
+USER_PERMS_TIMEOUT = 60 * 60 * 24
@@ -1,14 +1,92 @@
-from django.contrib.auth.models import Permission
+from django.contrib.auth.models import Group, Permission
+from django.core.cache import cache
+from django.core.exceptions import ObjectDoesNotExist
+from django.db import transaction
+from rest_framework.authtoken.models import Token
+
+# app imports
+from .constants import (
+    AUTH_TOKEN_KEY,
+    USER_TYPES,
+    ROLE_PERMISSIONS,
+    USER_PERMS_KEY,
+)
 
 
 def get_perms(*models, scope=None):
-    perms_list = []
-    for model in models:
-        if scope:
-            perms = Permission.objects.filter(
-                content_type__model=model, codename__startswith=scope
-            )
-        else:
-            perms = Permission.objects.filter(content_type__model=model)
-        perms_list.extend(perms)
-    return perms_list
+    perms = Permission.objects.filter(content_type__model__in=models)
+    if scope:
+        perms = perms.filter(codename__startswith=scope)
+    return list(perms)
+
+
+def get_role_group_name(role):
+    return dict(USER_TYPES)[role]
+
+
+def sync_role_groups():
+    """
+    Create the group of every role and set its permissions from
+    ROLE_PERMISSIONS. Returns a dict of role -> group.
+    """
+    groups = {}
+    for role, grants in ROLE_PERMISSIONS.items():
+        group, __ = Group.objects.get_or_create(name=get_role_group_name(role))
+        group.permissions.set(
+            [perm for models, scope in grants for perm in get_perms(*models, scope=scope)]
+        )
+        groups[role] = group
+    return groups
+
+
+def set_role_group(user):
+    """
+    Make the user a member of the group of its role, and of no other
+    role group
+    """
+    names = {get_role_group_name(role) for role in ROLE_PERMISSIONS}
+    name = get_role_group_name(user.role) if user.role in ROLE_PERMISSIONS else None
+    user.groups.remove(*user.groups.filter(name__in=names - {name}))
+    if name is not None:
+        group, __ = Group.objects.get_or_create(name=name)
+        user.groups.add(group)
+
+
+def get_user_driver(user):
+    """
+    Returns the driver of the user or None
+    """
+    try:
+        return user.driver
+    except (AttributeError, ObjectDoesNotExist):
+        return None
+
+
+def invalidate_request_token(request):
+    """
+    Drop the cached token the request was authenticated with
+    """
+    if isinstance(request.auth, Token):
+        cache.delete(AUTH_TOKEN_KEY.format(request.auth.key))
+
+
+def invalidate_user_perms(user_ids):
+    """
+    Drop the cached permission sets of the users once the transaction
+    commits
+    """
+    keys = [USER_PERMS_KEY.format(user_id) for user_id in set(user_ids)]
+    if keys:
+        transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def invalidate_auth_tokens(user_ids):
+    """
+    Drop the cached tokens of the users once the transaction commits
+    """
+    keys = [
+        AUTH_TOKEN_KEY.format(key)
+        for key in Token.objects.filter(user_id__in=user_ids).values_list("key", flat=True)
+    ]
+    if keys:
+        transaction.on_commit(lambda: cache.delete_many(keys))
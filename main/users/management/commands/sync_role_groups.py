@@ -0,0 +1,34 @@
+# django imports
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+# app imports
+from users.models import User
+from users.helpers import sync_role_groups, invalidate_user_perms
+
+
+class Command(BaseCommand):
+    help = (
+        "Create the role groups with the permissions of their roles and "
+        "move every user to the group of its role"
+    )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            groups = sync_role_groups()
+            for role, group in groups.items():
+                group.user_set.set(User.objects.filter(role=role))
+                self.stdout.write(
+                    "{}: {} permissions, {} users".format(
+                        group.name,
+                        group.permissions.count(),
+                        group.user_set.count(),
+                    )
+                )
+            # the permissions used to be set on the users of the roles
+            user_perms = User.user_permissions.through.objects.filter(
+                user__role__in=groups,
+            )
+            invalidate_user_perms(user_perms.values_list("user_id", flat=True))
+            user_perms.delete()
+        self.stdout.write(self.style.SUCCESS("role groups synced"))
@@ -2,6 +2,7 @@
 from django.utils.translation import gettext_lazy as _
 from django.contrib.auth.models import AbstractUser
 from django.db import models
+from model_utils import FieldTracker
 
 
 class User(AbstractUser):
@@ -20,6 +21,8 @@ class User(AbstractUser):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     is_active = models.BooleanField(default=True)
+    # the role decides the role group, see users.signals
+    tracker = FieldTracker(fields=["role", "is_superuser"])
 
     def __str__(self) -> str:
         return f"{self.username}"
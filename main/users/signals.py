@@ -1,81 +1,68 @@
 # Django imports
-from django.db.models.signals import post_save
+from django.contrib.auth.models import Group
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, m2m_changed
 from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
 
 # User imports
 from .models import User
-from .helpers import get_perms
+from .helpers import (
+    set_role_group,
+    invalidate_auth_tokens,
+    invalidate_user_perms,
+)
+from .constants import AUTH_TOKEN_KEY
+
+# m2m actions after which the permissions of users may have changed
+PERM_ACTIONS = {"post_add", "post_remove", "pre_clear"}
 
 
 @receiver(post_save, sender=User)
 def user_post_save_handler(sender, instance, created, **kwargs):
-    if created:
-        if instance.role > 0:
-            instance.is_staff = True
-            instance.save()
+    """
+        The permissions of a role come from the group of the role, the
+        membership changes with the role only
+    """
+    if created or instance.tracker.has_changed("role"):
+        set_role_group(instance)
+    elif instance.tracker.has_changed("is_superuser"):
+        invalidate_user_perms([instance.id])
+
+    invalidate_auth_tokens([instance.id])
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+@receiver(m2m_changed, sender=User.user_permissions.through)
+def user_perms_changed_handler(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in PERM_ACTIONS:
+        return
+    if not reverse:
+        invalidate_user_perms([instance.pk])
+    elif pk_set:
+        invalidate_user_perms(pk_set)
+    else:
+        # cleared from the group or permission side
+        invalidate_user_perms(instance.user_set.values_list("id", flat=True))
 
-    if instance.role == User.Role.OPERATIONS_MANAGER:
-        instance.user_permissions.set(
-            get_perms(
-                "onboarding",
-                "trip",
-                "roster",
-                "drivers",
-                "drivercontract",
-                "drivercontractlog",
-                "vendor",
-                "station",
-                "vehicle",
-                "vehiclestationlogs",
-                "vehiclestatuslogs",
-                "config",
-                "user",
-                "client",
-                "clientstore",
-                "group",
-                "gpstracker",
-                "battery"
-            )
-        )
 
-    elif instance.role == User.Role.FLEET_MANAGER:
-        instance.user_permissions.set(
-            [
-                *get_perms(
-                    "onboarding",
-                    "trip",
-                    "roster",
-                    "driver",
-                    "station",
-                    "vehicle",
-                    "client",
-                    "clientstore",
-                    scope="view"
-                ),
-            ]
-        )
+@receiver(m2m_changed, sender=Group.permissions.through)
+def group_perms_changed_handler(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in PERM_ACTIONS:
+        return
+    if not reverse:
+        groups = [instance.pk]
+    else:
+        groups = pk_set or instance.group_set.values_list("id", flat=True)
+    invalidate_user_perms(
+        User.objects.filter(groups__in=groups).values_list("id", flat=True)
+    )
 
-    elif instance.role == User.Role.SERVICE_MANAGER:
-        instance.user_permissions.set(
-            get_perms(
-                "vehicle",
-                "station",
-                scope="view",
-            )
-        )
 
-    elif instance.role == User.Role.OPERATIONS_EXECUTIVE:
-        instance.user_permissions.set(
-            [
-                *get_perms("roster", "vehicle", "station"),
-                *get_perms(
-                    "driver",
-                    "onboarding",
-                    "client",
-                    "clientstore"
-                    "trip",
-                    "user",
-                    scope="view",
-                )
-            ]
-        )
+@receiver(post_delete, sender=Token)
+def token_post_delete_handler(sender, instance, **kwargs):
+    key = AUTH_TOKEN_KEY.format(instance.key)
+    cache.delete(key)
+    # a request before the commit may have cached the token again
+    transaction.on_commit(lambda: cache.delete(key))
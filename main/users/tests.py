@@ -0,0 +1,68 @@
+# python imports
+from io import StringIO
+# django imports
+from django.contrib.auth.models import Group, Permission
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+# app imports
+from .models import User
+from .helpers import get_role_group_name
+
+
+class RolePermissionTestCase(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        call_command("sync_role_groups", stdout=StringIO())
+        self.user = User.objects.create_user(
+            username="manager",
+            password="password",
+            role=User.Role.SERVICE_MANAGER,
+        )
+
+    def fresh_user(self):
+        return User.objects.get(id=self.user.id)
+
+    def test_role_group(self):
+        self.assertEqual(
+            list(self.user.groups.values_list("name", flat=True)),
+            [get_role_group_name(User.Role.SERVICE_MANAGER)],
+        )
+        self.assertTrue(self.fresh_user().has_perm("fleets.view_vehicle"))
+        self.assertFalse(self.fresh_user().has_perm("fleets.change_vehicle"))
+
+    def test_save_does_not_touch_permissions(self):
+        self.user.full_name = "Manager"
+        with CaptureQueriesContext(connection) as queries:
+            self.user.save()
+        tables = ("auth_permission", "users_user_groups", "users_user_user_permissions")
+        self.assertFalse(
+            [query for query in queries if any(table in query["sql"] for table in tables)]
+        )
+
+    def test_permissions_are_cached(self):
+        self.fresh_user().has_perm("fleets.view_vehicle")
+        user = self.fresh_user()
+        with CaptureQueriesContext(connection) as queries:
+            self.assertTrue(user.has_perm("fleets.view_vehicle"))
+        self.assertEqual(len(queries), 0)
+
+    def test_role_change_drops_the_cached_permissions(self):
+        self.assertFalse(self.fresh_user().has_perm("bookings.add_roster"))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.role = User.Role.OPERATIONS_EXECUTIVE
+            self.user.save()
+        self.assertTrue(self.fresh_user().has_perm("bookings.add_roster"))
+        self.assertFalse(self.fresh_user().has_perm("fleets.view_battery"))
+
+    def test_group_change_drops_the_cached_permissions(self):
+        self.assertFalse(self.fresh_user().has_perm("fleets.change_vehicle"))
+        group = Group.objects.get(name=get_role_group_name(User.Role.SERVICE_MANAGER))
+        with self.captureOnCommitCallbacks(execute=True):
+            group.permissions.add(
+                *Permission.objects.filter(codename="change_vehicle")
+            )
+        self.assertTrue(self.fresh_user().has_perm("fleets.change_vehicle"))